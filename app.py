@@ -1,22 +1,43 @@
-import os, sys
+import os, sys, time
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib.image as mpimg
 import streamlit as st
-import requests
 
-# Path setup
+# Path setup: everything is imported package-qualified (src.X, lib.X), so
+# each module is loaded once
 ROOT = os.path.dirname(os.path.abspath(__file__))
-SRC = os.path.join(ROOT, "src")
-if SRC not in sys.path:
-    sys.path.insert(0, SRC)
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import src.data_cache as dc
+from src.network_plot import NetworkPlot, frame_key, line_widths, quantize_widths
+from src.alerts import AlertEngine
+from src.weather import NWS_URL, WeatherProvider
+from src.power_flow import DCPowerFlow
+from src.contingency import ContingencyAnalysis
+from src.topology import Topology
+from src.telemetry import FlowIngestor, TelemetryService
+from src.rating_engine import RatingEngine, get_engine
+from src.spans import SpanRater, load_segments, wind_angle
+from src.weather_field import WeatherField, load_stations
+from src.montecarlo import run_monte_carlo
+from src.headroom import compute_stress_headroom, ieee_headroom, span_headroom
+from src.sweep import load_lines
+from src.stress_model import compute_line_stress, line_conductor_params
+from lib.ieee738.conductors import LIBRARY_PATH
+from lib.ieee738.rating_surface import SURFACE_AMBIENT
+from lib.ieee738.vectorized import steady_state_thermal_rating
 
 try:
-    import compute_stress as cs
+    import src.compute_stress as cs
 except Exception:
     cs = None
 
+try:
+    from lib.ieee738.rating_surface import load_or_build as load_rating_surface
+except Exception:
+    load_rating_surface = None
+
 # Streamlit setup
 st.set_page_config(page_title="Hawaii Grid", layout="wide")
 st.markdown("""
@@ -40,86 +61,295 @@ h1,h2,h3,h4,h5,h6{color:var(--text)!important;}
 </style>
 """, unsafe_allow_html=True)
 
-# Background image helper
-def draw_oahu_background(ax, buses_df, img_path="data/gis/honolulu.jpg", alpha=0.35):
-    """Draw a white Oahu silhouette behind the network."""
-    if not os.path.exists(img_path):
-        st.warning(f"Oahu background image not found: {img_path}")
-        return
-
-    img = mpimg.imread(img_path)
-    img_gray = np.mean(img[..., :3], axis=-1) if img.ndim == 3 else img
-    img_inv = 1 - img_gray
-
-    bxmin, bxmax = buses_df["x"].min(), buses_df["x"].max()
-    bymin, bymax = buses_df["y"].min(), buses_df["y"].max()
-    b_w, b_h = bxmax - bxmin, bymax - bymin
-
-    pad_x, pad_y = b_w * 0.15, b_h * 0.15
-    shift_x, shift_y = -b_w * 0.06, b_h * 0.02
-
-    extent = [
-        bxmin - pad_x + shift_x,
-        bxmax + pad_x + shift_x,
-        bymin - pad_y + shift_y,
-        bymax + pad_y + shift_y
-    ]
-
-    ax.set_facecolor("black")
-    ax.imshow(img_inv, extent=extent, aspect='auto', zorder=0, alpha=alpha, cmap="gray")
-
-# Weather fetcher
-def get_hawaii_weather():
+# Weather provider, one per process.  WEATHER_FIXTURE (saved responses) or
+# WEATHER_URL (stub server) allow running without api.weather.gov.
+@st.cache_resource
+def get_weather_provider():
+    fixture = os.environ.get("WEATHER_FIXTURE")
+    if fixture:
+        return WeatherProvider.from_fixture(fixture)
+    return WeatherProvider(base_url=os.environ.get("WEATHER_URL", NWS_URL))
+
+def import_hawaii_weather():
+    """Put the forecast hour covering now on the sliders.  The fetch runs in
+    the background: until it lands, weather_poll() reruns the page."""
+    provider = get_weather_provider()
     try:
-        headers = {'User-Agent': 'HawaiiGridApp/1.0'}
-        resp = requests.get("https://api.weather.gov/points/21.3069,-157.8583", headers=headers)
-        data = resp.json()
-        forecast_url = data['properties']['forecastHourly']
-        resp = requests.get(forecast_url, headers=headers)
-        weather = resp.json()['properties']['periods'][0]
-
-        temp_f = weather['temperature']
-        temp_c = (temp_f - 32) * 5 / 9
-        wind_mph = float(''.join(filter(str.isdigit, weather['windSpeed'])))
-        wind_ms = wind_mph * 0.44704
-        wind_pct = min(100.0, (wind_ms / 15.0) * 100.0)
-        return temp_c, wind_pct
+        cur = provider.current()
     except Exception as e:
+        st.session_state.pop("weather_import", None)
         st.error(f"Weather fetch failed: {e}")
-        return None, None
+        return
+    if cur is None and provider.pending():
+        weather_poll()
+        return
+    st.session_state.pop("weather_import", None)
+    if cur is None:
+        st.error("The forecast doesn't cover the current hour.")
+        return
+    st.session_state["temp"] = st.session_state["temp_slider"] = float(np.clip(cur.temp_c, 10.0, 75.0))
+    st.session_state["wind"] = st.session_state["wind_slider"] = min(100.0, (cur.wind_ms / 15.0) * 100.0)
+    st.session_state["weather_note"] = (
+        f"Imported from a forecast {cur.age_s / 60:.0f} min old" + (" (stale, refreshing)" if cur.stale else ""))
+    st.rerun()
 
 # Data helpers
-def csv_try(paths):
-    for p in paths:
-        if os.path.exists(p):
-            return pd.read_csv(p)
-    raise FileNotFoundError(paths)
-
-def compute_edge_states(df_lines, temp_c, wind_pct):
+@st.cache_resource(max_entries=4)
+def get_rating_surface(conductors, mots, library_version):
+    return load_rating_surface(list(conductors), list(mots))
+
+@st.cache_resource
+def get_power_flow(buses_path, lines_path, flows_path="data/csv/line_flows_nominal.csv"):
+    # B matrix and its factorisation are built once per process; the generator
+    # shares are fitted to the nominal case (there is no generator data)
+    return DCPowerFlow.from_network(dc.load_network(buses_path, lines_path), dc.load_flows(flows_path))
+
+@st.cache_resource
+def get_contingency(buses_path, lines_path):
+    # PTDF/LODF only depend on the network
+    return ContingencyAnalysis(get_power_flow(buses_path, lines_path))
+
+@st.cache_resource
+def get_topology(buses_path, lines_path):
+    # CSR bus -> line index for the per-bus reductions
+    return Topology.from_network(dc.load_network(buses_path, lines_path))
+
+@st.cache_resource
+def get_frame_cache():
+    # encoded map frames by what they show, shared by every session
+    return RatingEngine(budget_bytes=FRAME_CACHE_MB * 2**20)
+
+@st.cache_resource
+def get_telemetry(socket_addr, tail_path):
+    """Background flow ingestion, one per process, shared by every session.
+    Starts from the nominal flows.  It only publishes flows: every session
+    rates them with its own weather and model (see telemetry_panel)."""
+    net = dc.load_network()
+    names = net.lines["name"].to_numpy()
+    flows = net.lines["name"].map(dc.load_flows()).fillna(0.0).to_numpy(dtype=float)
+    ingestor = FlowIngestor(names, np.full(len(names), np.inf), flows)
+    return TelemetryService(ingestor, socket_addr, tail_path).start()
+
+def telemetry_source():
+    """(host, port) and file path from TELEMETRY_SOCKET / TELEMETRY_FILE"""
+    addr = os.environ.get("TELEMETRY_SOCKET")
+    if addr:
+        host, port = addr.rsplit(":", 1)
+        addr = (host, int(port))
+    return addr or None, os.environ.get("TELEMETRY_FILE") or None
+
+def file_version(*paths):
+    """mtime of each file (None if missing), for cache keys that must follow edits"""
+    return tuple(os.stat(p).st_mtime_ns if os.path.exists(p) else None for p in paths)
+
+def data_version():
+    """Versions of the network, nominal flows and conductor library: part of
+    every shared cache key whose result depends on them"""
+    return file_version("data/csv/buses.csv", "data/csv/lines.csv", "data/csv/line_flows_nominal.csv",
+                        LIBRARY_PATH)
+
+@st.cache_resource(max_entries=4)
+def get_span_rater(lines_path, geojson_path, version):
+    # span table and per-span conductor params are rebuilt when either file changes
+    return SpanRater(dc.load_network(lines_path=lines_path).lines, load_segments(geojson_path))
+
+def span_rater():
+    return get_span_rater("data/csv/lines.csv", GEOJSON_PATH, file_version("data/csv/lines.csv", GEOJSON_PATH))
+
+@st.cache_resource(max_entries=4)
+def get_station_field(stations_path, version):
+    # KD-tree and the span / bus / line weights only change with the station,
+    # geometry or network files
+    stations = load_stations(stations_path)
+    field = WeatherField.from_stations(stations)
+    segments = load_segments(GEOJSON_PATH)
+    net = dc.load_network()
+    topo = get_topology("data/csv/buses.csv", "data/csv/lines.csv")
+    x, y = net.buses["x"].to_numpy(dtype=float), net.buses["y"].to_numpy(dtype=float)
+    return (stations, field, {
+        "span": field.interpolator(segments.lon, segments.lat),
+        "bus": field.interpolator(x, y),
+        "line": field.interpolator((x[topo.from_bus] + x[topo.to_bus]) / 2,
+                                   (y[topo.from_bus] + y[topo.to_bus]) / 2),
+    })
+
+def stations_version():
+    return file_version(STATIONS_PATH, GEOJSON_PATH, "data/csv/buses.csv", "data/csv/lines.csv")
+
+def station_ambient(which):
+    """Station readings interpolated to the spans ("span"), buses ("bus") or
+    line midpoints ("line")"""
+    stations, field, interp = get_station_field(STATIONS_PATH, stations_version())
+    wind_dir = stations["wind_from_deg"] if "wind_from_deg" in stations else None
+    return field.interpolate(interp[which], stations["temp_c"], stations["wind_ms"], wind_dir)
+
+def ieee_ratings_mva(df_lines, temp_c, wind_ms, wind_from_deg=None, span_ambient=None, use_surface=False,
+                     line_ambient=None):
+    """IEEE-738 rating (MVA) of every line at the given weather.
+    With line geometry each line is rated at its weakest span, optionally with
+    per-span weather (weather_field.Ambient).  Lines without geometry are rated
+    in one batched call, at line_ambient if given.  use_surface skips the
+    spans: every line is looked up on the rating surface (default wind angle),
+    or rated at line_ambient if given (the surface is for one weather)."""
+    env = dict(SURFACE_AMBIENT, Ta=temp_c, WindVelocity=wind_ms * 3.28084)
+    mva = np.full(len(df_lines), np.nan)
+    if os.path.exists(GEOJSON_PATH) and not use_surface:
+        span_env = env
+        if span_ambient is not None:
+            span_env = dict(SURFACE_AMBIENT, Ta=span_ambient.temp_c,
+                            WindVelocity=span_ambient.wind_ms * 3.28084)
+            if wind_from_deg is not None:
+                wind_from_deg = np.where(np.isnan(span_ambient.wind_from_deg), wind_from_deg,
+                                         span_ambient.wind_from_deg)
+        amps = span_rater().ratings(span_env, wind_from_deg).rating
+        mva = np.sqrt(3) * amps * network.line_kv * 1e-3
+    rest = np.isnan(mva)
+    if rest.any() and line_ambient is not None:
+        env = dict(SURFACE_AMBIENT, Ta=line_ambient.temp_c[rest],
+                   WindVelocity=line_ambient.wind_ms[rest] * 3.28084)
+    if rest.any() and use_surface and line_ambient is None:
+        mva[rest] = surface_ratings_mva(df_lines, temp_c, wind_ms)[rest]
+    elif rest.any():
+        mva[rest] = compute_line_stress(df_lines[rest].assign(v_nom=network.line_kv[rest]), env)["rating_mva"].to_numpy()
+    return mva
+
+def ratings_tag(wind_from_deg, use_stations, use_surface):
+    """Engine tag of line_ratings: everything but the sliders it depends on"""
+    # the surface ignores the wind direction: one entry for all of them
+    return ("ratings", None if use_surface else wind_from_deg, use_surface, data_version(), file_version(GEOJSON_PATH),
+            stations_version() if use_stations else None)
+
+def line_ratings(temp_c, wind_pct, wind_from_deg, use_stations, use_surface):
+    """ieee_ratings_mva at the current weather: one array per rerun for the map
+    (IEEE mode) and N-1, shared by every session.  With use_stations
+    every line is rated at the station field, not the sliders."""
+    if use_surface:
+        wind_from_deg = None        # the surface is at the default wind angle
+    span_ambient = station_ambient("span") if use_stations and not use_surface else None
+    line_ambient = station_ambient("line") if use_stations else None
+    return get_engine().evaluate(
+        lambda t, w, _: ieee_ratings_mva(lines, t, w / 100.0 * 15.0, wind_from_deg, span_ambient, use_surface,
+                                         line_ambient),
+        temp_c, wind_pct, tag=ratings_tag(wind_from_deg, use_stations, use_surface))
+
+def rating_sensitivity_mva(df_lines, temp_c, wind_ms):
+    """IEEE-738 rating change (MVA) per degC and per m/s of wind, from the
+    analytic derivatives of the batched rating."""
+    cond, _ = line_conductor_params(df_lines)
+    params = dict(SURFACE_AMBIENT, Ta=temp_c, WindVelocity=wind_ms * 3.28084)
+    params.update({k: cond[k].to_numpy() for k in cond.columns})
+    sens = steady_state_thermal_rating(params, sensitivities=True).sensitivity
+    scale = np.sqrt(3) * network.line_kv[df_lines.index] * 1e-3
+    return sens["Ta"] * scale, sens["WindVelocity"] * 3.28084 * scale
+
+def nominal_flows(df_lines):
+    """Per-line MW of the default loading, aligned with df_lines (NaN if unknown)"""
+    return df_lines["name"].map(dc.load_flows("data/csv/line_flows_nominal.csv")).to_numpy(dtype=float)
+
+@st.cache_resource(max_entries=16, show_spinner="Solving line headroom...")
+def get_headroom(stress_model, wind_from_deg, flow_source, _flows=None):
+    """Critical temperature / wind of every line at HEADROOM_AT stress, for the
+    model the map uses (stress_model as in the controls: None, "spans" or
+    "surface").  Keyed on where the flows come from (flow_source, e.g.
+    ("dc", load_scale)) rather than their values; _flows are those flows."""
+    flows = None if _flows is None else np.asarray(_flows)
+    if stress_model is None:
+        return compute_stress_headroom(lines, flows, (HEADROOM_AT,))
+    flows = np.nan_to_num(nominal_flows(lines) if flows is None else flows)
+    if stress_model == "spans" and os.path.exists(GEOJSON_PATH):
+        # same weakest-span ratings and wind direction as the map
+        return span_headroom(span_rater(), lines, flows, network.line_kv, SURFACE_AMBIENT, wind_from_deg,
+                             (HEADROOM_AT,))
+    return ieee_headroom(lines, flows, network.line_kv, SURFACE_AMBIENT, (HEADROOM_AT,))
+
+@st.cache_data(max_entries=32, show_spinner="Sampling weather scenarios...")
+def monte_carlo_table(temp_c, wind_ms, wind_from_deg, n_samples, seed, flows=None):
+    """Per-line stress quantiles and P(stress > 90/100%) under forecast uncertainty.
+    Lines are rated with their default East-West axis against the wind direction."""
+    table, _ = load_lines()
+    if flows is not None:
+        table = table.assign(flow_mva=table["name"].map(dict(zip(network.lines["name"], np.abs(flows))))
+                             .fillna(0.0).to_numpy())
+    return run_monte_carlo(table, temp_c, wind_ms, float(wind_angle(wind_from_deg, 90.0)),
+                           n_samples=n_samples, seed=seed).to_frame()
+
+def surface_ratings_mva(df_lines, temp_c, wind_ms):
+    """Rating (MVA) of every line from the precomputed IEEE-738 rating surface"""
+    surface, idx = get_rating_surface(tuple(df_lines["conductor"]), tuple(df_lines["MOT"]),
+                                      file_version(LIBRARY_PATH))
+    amps = np.where(idx >= 0, surface.ratings_at(temp_c, wind_ms * 3.28084)[idx], np.nan)
+    return np.sqrt(3) * amps * network.line_kv * 1e-3
+
+def ieee_stress(df_lines, ratings_mva, flows=None):
+    """Stress from IEEE-738 ratings and the given (or nominal) flows."""
+    if flows is None:
+        flows = nominal_flows(df_lines)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        stress = np.abs(flows) / ratings_mva * 100
+    return np.clip(np.nan_to_num(stress, nan=0.0), 0, 200)
+
+def compute_edge_states(df_lines, temp_c, wind_pct, use_ieee=False, flows=None, ratings=None):
+    """Stress (%) and color of every line, as arrays aligned with df_lines.
+    flows: per-line MW from the DC power flow, None for the default loading.
+    ratings: IEEE-738 ratings (MVA) used with use_ieee."""
     wind_ms = (wind_pct / 100.0) * 15.0
-    if cs and hasattr(cs, "compute_stress"):
-        try:
-            out = cs.compute_stress(df_lines.copy(), temp_c, wind_ms)
-        except Exception as e:
-            st.warning(f"compute_stress failed: {e}")
-            out = df_lines.copy()
-            out["stress"] = 0
-    else:
-        out = df_lines.copy()
-        out["stress"] = 0
-
-    def stress_color(s):
-        if s > 100: return "#8B0000"
-        elif s > 90: return "#FF0000"
-        elif s > 70: return "#FFA500"
-        elif s > 50: return "#FFFF00"
-        else: return "#00FF00"
-    out["color"] = out["stress"].apply(stress_color)
-    return out[["name", "stress", "color"]]
+    stress = None
+    if use_ieee:
+        stress = ieee_stress(df_lines, ratings, flows)
+    elif cs and hasattr(cs, "stress_kernel"):
+        # errors propagate: the result is shared, each session shows its own warning
+        stress = cs.stress_kernel(cs.line_statics(df_lines), temp_c, wind_ms, flows).stress
+    if stress is None:
+        stress = np.zeros(len(df_lines))
+
+    if not cs:
+        return stress, np.full(len(stress), "#00FF00")
+    # colour from the same stress the widths and alerts use
+    return stress, cs.STRESS_COLORS[cs.stress_class(stress)]
+
+# Alerts raise above 90% stress and clear at or below 88% (hysteresis)
+ALERT_RAISE_AT = 90.0
+ALERT_CLEAR_AT = 88.0
+GEOJSON_PATH = "data/gis/oneline_lines.geojson"
+# Optional local station readings: name, lon, lat, temp_c, wind_ms[, wind_from_deg]
+STATIONS_PATH = os.environ.get("WEATHER_STATIONS", "data/csv/stations.csv")
+# Lines listed in the Monte Carlo table
+MC_SHOW = 10
+# Worst N-1 overloads listed in the Alert Hub
+N1_SHOW = 5
+# Lines with the least headroom listed, and the stress (%) it is measured to
+HEADROOM_SHOW = 5
+HEADROOM_AT = 100.0
+# Refresh period of the live telemetry panel (s)
+TELEMETRY_REFRESH = 1.0
+# How often a pending weather import checks for the forecast (s)
+WEATHER_POLL = 0.5
+# Memory for cached map frames
+FRAME_CACHE_MB = 32
+BACKGROUND_PATH = "data/gis/honolulu.jpg"
+
+# Once the user has imported the weather (or with WEATHER_PREFETCH set), keep
+# the forecast fresh in the background so later imports don't wait for it.
+# Until then the app doesn't contact the weather service.
+if st.session_state.get("weather_used") or os.environ.get("WEATHER_PREFETCH", "") not in ("", "0"):
+    try:
+        get_weather_provider().prefetch()
+    except Exception:
+        pass
+
+# Reruns the page once a weather import's fetch is done
+@st.fragment(run_every=WEATHER_POLL)
+def weather_poll():
+    st.caption("Fetching the forecast…")
+    if not get_weather_provider().pending():
+        st.rerun()
 
 # Session State
 if "temp" not in st.session_state: st.session_state["temp"] = 27.0
 if "wind" not in st.session_state: st.session_state["wind"] = 50.0
+# the sliders take their value from their keys, so an import can move them
+if "temp_slider" not in st.session_state: st.session_state["temp_slider"] = st.session_state["temp"]
+if "wind_slider" not in st.session_state: st.session_state["wind_slider"] = st.session_state["wind"]
 
 # Layout
 left, right = st.columns([0.35, 0.65])
@@ -128,57 +358,224 @@ with left:
     st.markdown("## 🌤️ Controls")
 
     if st.button("☀️ Import Current Hawaii Weather", use_container_width=True):
-        temp_now, wind_now = get_hawaii_weather()
-        if temp_now is not None:
-            st.session_state["temp"], st.session_state["wind"] = temp_now, wind_now
-            st.rerun()
-
-    temp = st.slider("Temperature (°C)", 10.0, 75.0, st.session_state["temp"], key="temp_slider")
-    wind = st.slider("Wind Intensity (%)", 0.0, 100.0, st.session_state["wind"], key="wind_slider")
+        st.session_state["weather_import"] = st.session_state["weather_used"] = True
+    if st.session_state.get("weather_import"):
+        import_hawaii_weather()
+    elif "weather_note" in st.session_state:
+        st.caption(st.session_state["weather_note"])
+
+    use_stations = os.path.exists(STATIONS_PATH) and os.path.exists(GEOJSON_PATH) and st.checkbox(
+        "Local station readings", value=False,
+        help="Interpolates the station file to every line span (or line midpoint without geometry) "
+             "in place of the temperature / wind sliders.")
+    temp = st.slider("Temperature (°C)", 10.0, 75.0, key="temp_slider", disabled=use_stations)
+    wind = st.slider("Wind Intensity (%)", 0.0, 100.0, key="wind_slider", disabled=use_stations)
     st.session_state["temp"], st.session_state["wind"] = temp, wind
+    wind_dir = st.slider("Wind Direction (° from N)", 0, 359, 68, step=1,
+                         help="Sets the wind angle of every line span for the per-span IEEE-738 ratings "
+                              "(default: trade winds).")
+    stress_models = {"Simplified": None, "IEEE-738 per span": "spans"}
+    if load_rating_surface is not None:
+        stress_models["IEEE-738 precomputed surface"] = "surface"
+    stress_model = stress_models[st.radio(
+        "Line stress model", list(stress_models), index=0,
+        help="Per span: every line at its weakest span with the wind direction (lines without "
+             "geometry in one batched call).  Precomputed surface: every line interpolated from a "
+             "cached rating grid built from lib/ieee738 (max error ~1%, default wind angle), "
+             "so moving a slider is a lookup.")]
+    use_ieee, use_surface = stress_model is not None, stress_model == "surface"
+    use_power_flow = st.checkbox(
+        "DC power flow from bus loads", value=False,
+        help="Line flows from a DC power flow of the bus loads (Pd), with the PV/Slack dispatch "
+             "fitted to the nominal flows.")
+    load_scale = st.slider("Load Scaling (%)", 50, 150, 100, step=5, disabled=not use_power_flow,
+                           help="Scales the bus loads of the DC power flow.")
+    telemetry = None
+    if any(telemetry_source()):
+        telemetry = get_telemetry(*telemetry_source())
+    use_telemetry = telemetry is not None and st.checkbox(
+        "Live telemetry flows", value=False,
+        help="Colors the map with the latest flows from the telemetry feed (TELEMETRY_SOCKET / TELEMETRY_FILE).")
 
 # ───────────────────────────────
 # Load and compute reactively
 # ───────────────────────────────
-buses = csv_try(["data/csv/buses.csv"])
-lines = csv_try(["data/csv/lines.csv"])
-lines = lines.rename(columns={"bus0": "bus_a", "bus1": "bus_b"})
-lines["bus_a"] = lines["bus_a"].astype(str)
-lines["bus_b"] = lines["bus_b"].astype(str)
-buses["name"] = buses["name"].astype(str)
-
-# Update line stresses
-edge_states = compute_edge_states(lines, st.session_state["temp"], st.session_state["wind"])
-lines_plot = lines.merge(edge_states, on="name", how="left")
-
-incident = pd.concat([
-    lines_plot[["bus_a", "name"]].rename(columns={"bus_a": "bus"}),
-    lines_plot[["bus_b", "name"]].rename(columns={"bus_b": "bus"})
-]).merge(edge_states, on="name", how="left")
-
-node_stress = incident.groupby("bus")["stress"].max().rename("node_stress").reset_index()
-buses_plot = buses.merge(node_stress, left_on="name", right_on="bus", how="left").fillna({"node_stress": 0.0})
-buses_plot["node_color"] = buses_plot["node_stress"].apply(
-    lambda s: "#00FF00" if s < 60 else "#FFA500" if s < 90 else "#FF0000"
-)
+# Static inputs are parsed once per process and shared by every session
+network = dc.load_network("data/csv/buses.csv", "data/csv/lines.csv")
+buses, lines = network.buses, network.lines
+
+# Update line stresses.  Load scaling reuses the cached power flow solve.
+flows, flow_source = None, ("nominal",)
+if use_power_flow:
+    flows = get_power_flow("data/csv/buses.csv", "data/csv/lines.csv").scaled_flows(load_scale / 100.0)
+    flow_source = ("dc", load_scale)
+if use_telemetry:
+    live = telemetry.ingestor.latest()
+    flows, flow_source = live.flows, ("telemetry", live.version)
+# IEEE-738 ratings at the current weather, for the map (IEEE mode) and N-1
+try:
+    ratings = line_ratings(st.session_state["temp"], st.session_state["wind"], wind_dir, use_stations, use_surface)
+except Exception as e:
+    ratings = None
+    st.warning(f"IEEE-738 ratings failed: {e}")
+# Shared by every session: identical (quantized) conditions are computed once
+if use_ieee:
+    edge_tag = ("ieee",) + ratings_tag(wind_dir, use_stations, use_surface)
+    edge_fn = lambda t, w, f: compute_edge_states(
+        lines, t, w, True, f, line_ratings(t, w, wind_dir, use_stations, use_surface))
+elif use_stations:
+    # station weather at each line midpoint instead of the sliders
+    line_amb = station_ambient("line")
+    edge_tag = ("compute_stress", data_version(), "stations", stations_version())
+    edge_fn = lambda t, w, f: compute_edge_states(lines, line_amb.temp_c, line_amb.wind_ms / 15.0 * 100.0, False, f)
+else:
+    edge_tag = ("compute_stress", data_version())
+    edge_fn = lambda t, w, f: compute_edge_states(lines, t, w, False, f)
+try:
+    stress, color = get_engine().evaluate(edge_fn, st.session_state["temp"], st.session_state["wind"], flows,
+                                          tag=edge_tag)
+except Exception as e:
+    st.warning(f"Line stress failed: {e}")
+    stress = np.zeros(len(lines))
+    color = np.full(len(lines), "#00FF00")
+lines_plot = lines.assign(stress=stress, color=color)
+
+# Bus color from the worst incident line, aligned with buses
+node_stress = get_topology("data/csv/buses.csv", "data/csv/lines.csv").reduce(stress, "max")
+node_color = np.array(["#00FF00", "#FFA500", "#FF0000"])[
+    np.searchsorted([60.0, 90.0], node_stress, side="right")]
 
 # Alerts hub
 with left:
     st.markdown("### ⚠️ Alert Hub")
-    critical_lines = lines_plot[lines_plot["color"].isin(["#FF0000", "#8B0000"])]
-
-    if critical_lines.empty:
+    # One engine per session: it remembers which alerts that session has seen
+    alerts = st.session_state.get("alert_engine")
+    if alerts is None or alerts.labels.shape[0] != len(lines):
+        alerts = st.session_state["alert_engine"] = AlertEngine.from_network(
+            network, raise_at=ALERT_RAISE_AT, clear_at=ALERT_CLEAR_AT)
+    diff = alerts.update(stress)
+    active = alerts.active_lines()
+    raised = set(diff.raised.tolist())
+
+    if len(active) == 0:
         st.markdown("<div style='color:#00FF00;font-weight:600;'>✅ No current alerts detected.</div>", unsafe_allow_html=True)
     else:
-        for _, row in critical_lines.iterrows():
-            bus_a, bus_b = str(row.get("bus_a", "?")), str(row.get("bus_b", "?"))
-            name_a = buses.loc[buses["name"] == bus_a, "BusName"].iloc[0] if "BusName" in buses.columns and (buses["name"] == bus_a).any() else bus_a
-            name_b = buses.loc[buses["name"] == bus_b, "BusName"].iloc[0] if "BusName" in buses.columns and (buses["name"] == bus_b).any() else bus_b
-
+        for i, label in zip(active, alerts.messages(active)):
+            new_tag = " <span class='small'>(new)</span>" if i in raised else ""
             st.markdown(
-                f"<div style='color:#FF0000;font-weight:600;'>🚨 {name_a} ↔ {name_b} — Critical Alert</div>",
+                f"<div style='color:#FF0000;font-weight:600;'>🚨 {label} — Critical Alert{new_tag}</div>",
                 unsafe_allow_html=True
             )
+    for label in alerts.messages(diff.cleared):
+        st.markdown(f"<div class='small'>✅ Cleared: {label}</div>", unsafe_allow_html=True)
+
+    # N-1: worst single outage per line, the map's flows against the IEEE-738 ratings
+    st.markdown("#### N-1 Contingencies")
+    try:
+        if ratings is None:
+            raise ValueError("no IEEE-738 ratings")
+        n1 = get_contingency("data/csv/buses.csv", "data/csv/lines.csv").screen(
+            np.nan_to_num(flows if flows is not None else nominal_flows(lines)), ratings)
+        over = np.flatnonzero((n1.worst_loading > 100) & (n1.worst_outage >= 0))
+        over = over[np.argsort(-n1.worst_loading[over])]
+        if len(over) == 0:
+            st.markdown("<div class='small'>✅ No line overloads after any single outage.</div>", unsafe_allow_html=True)
+        for i in over[:N1_SHOW]:
+            st.markdown(
+                f"<div style='color:#FFA500;font-weight:600;'>⚡ {alerts.labels[i]} — "
+                f"{n1.worst_loading[i]:.0f}% if {alerts.labels[n1.worst_outage[i]]} "
+                f"({lines['name'].iat[n1.worst_outage[i]]}) trips</div>",
+                unsafe_allow_html=True)
+        if len(over) > N1_SHOW:
+            st.caption(f"+{len(over) - N1_SHOW} more lines overloaded under N-1")
+    except Exception as e:
+        st.warning(f"Contingency screening failed: {e}")
+
+# Live telemetry: the panel refreshes on its own, without rerunning the page.
+# The published flows are rated like the map (same model, weather and cache
+# entries); the session's own AlertEngine tracks the live alerts.
+@st.fragment(run_every=TELEMETRY_REFRESH)
+def telemetry_panel(ingestor, edge_fn, edge_tag, temp, wind):
+    live, m = ingestor.latest(), ingestor.metrics()
+    live_stress, _ = get_engine().evaluate(edge_fn, temp, wind, live.flows, tag=edge_tag)
+    live_alerts = st.session_state.get("live_alert_engine")
+    if live_alerts is None or live_alerts.labels.shape[0] != len(lines):
+        live_alerts = st.session_state["live_alert_engine"] = AlertEngine.from_network(
+            network, raise_at=ALERT_RAISE_AT, clear_at=ALERT_CLEAR_AT)
+    live_alerts.update(live_stress)
+    active = live_alerts.active_lines()
+    active = active[np.argsort(-live_stress[active], kind="stable")]
+    st.caption(f"Batch {live.version} · {time.strftime('%H:%M:%S', time.localtime(live.updated))} · "
+               f"{m.received} updates ({m.coalesced} coalesced, {m.rejected} rejected)")
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Queue depth", m.queue_depth, help=f"max {m.max_queue_depth}, producer waits {m.blocked}")
+    c2.metric("Latency p50", f"{m.latency_p50_ms:.0f} ms", help="update received -> flows published")
+    c3.metric("Latency p99", f"{m.latency_p99_ms:.0f} ms")
+    if len(active) == 0:
+        st.markdown("<div class='small'>✅ No live alerts.</div>", unsafe_allow_html=True)
+    for i in active[:N1_SHOW]:
+        st.markdown(f"<div style='color:#FF0000;font-weight:600;'>📡 {live_alerts.labels[i]} — "
+                    f"{live_stress[i]:.0f}%</div>", unsafe_allow_html=True)
+    if len(active) > N1_SHOW:
+        st.caption(f"+{len(active) - N1_SHOW} more live alerts")
+
+if telemetry is not None:
+    with left:
+        with st.expander("📡 Live Telemetry", expanded=True):
+            try:
+                telemetry_panel(telemetry.ingestor, edge_fn, edge_tag,
+                                st.session_state["temp"], st.session_state["wind"])
+            except Exception as e:
+                st.warning(f"Telemetry failed: {e}")
+
+# Headroom: how much hotter / calmer before each line reaches 100%
+with left:
+    with st.expander("📏 Headroom to 100%"):
+        try:
+            hr = get_headroom(stress_model, wind_dir if stress_model == "spans" else None,
+                              flow_source + (data_version(), file_version(GEOJSON_PATH)), flows)
+            wind_ms_now = st.session_state["wind"] / 100.0 * 15.0
+            d_temp, d_wind = hr.margins(st.session_state["temp"], wind_ms_now, HEADROOM_AT)
+            order = np.argsort(d_temp, kind="stable")[:HEADROOM_SHOW]
+            fmt = lambda v, unit: "over" if v < 0 else ("—" if np.isinf(v) else f"{v:.1f} {unit}")
+            per_deg, per_ms = rating_sensitivity_mva(lines.iloc[order], st.session_state["temp"], wind_ms_now)
+            st.dataframe(pd.DataFrame({
+                "Line": alerts.labels[order],
+                "Temp margin": [fmt(v, "°C") for v in d_temp[order]],
+                "Wind margin": [fmt(v, "m/s") for v in d_wind[order]],
+                "MVA per °C": np.round(per_deg, 2),
+                "MVA per m/s": np.round(per_ms, 2),
+            }), hide_index=True, use_container_width=True)
+            st.caption("Margins at the current sliders; MVA columns are the IEEE-738 rating change "
+                       "for one more °C or m/s of wind; — means the line stays below 100% "
+                       f"over the whole {hr.temp_grid[0]:.0f}–{hr.temp_grid[-1]:.0f} °C / "
+                       f"{hr.wind_grid[0]:.0f}–{hr.wind_grid[-1]:.0f} m/s range.")
+            if use_stations:
+                st.caption("Headroom is for uniform weather at the sliders, not the station readings.")
+        except Exception as e:
+            st.warning(f"Headroom failed: {e}")
+
+# Probabilistic ratings
+with left:
+    with st.expander("🎲 Forecast Uncertainty (Monte Carlo)"):
+        mc_samples = st.select_slider("Scenarios", [500, 1000, 2000, 5000], value=2000)
+        mc_seed = st.number_input("Seed", 0, 2**31 - 1, 0, step=1)
+        if st.checkbox("Run Monte Carlo", value=False):
+            try:
+                mc = monte_carlo_table(st.session_state["temp"], st.session_state["wind"] / 100.0 * 15.0,
+                                       wind_dir, mc_samples, int(mc_seed),
+                                       tuple(flows) if flows is not None else None)
+                labels = dict(zip(lines["name"], alerts.labels))
+                mc = mc.sort_values(["p_above_100", "stress_p95"], ascending=False).head(MC_SHOW)
+                st.dataframe(pd.DataFrame({
+                    "Line": mc["name"].map(labels),
+                    "P(>100%)": (mc["p_above_100"] * 100).round(1),
+                    "P(>90%)": (mc["p_above_90"] * 100).round(1),
+                    "Stress p5/p50/p95 (%)": [f"{a*100:.0f} / {b*100:.0f} / {c*100:.0f}" for a, b, c in
+                                               mc[["stress_p5", "stress_p50", "stress_p95"]].to_numpy()],
+                }), hide_index=True, use_container_width=True)
+            except Exception as e:
+                st.warning(f"Monte Carlo failed: {e}")
 
 # Plot network
 with right:
@@ -197,36 +594,32 @@ with right:
     </div>
     """, unsafe_allow_html=True)
 
-    fig, ax = plt.subplots(figsize=(12, 8), dpi=120)
-    fig.patch.set_facecolor("#131a2e")
-    ax.set_facecolor("#131a2e")
-    ax.axis("off")
+    # The figure is built once per session; reruns only push new colors/widths
+    plot = st.session_state.get("network_plot")
+    if plot is None or plot.network is not network:
+        background = None
+        if os.path.exists(BACKGROUND_PATH):
+            background = dc.load_background(BACKGROUND_PATH)
+        else:
+            st.warning(f"Oahu background image not found: {BACKGROUND_PATH}")
+        plot = st.session_state["network_plot"] = NetworkPlot(network, background, alpha=0.35)
+
+    # Frames are cached by what they show: a rerun that doesn't change the map
+    # (or a state another session already drew) isn't drawn again
+    line_color, line_width = lines_plot["color"].to_numpy(), quantize_widths(line_widths(lines_plot["stress"]))
+    frame = get_frame_cache().get(
+        (file_version("data/csv/buses.csv", "data/csv/lines.csv", BACKGROUND_PATH),
+         frame_key(line_color, line_width, node_color)),
+        lambda: np.frombuffer(plot.render(line_color, line_width, node_color), dtype=np.uint8))
+    st.image(frame.tobytes(), use_container_width=True)
 
-    # Oahu Silhouette
-    draw_oahu_background(ax, buses, img_path="data/gis/honolulu.jpg", alpha=0.35)
-
-    b_coords = buses.set_index("name")[["x", "y"]]
-
-    def xy(bus_id):
-        try:
-            return b_coords.loc[str(bus_id)].values
-        except KeyError:
-            return None
-
-    for _, e in lines_plot.iterrows():
-        a, b = xy(e["bus_a"]), xy(e["bus_b"])
-        if a is None or b is None:
-            continue
-        color = e.get("color", "#00FF00")
-        stress = float(e.get("stress", 0.0))
-        width = max(1.8, 1.8 + 7.0 * (stress / 100.0))
-        ax.plot([a[0], b[0]], [a[1], b[1]], color=color, linewidth=width,
-                alpha=0.95, solid_capstyle="round", zorder=2)
-
-    for _, r in buses_plot.iterrows():
-        ax.scatter(r["x"], r["y"], s=220, color=r["node_color"],
-                   edgecolors="white", linewidths=1.4, zorder=3)
-        ax.text(r["x"], r["y"], str(r["name"]), fontsize=9,
-                ha="center", va="center", color="white", zorder=4)
-
-    st.pyplot(fig, use_container_width=True)
+with left:
+    if use_stations:
+        bus_amb = station_ambient("bus")
+        st.caption(f"Station field at buses: {bus_amb.temp_c.min():.1f}–{bus_amb.temp_c.max():.1f} °C, "
+                   f"{bus_amb.wind_ms.min():.1f}–{bus_amb.wind_ms.max():.1f} m/s")
+    stats = dc.cache_stats()
+    st.caption(f"Static data cache: {stats['hits']} hits · {stats['misses']} misses")
+    es = get_engine().stats()
+    st.caption(f"Rating cache: {es.hit_rate:.0%} hit rate · {es.entries} entries "
+               f"({es.bytes / 2**20:.1f} of {es.budget_bytes / 2**20:.0f} MB) · {es.evictions} evictions")
@@ -0,0 +1,54 @@
+"""Slider-move cost: evaluating the stress model vs looking up the headroom table
+
+    python benchmarks/bench_headroom.py [n_lines]
+
+For each model the table is solved once, then a slider move either reruns the
+model (direct) or classifies lines from the table (headroom).  Direct cost
+follows the model; the headroom cost is the same for both.
+"""
+import os, sys, time
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from lib.ieee738.rating_surface import SURFACE_AMBIENT
+from src.compute_stress import STRESS_BINS, stress_class
+from src.headroom import compute_stress_model, ieee_model, solve_headroom
+from synthetic import make_network
+
+MOVES = 200
+
+
+def per_move(fn, moves):
+    t = time.perf_counter()
+    for temp, wind in moves:
+        fn(temp, wind)
+    return (time.perf_counter() - t) / len(moves) * 1e3
+
+
+def main(n_lines=2000):
+    buses, lines, flows = make_network(n_lines)
+    v_kv = buses["v_nom"].to_numpy()[lines["bus0"].to_numpy() - 1]
+    rng = np.random.default_rng(0)
+    moves = np.column_stack([rng.uniform(10, 75, MOVES), rng.uniform(0, 15, MOVES)])
+    models = {
+        "compute_stress": compute_stress_model(lines),
+        "ieee738": ieee_model(lines, flows["p0_nominal"].to_numpy(), v_kv, SURFACE_AMBIENT),
+    }
+
+    print("lines=%d moves=%d" % (n_lines, MOVES))
+    print("%-15s %10s %12s %12s %10s" % ("model", "solve s", "direct ms", "headroom ms", "agree"))
+    for name, fn in models.items():
+        t = time.perf_counter()
+        table = solve_headroom(fn, STRESS_BINS)
+        solve = time.perf_counter() - t
+        direct = per_move(lambda a, b: stress_class(fn(a, b)), moves)
+        lookup = per_move(table.stress_class, moves)
+        agree = np.mean([np.mean(stress_class(fn(a, b)) == table.stress_class(a, b)) for a, b in moves[:20]])
+        print("%-15s %10.2f %12.3f %12.3f %9.4f%%" % (name, solve, direct, lookup, agree * 100))
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:2]))
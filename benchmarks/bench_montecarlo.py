@@ -0,0 +1,39 @@
+"""Monte Carlo throughput vs number of worker processes
+
+    python benchmarks/bench_montecarlo.py [n_lines] [n_samples]
+"""
+import os, sys, time
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from src.montecarlo import run_monte_carlo
+from src.stress_model import line_conductor_params
+from synthetic import make_network
+
+
+def main(n_lines=20000, n_samples=2000):
+    buses, lines, flows = make_network(n_lines)
+    cond, _ = line_conductor_params(lines)
+    table = pd.concat([lines[["name"]], cond], axis=1)
+    table["v_nom"] = buses["v_nom"].to_numpy()[lines["bus0"].to_numpy() - 1]
+    table["flow_mva"] = flows["p0_nominal"].to_numpy()
+
+    print("lines=%d samples=%d cpus=%d" % (n_lines, n_samples, os.cpu_count()))
+    ref = None
+    for workers in sorted({1, 2, 4, os.cpu_count()}):
+        t = time.perf_counter()
+        res = run_monte_carlo(table, 30.0, 3.0, n_samples=n_samples, seed=7, workers=workers)
+        dt = time.perf_counter() - t
+        if ref is None:
+            ref = res
+        same = np.array_equal(res.stress_q, ref.stress_q) and np.array_equal(res.p_exceed, ref.p_exceed)
+        print("workers=%2d %8.2f s %12.0f line-samples/s  identical to workers=1: %s"
+              % (workers, dt, n_lines * n_samples / dt, same))
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:3]))
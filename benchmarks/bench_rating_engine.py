@@ -0,0 +1,77 @@
+"""Shared rating engine: many sessions asking for the same conditions
+
+    python benchmarks/bench_rating_engine.py [n_lines] [sessions]
+
+Every session (a thread, as in Streamlit) walks the same sequence of slider
+positions at the same time.  Without the engine each session computes every
+state; with it each distinct (quantized) state is computed once and the
+other sessions hit the cache or wait on the running computation.  A second
+run with a tiny budget shows eviction.
+"""
+import os, sys, threading, time
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from src.compute_stress import STRESS_COLORS, line_statics, stress_class, stress_kernel
+from src.rating_engine import RatingEngine
+from synthetic import make_network
+
+POSITIONS = 40
+
+
+def run_sessions(n_sessions, request):
+    """Wall time for n_sessions threads each making every request"""
+    rng = np.random.default_rng(0)
+    moves = list(zip(rng.uniform(10, 75, POSITIONS), rng.uniform(0, 100, POSITIONS)))
+    start = threading.Barrier(n_sessions)
+
+    def session():
+        start.wait()
+        for temp, wind in moves:
+            request(temp, wind)
+    threads = [threading.Thread(target=session) for _ in range(n_sessions)]
+    t = time.perf_counter()
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    return time.perf_counter() - t
+
+
+def main(n_lines=20000, n_sessions=10):
+    _, lines, flows = make_network(n_lines)
+    statics = line_statics(lines)
+    calls = [0]
+
+    def compute(temp, wind_pct, flows=None):
+        calls[0] += 1
+        stress = stress_kernel(statics, temp, wind_pct / 100.0 * 15.0, flows).stress
+        return stress, STRESS_COLORS[stress_class(stress)]
+
+    print("lines=%d sessions=%d positions=%d" % (n_lines, n_sessions, POSITIONS))
+    for sessions in (1, n_sessions):
+        calls[0] = 0
+        dt = run_sessions(sessions, compute)
+        print("no engine   sessions %3d  %7.3f s  computations %5d" % (sessions, dt, calls[0]))
+
+        for budget in (64 * 2**20, 4 * result_size(compute)):
+            engine = RatingEngine(budget_bytes=budget)
+            calls[0] = 0
+            dt = run_sessions(sessions, lambda t, w: engine.evaluate(compute, t, w))
+            s = engine.stats()
+            print("engine %5.1f MB sessions %3d  %7.3f s  computations %5d  hits %5d  coalesced %5d"
+                  "  hit rate %5.1f%%  evictions %4d  entries %4d"
+                  % (budget / 2**20, sessions, dt, calls[0], s.hits, s.coalesced, s.hit_rate * 100,
+                     s.evictions, s.entries))
+
+
+def result_size(compute):
+    from src.rating_engine import ENTRY_OVERHEAD, result_bytes
+    return result_bytes(compute(30.0, 50.0)) + ENTRY_OVERHEAD
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:3]))
@@ -0,0 +1,69 @@
+"""Transient engine vs a naive per-line loop over Conductor objects
+
+    python benchmarks/bench_transient.py [n_lines] [n_steps]
+"""
+import os, sys, time
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from lib.ieee738.conductors import AMBIENT_DEFAULTS
+from lib.ieee738.ieee738 import Conductor, ConductorParams
+from lib.ieee738.transient import heat_capacity, simulate
+
+DT = 10.0
+
+
+def make_params(n, seed=0):
+    rng = np.random.default_rng(seed)
+    p = dict(AMBIENT_DEFAULTS, Ta=40.0, TLo=25.0, THi=50.0, Tc=100.0,
+             Diameter=rng.uniform(0.5, 1.2, n), RLo=rng.uniform(1.5e-5, 4e-5, n),
+             HeatCapacity=heat_capacity(0.7463, 0.3479))
+    p['RHi'] = p['RLo'] * 1.1
+    return p
+
+
+def naive(params, current, n_steps, Tc0):
+    """One Conductor per line, one Python step at a time"""
+    n = len(params['Diameter'])
+    out = np.empty(n)
+    for i in range(n):
+        row = {k: (v[i] if isinstance(v, np.ndarray) else v) for k, v in params.items()
+               if k != 'HeatCapacity'}
+        c = Conductor(ConductorParams(**row))
+        qs = c.solar_heat_gain()
+        Tc = Tc0
+        for _ in range(n_steps):
+            c.Tc = Tc
+            dT = (qs + current**2 * c.get_res_Tc() - c.convection_heat_loss()
+                  - c.radiated_heat_loss()) / params['HeatCapacity']
+            Tc += DT * dT
+        out[i] = Tc
+    return out
+
+
+def main(n_lines=5000, n_steps=360):
+    params = make_params(n_lines)
+    Tc0 = 60.0
+
+    t = time.perf_counter()
+    vec = simulate(params, 1200.0, n_steps*DT, DT, Tc0=Tc0, record=False).Tc
+    t_vec = time.perf_counter() - t
+
+    n_naive = min(n_lines, 20)
+    sub = {k: (v[:n_naive] if isinstance(v, np.ndarray) else v) for k, v in params.items()}
+    t = time.perf_counter()
+    ref = naive(sub, 1200.0, n_steps, Tc0)
+    t_naive = (time.perf_counter() - t) * n_lines / n_naive
+
+    print("lines=%d steps=%d" % (n_lines, n_steps))
+    print("vectorized: %8.3f s" % t_vec)
+    print("naive loop: %8.3f s (extrapolated from %d lines)" % (t_naive, n_naive))
+    print("speedup:    %8.0fx" % (t_naive / t_vec))
+    print("max |diff| on the naive subset: %.2e degC" % np.max(np.abs(vec[:n_naive] - ref)))
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:3]))
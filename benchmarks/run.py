@@ -0,0 +1,191 @@
+"""Benchmark suite for the hot paths, on synthetic networks
+
+    python benchmarks/run.py [--sizes 37 1000 10000 100000] [--only NAME ...]
+                             [--repeat 5] [--out results.json]
+                             [--compare baseline.json] [--threshold 0.1]
+
+Every benchmark runs once to warm up (caches, imports), then `repeat` timed
+runs, then one more run under tracemalloc for the peak memory.  Results go to
+a JSON file; with --compare the median latency of each (benchmark, size) is
+checked against a saved results file and the exit code is 1 if anything got
+slower than the threshold.
+"""
+import argparse, json, os, platform, sys, tempfile, time, tracemalloc
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from synthetic import SIZES, write_network
+
+# the scalar path is ~1e4 lines/s, so it is timed on a sample
+SCALAR_SAMPLE = 2000
+
+
+def bench_scalar_rating(net, data_dir):
+    from lib.ieee738.conductors import AMBIENT_DEFAULTS
+    from lib.ieee738.ieee738 import Conductor, ConductorParams
+    from src.stress_model import line_conductor_params
+    cond, _ = line_conductor_params(net.lines.head(SCALAR_SAMPLE))
+    rows = cond.to_dict("records")
+
+    def run():
+        return [Conductor(ConductorParams(**AMBIENT_DEFAULTS, **row)).steady_state_thermal_rating()
+                for row in rows]
+    return run, len(rows)
+
+
+def bench_compute_stress(net, data_dir):
+    from src.compute_stress import compute_stress
+    return (lambda: compute_stress(net.lines, 30.0, 5.0)), len(net.lines)
+
+
+def bench_compute_line_stress(net, data_dir):
+    from lib.ieee738.conductors import AMBIENT_DEFAULTS
+    from src import data_cache as dc
+    from src.stress_model import compute_line_stress
+    flows = dc.load_flows(os.path.join(data_dir, "line_flows_nominal.csv"))
+    lines = net.lines.assign(v_nom=net.line_kv, p0_nominal=net.lines["name"].map(flows).to_numpy())
+    env = dict(AMBIENT_DEFAULTS, Ta=30.0, WindVelocity=5.0)
+    return (lambda: compute_line_stress(lines, env)), len(lines)
+
+
+def node_stress(lines_plot, buses):
+    """Per-bus max stress with pandas concat/merge/groupby (the app before src.topology)"""
+    import pandas as pd
+    edge_states = lines_plot[["name", "stress", "color"]]
+    incident = pd.concat([
+        lines_plot[["bus_a", "name"]].rename(columns={"bus_a": "bus"}),
+        lines_plot[["bus_b", "name"]].rename(columns={"bus_b": "bus"})
+    ]).merge(edge_states, on="name", how="left")
+    node = incident.groupby("bus")["stress"].max().rename("node_stress").reset_index()
+    return buses.merge(node, left_on="name", right_on="bus", how="left").fillna({"node_stress": 0.0})
+
+
+def bench_node_aggregation(net, data_dir):
+    """Per-bus max stress, as app.py computes it"""
+    from src.topology import Topology
+    topo = Topology.from_network(net)
+    stress = np.random.default_rng(0).uniform(0, 120, len(net.lines))
+    out = np.empty(topo.n_bus)
+    return (lambda: topo.reduce(stress, "max", out=out)), len(net.lines)
+
+
+def bench_node_aggregation_pandas(net, data_dir):
+    rng = np.random.default_rng(0)
+    lines_plot = net.lines.assign(stress=rng.uniform(0, 120, len(net.lines)), color="#00FF00")
+    return (lambda: node_stress(lines_plot, net.buses)), len(net.lines)
+
+
+def bench_plot(net, data_dir):
+    """NetworkPlot frame render: what the app draws when the frame isn't cached"""
+    from src.network_plot import NetworkPlot, line_widths
+    plot = NetworkPlot(net)
+    rng = np.random.default_rng(0)
+    stress = rng.uniform(0, 120, len(net.lines))
+    colors = np.where(stress > 90, "#FF0000", "#00FF00")
+    node_colors = np.full(len(net.buses), "#00FF00")
+
+    def run():
+        return plot.render(colors, line_widths(stress), node_colors)
+    return run, len(net.lines)
+
+
+BENCHMARKS = {
+    "scalar_rating": bench_scalar_rating,
+    "compute_stress": bench_compute_stress,
+    "compute_line_stress": bench_compute_line_stress,
+    "node_aggregation": bench_node_aggregation,
+    "node_aggregation_pandas": bench_node_aggregation_pandas,
+    "plot": bench_plot,
+}
+
+
+def measure(fn, n_items, repeat):
+    fn()                                            # warm up
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    ms = np.array(times) * 1e3
+    p50 = float(np.percentile(ms, 50))
+    return {
+        "n_items": n_items, "repeat": repeat,
+        "p50_ms": p50, "p90_ms": float(np.percentile(ms, 90)), "p99_ms": float(np.percentile(ms, 99)),
+        "mean_ms": float(ms.mean()), "min_ms": float(ms.min()),
+        "throughput_per_s": n_items / (p50 / 1e3) if p50 > 0 else float("inf"),
+        "peak_mem_mb": peak / 2**20,
+    }
+
+
+def run_suite(sizes, names, repeat, workdir):
+    from src import data_cache as dc
+    results = []
+    for size in sizes:
+        path = write_network(size, os.path.join(workdir, str(size)))
+        net = dc.load_network(os.path.join(path, "buses.csv"), os.path.join(path, "lines.csv"))
+        for name in names:
+            fn, n_items = BENCHMARKS[name](net, path)
+            res = dict(name=name, size=size, **measure(fn, n_items, repeat))
+            results.append(res)
+            print("%-24s %7d lines  p50 %10.2f ms  p99 %10.2f ms  %12.0f /s  peak %8.1f MB"
+                  % (name, size, res["p50_ms"], res["p99_ms"], res["throughput_per_s"], res["peak_mem_mb"]))
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Print p50 ratios against a baseline; returns the regressions"""
+    base = {(r["name"], r["size"]): r for r in baseline["results"]}
+    regressions = []
+    print("\n%-24s %7s %12s %12s %8s" % ("benchmark", "lines", "base p50", "new p50", "ratio"))
+    for r in results:
+        b = base.get((r["name"], r["size"]))
+        if b is None:
+            continue
+        ratio = r["p50_ms"] / b["p50_ms"] if b["p50_ms"] > 0 else float("inf")
+        flag = "  REGRESSION" if ratio > 1 + threshold else ""
+        print("%-24s %7d %10.2f ms %10.2f ms %7.2fx%s" % (r["name"], r["size"], b["p50_ms"], r["p50_ms"], ratio, flag))
+        if flag:
+            regressions.append(dict(name=r["name"], size=r["size"], ratio=ratio))
+    return regressions
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    ap.add_argument("--only", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--out", default="bench_results.json")
+    ap.add_argument("--compare", help="baseline results file")
+    ap.add_argument("--threshold", type=float, default=0.1, help="allowed p50 slowdown (0.1 = 10%%)")
+    args = ap.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        results = run_suite(args.sizes, args.only, args.repeat, workdir)
+    doc = {
+        "meta": {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+                 "numpy": np.__version__, "platform": platform.platform(), "cpus": os.cpu_count()},
+        "results": results,
+    }
+    with open(args.out, "w") as f:
+        json.dump(doc, f, indent=2)
+    print("results written to", args.out)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print("%d regression(s) above %.0f%%" % (len(regressions), args.threshold * 100))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
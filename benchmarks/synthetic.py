@@ -0,0 +1,89 @@
+"""Synthetic networks shaped like data/csv/buses.csv and lines.csv
+
+    python benchmarks/synthetic.py n_lines out_dir
+
+Buses are scattered over the Oahu bounding box.  Lines form a spanning tree
+over the buses plus ties between near neighbours, so the network is connected
+and meshed (about 2 lines per bus).  Conductors, MOT and s_nom come from the
+conductor library, so the IEEE-738 paths see realistic parameters.
+"""
+import os, sys
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from lib.ieee738.calculate_nominal import RatingIndex, rating_table
+
+# the sizes the suite runs at, in lines
+SIZES = (37, 1000, 10000, 100000)
+
+LON = (-158.28, -157.65)
+LAT = (21.25, 21.71)
+
+
+def make_network(n_lines, seed=0):
+    """(buses, lines, flows) DataFrames with n_lines lines"""
+    rng = np.random.default_rng(seed)
+    n_bus = max(2, n_lines // 2)
+    x = rng.uniform(*LON, n_bus)
+    y = rng.uniform(*LAT, n_bus)
+    v_nom = np.where(rng.random(n_bus) < 0.25, 138.0, 69.0)
+    control = np.where(rng.random(n_bus) < 0.2, "PV", "PQ").astype(object)
+    control[0] = "Slack"
+    buses = pd.DataFrame({
+        "name": np.arange(1, n_bus + 1), "v_nom": v_nom, "x": x, "y": y,
+        "v_mag_pu_set": 1.0, "v_mag_pu_min": 0.9, "v_mag_pu_max": 1.1, "control": control,
+        "Pd": np.where(control == "PQ", rng.uniform(0, 70, n_bus), 0.0), "Qd": 0.0,
+        "Gs": 0.0, "Bs": 0.0, "area": 1.0, "v_ang_set": 0.0, "zone": 1.0,
+        "BusName": ["BUS{}".format(i) for i in range(1, n_bus + 1)],
+    })
+
+    # spanning tree: every bus links to one earlier bus, preferring one nearby
+    order = np.argsort(x)
+    child = order[1:]
+    parent = order[np.maximum(0, np.arange(1, n_bus) - rng.integers(1, 4, n_bus - 1))]
+    n_tie = max(0, n_lines - len(child))
+    a = rng.integers(0, n_bus, n_tie)
+    b = order[np.clip(np.searchsorted(x[order], x[a]) + rng.integers(-5, 6, n_tie), 0, n_bus - 1)]
+    b = np.where(b == a, order[(np.searchsorted(x[order], x[a]) + 1) % n_bus], b)
+    bus0 = np.r_[parent, a][:n_lines]
+    bus1 = np.r_[child, b][:n_lines]
+
+    library = rating_table()
+    names = library["ConductorName"].unique()
+    conductor = rng.choice(names, n_lines)
+    MOT = rng.choice([75, 80, 85, 90, 95], n_lines)
+    kv = v_nom[bus0]
+    rated = library.set_index(["ConductorName", "MOT"])
+    amps = rated["RatingAmps"].reindex(pd.MultiIndex.from_arrays([conductor, MOT])).to_numpy()
+    s_nom = np.floor(3**0.5 * amps * kv * 1e-3).astype(int)
+
+    km = np.hypot((x[bus0] - x[bus1]) * 103.6, (y[bus0] - y[bus1]) * 111.0) + 0.5
+    lines = pd.DataFrame({
+        "name": ["L{}".format(i) for i in range(n_lines)],
+        "bus0": bus0 + 1, "bus1": bus1 + 1, "ckt": 1,
+        "branch_name": ["BUS{} TO BUS{}".format(p + 1, q + 1) for p, q in zip(bus0, bus1)],
+        "bus0_name": buses["BusName"].to_numpy()[bus0], "bus1_name": buses["BusName"].to_numpy()[bus1],
+        "x": 0.4 * km, "r": 0.15 * km, "b": 3e-6 * km, "s_nom": s_nom,
+        "conductor": conductor, "MOT": MOT, "v_ang_min": 0.0, "v_ang_max": 0.0,
+        "status": 1.0, "original_index": np.arange(n_lines),
+    })
+    flows = pd.DataFrame({"name": lines["name"], "p0_nominal": s_nom * rng.uniform(0.1, 0.9, n_lines)})
+    return buses, lines, flows
+
+
+def write_network(n_lines, out_dir, seed=0):
+    """Write buses.csv, lines.csv and line_flows_nominal.csv to out_dir"""
+    buses, lines, flows = make_network(n_lines, seed)
+    os.makedirs(out_dir, exist_ok=True)
+    buses.to_csv(os.path.join(out_dir, "buses.csv"), index=False)
+    lines.to_csv(os.path.join(out_dir, "lines.csv"), index=False)
+    flows.to_csv(os.path.join(out_dir, "line_flows_nominal.csv"), index=False)
+    return out_dir
+
+
+if __name__ == '__main__':
+    write_network(int(sys.argv[1]), sys.argv[2])
@@ -1,55 +1,203 @@
-"""Calcualte the nominal ratings of all the conductors in the conductor_library.csv
-Create the output file conductor_ratings.csv
+"""Nominal ratings of every conductor in conductor_library.csv
 
-I'm using this to infer the conductor from the existing case rating 
+Builds the MOT x voltage x ambient rating table with the vectorized engine,
+split across a process pool for large libraries, and writes the nominal case
+to conductor_ratings.csv.  RatingIndex sorts the table by (MOT, kV, MVA) so
+the conductor that best explains a line's case rating (s_nom) is found by
+binary search; infer_conductors() does that for a whole lines table at once.
+
+    python -m lib.ieee738.calculate_nominal
 """
-import ieee738
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
-from ieee738 import Conductor
-from ieee738 import ConductorParams
-import pdb
-
-ambient_defaults = {
-    'Ta': 25,
-    'WindVelocity': 2.0, 
-    'WindAngleDeg': 90,
-    'SunTime': 12,
-    'Elevation': 1000,
-    'Latitude': 27,
-    'SunTime': 12,
-    'Emissivity': 0.8,
-    'Absorptivity': 0.8,
-    'Direction': 'EastWest',
-    'Atmosphere': 'Clear',
-    'Date': '12 Jun',
-    }
-
-
-df = pd.read_csv('conductor_library.csv')
-ratings = []
-for i, row in df.iterrows():
-    for MOT in (75, 80, 85, 90, 95):
-        cond = {'TLo': 25, 
-                'THi': 50, 
-                'RLo': row.RES_25C/5280,
-                'RHi': row.RES_50C/5280,
-                'Diameter': 2.0*row['CDRAD_in'], 
-                'Tc': MOT
-                }
-        cp = ConductorParams(**ambient_defaults, **cond)
-        con = Conductor(cp)
-        rating_amps = con.steady_state_thermal_rating()
-        rating_mva_69 = 3**0.5 * rating_amps * 69e3 * 1e-6
-        rating_mva_138 = 3**0.5 * rating_amps * 138e3 * 1e-6
-        
-        # Please forgive the mixed CamelCase and snake_case - some of this data comes from another 
-        # system with differen naming conventions
-        ratings.append({'ConductorName': row.ConductorName, 
-                        'MOT': MOT,
-                        'RatingAmps': int(rating_amps),
-                        'RatingMVA_69': int(rating_mva_69),
-                        'RatingMVA_138': int(rating_mva_138)})
-
-# pdb.set_trace()
-df = pd.DataFrame.from_records(ratings)
-df.to_csv('conductor_ratings.csv', index=False)
+
+from .conductors import AMBIENT_DEFAULTS, conductor_params, load_library
+from .vectorized import rate_grid
+
+MOT_VALUES = (75, 80, 85, 90, 95)
+VOLTAGES_KV = (69, 138)
+OUTPUT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'conductor_ratings.csv')
+
+# Libraries smaller than this are rated in-process
+CHUNK_ROWS = 20000
+
+
+def mva(amps, kv):
+    """3-phase MVA for a current in amps at kv"""
+    return 3**0.5 * amps * kv * 1e-3
+
+
+def _rate_chunk(args):
+    conductors, ambient = args
+    return rate_grid(conductors, ambient).rating
+
+
+def rating_table(library=None, mots=MOT_VALUES, voltages=VOLTAGES_KV, ambients=None,
+                 workers=None, chunk_rows=CHUNK_ROWS):
+    """Rating of every conductor at every MOT and ambient case
+
+    Args:
+      - library: load_library() frame (loaded if None)
+      - mots: maximum operating temperatures (degC)
+      - voltages: kV values for the RatingMVA_<kV> columns
+      - ambients: list of ambient dicts, or a DataFrame with one case per
+        row.  Missing keys come from AMBIENT_DEFAULTS.  Default: the nominal
+        case only.
+      - workers: process pool size for libraries above chunk_rows (None: CPU count)
+    Returns:
+      - DataFrame with ConductorName, MOT, Case, RatingAmps and RatingMVA_<kV>,
+        sorted by conductor, MOT and case
+    """
+    if library is None:
+        library = load_library()
+    if ambients is None:
+        ambients = [{}]
+    cases = pd.DataFrame([dict(AMBIENT_DEFAULTS, **a) for a in
+                          (ambients.to_dict('records') if isinstance(ambients, pd.DataFrame) else ambients)])
+    ambient = {k: cases[k].to_numpy() for k in cases.columns}
+
+    cond = conductor_params(library)
+    mots = np.asarray(mots, dtype=float)
+    # one row per conductor x MOT
+    rows = {k: np.repeat(cond[k].to_numpy(dtype=float), len(mots)) for k in cond.columns}
+    rows['Tc'] = np.tile(mots, len(cond))
+    n = len(rows['Tc'])
+
+    if n <= chunk_rows:
+        amps = _rate_chunk((rows, ambient))
+    else:
+        bounds = range(0, n, chunk_rows)
+        jobs = [({k: v[i:i + chunk_rows] for k, v in rows.items()}, ambient) for i in bounds]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            amps = np.concatenate(list(pool.map(_rate_chunk, jobs)))
+
+    m = len(cases)
+    out = pd.DataFrame({
+        'ConductorName': np.repeat(np.repeat(cond.index.to_numpy(), len(mots)), m),
+        'MOT': np.repeat(rows['Tc'], m),
+        'Case': np.tile(np.arange(m), n),
+        'RatingAmps': amps.ravel(),
+    })
+    for kv in voltages:
+        out['RatingMVA_{}'.format(int(kv))] = mva(out['RatingAmps'].to_numpy(), kv)
+    return out
+
+
+class RatingIndex:
+    """Ratings sorted by (MOT, kV, MVA) for nearest-rating lookups
+
+    Each (MOT, kV) pair is one group; MVA values are offset by group * span
+    so a single sorted array and np.searchsorted cover all groups.
+    """
+    def __init__(self, table, case=0):
+        table = table[table['Case'] == case] if 'Case' in table else table
+        kv_cols = [c for c in table.columns if c.startswith('RatingMVA_')]
+        self.voltages = np.array([float(c.split('_')[1]) for c in kv_cols])
+        self.mots = np.unique(table['MOT'].to_numpy(dtype=float))
+
+        names = np.tile(table['ConductorName'].to_numpy(), len(kv_cols))
+        mot = np.tile(table['MOT'].to_numpy(dtype=float), len(kv_cols))
+        kv = np.repeat(self.voltages, len(table))
+        rating = np.concatenate([table[c].to_numpy(dtype=float) for c in kv_cols])
+
+        self._span = np.nanmax(rating) * 2 + 1.0
+        key = self._key(mot, kv, rating)
+        order = np.argsort(key, kind='stable')
+        self.key, self.names, self.rating = key[order], names[order], rating[order]
+        self.group = self._group(mot, kv)[order]
+
+    def _group(self, mot, kv):
+        g_mot = np.searchsorted(self.mots, mot)
+        g_kv = np.searchsorted(np.sort(self.voltages), kv)
+        known = (g_mot < len(self.mots)) & (self.mots[np.minimum(g_mot, len(self.mots) - 1)] == mot) & \
+                np.isin(kv, self.voltages)
+        return np.where(known, g_mot * len(self.voltages) + g_kv, -1)
+
+    def _key(self, mot, kv, rating):
+        return self._group(mot, kv) * self._span + rating
+
+    def candidates(self, s_nom, MOT, kv, tol=0.05):
+        """Conductor names rated within tol (relative) of s_nom at MOT and kv"""
+        MOT, kv = np.float64(MOT), np.float64(kv)
+        if self._group(MOT, kv) < 0:
+            return self.names[:0]
+        lo = np.searchsorted(self.key, self._key(MOT, kv, s_nom * (1 - tol)))
+        hi = np.searchsorted(self.key, self._key(MOT, kv, s_nom * (1 + tol)), side='right')
+        return self.names[lo:hi]
+
+    def nearest(self, s_nom, MOT, kv):
+        """Closest rated conductor per line, vectorized
+
+        Returns:
+          - (names, rating MVA, relative error).  Lines with a MOT / kV that
+            isn't in the table get None / NaN.
+        """
+        s_nom, MOT, kv = np.broadcast_arrays(*(np.asarray(a, dtype=float) for a in (s_nom, MOT, kv)))
+        group = self._group(MOT, kv)
+        key = group * self._span + s_nom
+        pos = np.searchsorted(self.key, key)
+        left = np.clip(pos - 1, 0, len(self.key) - 1)
+        right = np.clip(pos, 0, len(self.key) - 1)
+        # a neighbour only counts if it's in the same group
+        d_left = np.where(self.group[left] == group, np.abs(self.key[left] - key), np.inf)
+        d_right = np.where(self.group[right] == group, np.abs(self.key[right] - key), np.inf)
+        best = np.where(d_right < d_left, right, left)
+        found = (group >= 0) & np.isfinite(np.minimum(d_left, d_right))
+        rating = np.where(found, self.rating[best], np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            err = (rating - s_nom) / s_nom
+        return np.where(found, self.names[best], None), rating, err
+
+
+def infer_conductors(lines_df, index=None, only_missing=True, library=None):
+    """Fill in the conductor of every line from its s_nom, MOT and v_nom
+
+    Args:
+      - lines_df: lines with s_nom, MOT, v_nom (138 kV if missing) and
+        optionally conductor
+      - index: RatingIndex (built from the nominal table if None)
+      - only_missing: keep conductors that are already in the library
+    Returns:
+      - DataFrame aligned with lines_df: conductor, inferred (bool),
+        rating_mva of that conductor, rel_error against s_nom
+    """
+    if library is None:
+        library = load_library()
+    if index is None:
+        index = RatingIndex(rating_table(library, voltages=VOLTAGES_KV))
+    n = len(lines_df)
+    kv = lines_df['v_nom'].to_numpy(dtype=float) if 'v_nom' in lines_df else np.full(n, 138.0)
+    names, rating, err = index.nearest(lines_df['s_nom'].to_numpy(dtype=float),
+                                       lines_df['MOT'].to_numpy(dtype=float), kv)
+    current = (lines_df['conductor'].astype(str).str.strip() if 'conductor' in lines_df
+               else pd.Series([''] * n)).to_numpy()
+    known = np.isin(current, library.index) if only_missing else np.zeros(n, dtype=bool)
+    return pd.DataFrame({
+        'conductor': np.where(known, current, names),
+        'inferred': ~known & pd.notna(names),
+        'rating_mva': rating,
+        'rel_error': err,
+    }, index=lines_df.index)
+
+
+def main(out_path=OUTPUT_PATH):
+    table = rating_table()
+    out = table.drop(columns='Case').round(2)
+    out['MOT'] = out['MOT'].astype(int)
+    out.to_csv(out_path, index=False)
+    print("wrote {} ratings to {}".format(len(table), out_path))
+
+    lines_path = 'data/csv/lines.csv'
+    if os.path.exists(lines_path):
+        lines = pd.read_csv(lines_path)
+        buses = pd.read_csv('data/csv/buses.csv').set_index('name')['v_nom']
+        lines['v_nom'] = lines['bus0'].map(buses)
+        guess = infer_conductors(lines, RatingIndex(table), only_missing=False)
+        same = (guess['conductor'] == lines['conductor'].str.strip()).sum()
+        print("s_nom lookup agrees with the listed conductor for {} of {} lines".format(same, len(lines)))
+
+
+if __name__ == '__main__':
+    main()
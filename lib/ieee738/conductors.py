@@ -0,0 +1,73 @@
+"""Conductor library lookups
+
+lines.csv only has a conductor name.  The resistance and diameter come from
+conductor_library.csv, converted the same way calculate_nominal.py does it.
+"""
+import hashlib
+import os
+import numpy as np
+import pandas as pd
+
+LIBRARY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'conductor_library.csv')
+
+# Ambient conditions used for the nominal ratings
+AMBIENT_DEFAULTS = {
+    'Ta': 25,
+    'WindVelocity': 2.0,
+    'WindAngleDeg': 90,
+    'Elevation': 1000,
+    'Latitude': 27,
+    'SunTime': 12,
+    'Emissivity': 0.8,
+    'Absorptivity': 0.8,
+    'Direction': 'EastWest',
+    'Atmosphere': 'Clear',
+    'Date': '12 Jun',
+}
+
+
+def load_library(path=LIBRARY_PATH):
+    """conductor_library.csv as a DataFrame indexed by ConductorName"""
+    return pd.read_csv(path).set_index('ConductorName')
+
+
+def library_hash(path=LIBRARY_PATH):
+    """sha1 of the library file.  Used to invalidate anything derived from it"""
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def conductor_params(library):
+    """Conductor part of ConductorParams for every row of the library
+
+    Returns a DataFrame (same index) with TLo, THi, RLo, RHi (ohms/ft) and
+    Diameter (in)
+    """
+    return pd.DataFrame({
+        'TLo': 25.0,
+        'THi': 50.0,
+        'RLo': library['RES_25C'] / 5280,
+        'RHi': library['RES_50C'] / 5280,
+        'Diameter': 2.0*library['CDRAD_in'],
+    }, index=library.index)
+
+
+def join_conductors(names, library=None):
+    """Look up conductor parameters for a column of conductor names
+
+    Args:
+      - names: conductor names, one per line
+      - library: result of load_library() (loaded if None)
+    Returns:
+      - (DataFrame of conductor params aligned with names, bool array of
+        names that were not found in the library)
+    """
+    if library is None:
+        library = load_library()
+    table = conductor_params(library)
+    names = pd.Index(pd.Series(names).astype(str).str.strip())
+    idx = table.index.get_indexer(names)
+    missing = idx < 0
+    out = table.iloc[np.where(missing, 0, idx)].reset_index(drop=True)
+    out.loc[missing, :] = np.nan
+    return out, missing
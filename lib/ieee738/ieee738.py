@@ -7,12 +7,13 @@ References
      
 """
 import math as m
-from datetime import datetime
 import logging
 import pdb
 from pydantic import BaseModel, Field
 from typing import Literal, Optional
 
+from . import solar
+
 logging.basicConfig(level=logging.ERROR, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 logger.info("Logging init")
@@ -222,31 +223,22 @@ class Conductor:
         """
         Get Altitude of sun (degrees).  Equation 15.
         """
-        # d = solar declination 
+        # d = solar declination
         # lat = degrees latitude
         # w = hour angle.  The number of hours from noon * 15deg
-        # Number of days into the year
-
-        year_day1 = datetime.strptime('1 Jan', "%d %b")
-        day = datetime.strptime(self.Date, "%d %b")
-        N = (day - year_day1).days
-        w = (self.SunTime-12.0) * 15.0
-        d = 23.4583*m.sin(deg2rad((284.0+N)/365.0 * 360.0))
-        lat = self.Latitude
-
-        Hc = m.asin(m.cos(deg2rad(lat))*m.cos(deg2rad(d))*m.cos(deg2rad(w)) + m.sin(deg2rad(lat))*m.sin(deg2rad(d)))
-        Hc = Hc*180.0/m.pi
+        # Date parsing and trigonometry are cached per (Date, SunTime, Latitude)
+        terms = solar.solar_terms(self.Date, self.SunTime, self.Latitude, self.Atmosphere)
+        Hc = terms.Hc
 
         logger.debug("Hc Calculation. Altitude of the sun")
         logger.debug("------------------------------------")
         logger.debug("SunTime: %s" % self.SunTime)
         logger.debug("Latitude: %s" % self.Latitude)
-        logger.debug("N (Number of days into year): %s" % N)
-        logger.debug("d (solar declination degrees): %s" % d) 
+        logger.debug("d (solar declination degrees): %s" % terms.declination)
         logger.debug("Hc: %s" % Hc)
 
-        self.solar_declination = d
-        self.hour_angle = w
+        self.solar_declination = terms.declination
+        self.hour_angle = terms.hour_angle
         return Hc
 
     def elevation_correction(self):
@@ -265,37 +257,16 @@ class Conductor:
         return Ke
 
     def get_Qs(self, Hc):
-        """Calculate Qs.  Total heat flux received by a surface at sea level 
+        """Calculate Qs.  Total heat flux received by a surface at sea level
         normal to the sun's rays
-        
-        input: 
+
+        input:
             - Hc(float): Solar Altitude Hc (degrees)
         """
-        if self.Atmosphere == 'Clear': #0
-            # Solar Heating at earch surface (W/ft^2) in clear air
-            p = [-3.9241, 
-                 5.9276, 
-                 -1.7856e-1, 
-                 3.223e-3, 
-                 -3.3549e-5, 
-                 1.8053e-7, 
-                 -3.7868e-10] 
-        elif self.Atmosphere == 'Industrial': #1
-            # Solar Heating at earch surface (W/ft^2) in industrial air
-            p = [4.9408, 
-                 1.3202, 
-                 6.1444e-2,
-                 -2.9411e-3, 
-                 5.07752e-5, 
-                 -4.03627e-7,
-                 1.22967e-9]
-        else:
+        if self.Atmosphere not in solar.QS_COEFFS:
             logger.debug("ERROR: Invalid Atmosphere %s" % self.Atmosphere)
             logger.debug("Expecting 'Clear' or 'Industrial'")
-            logger.debug()
-
-        p = p[::-1]
-        Qs = polyval(p, Hc)
+        Qs = float(solar.total_heat_flux(Hc, self.Atmosphere))
 
         logger.debug("Qs")
         logger.debug("----")
@@ -309,38 +280,10 @@ class Conductor:
         """
         Azimuth of Sun
         """
-        lat = self.Latitude
-        w = self.hour_angle
-        d = self.solar_declination
+        Zc = solar.solar_terms(self.Date, self.SunTime, self.Latitude, self.Atmosphere).Zc
         logger.debug("Zc Azimuth of Sun. Solar azimuth angle")
         logger.debug("--------------------------------------")
         logger.debug("lat: %s" % self.Latitude)
-        logger.debug("d: %s" % self.solar_declination)
-        logger.debug("w: %s" % self.hour_angle)
-
-        X = m.sin(deg2rad(w)) / (m.sin(deg2rad(lat))*m.cos(deg2rad(w)) - 
-                               m.cos(deg2rad(lat))*m.tan(deg2rad(d)) )
-        
-        logger.debug("X (solar azimuth variable): %s" % X)
-
-        # Table 3 - Solar azimuth constant C
-        if w >= -180 and w < 0:
-            if X >= 0:
-                C = 0
-            else:
-                C = 180
-        elif w >= 0 and w <= 180:
-            if X >= 0:
-                C = 180
-            else:
-                C = 360
-        else:
-            logger.debug("ERROR: I can't figure out C in the Zc calculation")
-
-        # Zc is in degrees
-        Zc = C + rad2deg(m.atan(X))
-
-        logger.debug("C (solar azimuth constant): %s" % C)
         logger.debug("Zc (degrees): %s" % Zc)
         return Zc
 
@@ -350,9 +293,11 @@ class Conductor:
         
         qs = f(Latitude, Direction(E/W vs N/S)) 
         """
-        Hc = self.get_hc()
-        Qs = self.get_Qs(Hc)
-        Zc = self.get_zc()
+        # Hc, Qs and Zc are shared by every line with the same sun
+        terms = solar.solar_terms(self.Date, self.SunTime, self.Latitude, self.Atmosphere)
+        Hc, Qs, Zc = terms.Hc, terms.Qs, terms.Zc
+        self.solar_declination = terms.declination
+        self.hour_angle = terms.hour_angle
 
         if self.Direction == 'NorthSouth': #0
             z1 = 0.0
@@ -0,0 +1,127 @@
+"""Steady state conductor temperature for a given line current
+
+The inverse of steady_state_thermal_rating(): find Tc such that the heat
+balance closes for the current flowing in the line,
+
+    qc(Tc) + qr(Tc) = qs + I**2 * R(Tc)
+
+The root is bracketed between Ta (where the left side is zero) and a hot
+temperature found by doubling, and refined with the Illinois variant of
+regula falsi.  Every element is solved at once on NumPy arrays, so lines x
+scenarios works the same way as in vectorized.py.
+"""
+from dataclasses import dataclass
+import logging
+import numpy as np
+from .vectorized import (_as_arrays, convection_heat_loss, radiated_heat_loss,
+                         resistance, solar_heat_gain)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TemperatureResult:
+    """Output of conductor_temperature()
+
+    Tc is in degC (NaN where no root was found below T_max), iterations is the
+    number of refinement steps each element took and converged marks elements
+    that met the tolerance.  evaluations counts heat balance calls over the
+    whole array (bracketing included), which is the real cost of the solve.
+    """
+    Tc: np.ndarray
+    iterations: np.ndarray
+    converged: np.ndarray
+    evaluations: int
+
+    @property
+    def max_iterations(self):
+        return int(self.iterations.max(initial=0))
+
+    @property
+    def mean_iterations(self):
+        return float(self.iterations.mean()) if self.iterations.size else 0.0
+
+
+def conductor_temperature(params, current, tol=0.01, max_iter=50, T_max=500.0):
+    """Steady state conductor temperature (degC) carrying `current`
+
+    Args:
+      - params: mapping with the ConductorParams field names.  Tc is ignored.
+      - current: line current in amps for the whole bundle; broadcast with params
+      - tol: stop when the update to Tc is below this many degC
+      - max_iter: max refinement steps
+      - T_max: give up bracketing above this temperature
+    Returns:
+      - TemperatureResult
+    """
+    params = dict(params)
+    params['Tc'] = params['Ta']
+    p = _as_arrays(params)
+    current = np.asarray(current, dtype=float)
+
+    shape = np.broadcast_shapes(current.shape, *(v.shape for v in p.values()))
+    Ta = np.broadcast_to(p['Ta'], shape)
+    qs = solar_heat_gain(p['Diameter'], p['Absorptivity'], p['Elevation'],
+                         p['Latitude'], p['SunTime'], p['Date'],
+                         p['Direction'], p['Atmosphere'])
+    I2 = (current / p['ConductorsPerBundle'])**2
+
+    evaluations = 0
+
+    def balance(Tc):
+        nonlocal evaluations
+        evaluations += 1
+        qc = convection_heat_loss(Tc, Ta, p['WindVelocity'], p['WindAngleDeg'],
+                                  p['Elevation'], p['Diameter'])
+        qr = radiated_heat_loss(Tc, Ta, p['Diameter'], p['Emissivity'])
+        rTc = resistance(Tc, p['TLo'], p['RLo'], p['THi'], p['RHi'])
+        return np.broadcast_to(qc + qr - qs - I2*rTc, shape)
+
+    # Bracket: balance(Ta) <= 0, grow hi until balance(hi) >= 0
+    lo = Ta.astype(float)
+    f_lo = balance(lo)
+    hi = lo + 50.0
+    f_hi = balance(hi)
+    while True:
+        grow = (f_hi < 0) & (hi < T_max)
+        if not grow.any():
+            break
+        hi = np.where(grow, np.minimum(Ta + 2*(hi - Ta), T_max), hi)
+        f_hi = np.where(grow, balance(hi), f_hi)
+    bracketed = (f_lo <= 0) & (f_hi >= 0)
+
+    iterations = np.zeros(shape, dtype=int)
+    converged = bracketed & ((f_lo == 0) | (f_hi == 0))
+    Tc = np.where(f_hi == 0, hi, lo)
+    side = np.zeros(shape, dtype=int)   # which end was kept last time (Illinois)
+    for _ in range(max_iter):
+        active = bracketed & ~converged
+        if not active.any():
+            break
+        with np.errstate(invalid='ignore', divide='ignore'):
+            x = (lo*f_hi - hi*f_lo) / (f_hi - f_lo)
+        x = np.where(np.isfinite(x), x, (lo + hi) / 2)
+        x = np.where(active, x, lo)
+        fx = balance(x)
+
+        step = np.abs(x - Tc)
+        Tc = np.where(active, x, Tc)
+        iterations += active
+
+        left = active & (fx < 0)    # root is in [x, hi]
+        right = active & (fx > 0)   # root is in [lo, x]
+        # Illinois: halve the stale end's value when the same end is kept twice
+        f_hi = np.where(left & (side == 1), f_hi / 2, f_hi)
+        f_lo = np.where(right & (side == -1), f_lo / 2, f_lo)
+        lo, f_lo = np.where(left, x, lo), np.where(left, fx, f_lo)
+        hi, f_hi = np.where(right, x, hi), np.where(right, fx, f_hi)
+        side = np.where(left, 1, np.where(right, -1, side))
+
+        converged |= active & ((fx == 0) | (step < tol) | (hi - lo < tol))
+
+    Tc = np.where(bracketed, Tc, np.nan)
+    logger.debug("conductor_temperature: %d elements, %d evaluations, max %d iterations, "
+                 "%d not converged", Tc.size, evaluations, iterations.max(initial=0),
+                 np.count_nonzero(bracketed & ~converged))
+    return TemperatureResult(Tc=Tc, iterations=iterations, converged=converged & bracketed,
+                             evaluations=evaluations)
@@ -0,0 +1,203 @@
+"""Precomputed rating surface for interactive ambient sweeps
+
+The steady state rating is a smooth function of ambient temperature and wind
+speed for a given (conductor, MOT).  build_surface() rates every pair on a
+dense (Ta, wind) grid once with the vectorized engine, the grid is saved to
+an .npz file, and slider moves are served by bilinear interpolation.
+
+Grid: Ta from -10 to 80 degC every 0.5 degC, wind from 0 to 60 ft/s with the
+wind axis uniform in sqrt(V) (forced convection goes like V**0.52, so the
+surface is close to linear in that coordinate).
+
+Accuracy: at build time the surface is compared with the exact rating at
+every cell center, where bilinear interpolation is worst.  The result is
+stored on the surface as max_abs_error (amps) and max_rel_error, counting
+cells whose rating is above 10% of the pair's max.  For the conductors in
+lines.csv the max error is about 1% (under 5 A).  It occurs where natural and
+forced convection cross at wind speeds below 1 ft/s (the rating has a kink
+there); elsewhere the error is typically below 0.05%.  Inputs outside the
+grid are clamped to its edge.
+
+The file is keyed by a hash of conductor_library.csv, the ambient defaults
+and the grid, so editing the library triggers a rebuild in load_or_build().
+Rebuild by hand with:
+
+    python -m lib.ieee738.rating_surface
+"""
+import json
+import os
+import numpy as np
+from .conductors import AMBIENT_DEFAULTS, conductor_params, library_hash, load_library, LIBRARY_PATH
+from .vectorized import steady_state_thermal_rating
+
+SURFACE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rating_surface.npz')
+
+# Everything except Ta and WindVelocity is fixed for the surface.  Oahu latitude.
+SURFACE_AMBIENT = dict(AMBIENT_DEFAULTS, Latitude=21.3)
+
+TA_GRID = np.arange(-10.0, 80.0 + 0.25, 0.5)                 # degC
+SQRT_WIND_GRID = np.linspace(0.0, np.sqrt(60.0), 241)        # sqrt(ft/s)
+
+# Error statistics only count cells whose rating is above this fraction of
+# the pair's max rating (relative error is meaningless as the rating -> 0)
+ERROR_FLOOR = 0.1
+
+
+class RatingSurface:
+    """Ratings (amps) on a (pair, Ta, sqrt(wind)) grid
+
+    pairs are (conductor name, MOT) tuples, ratings has shape
+    (n_pairs, len(Ta), len(sqrt_wind)).
+    """
+    def __init__(self, pairs, Ta, sqrt_wind, ratings, key, max_abs_error=np.nan,
+                 max_rel_error=np.nan):
+        self.pairs = [(str(c), float(mot)) for c, mot in pairs]
+        self.Ta = np.asarray(Ta, dtype=float)
+        self.sqrt_wind = np.asarray(sqrt_wind, dtype=float)
+        self.ratings = np.asarray(ratings, dtype=float)
+        self.key = key
+        self.max_abs_error = float(max_abs_error)
+        self.max_rel_error = float(max_rel_error)
+        self._pair_index = {p: i for i, p in enumerate(self.pairs)}
+
+    def index(self, conductor, MOT):
+        """Pair index for every (conductor, MOT).  -1 where not on the surface"""
+        conductor = np.asarray(conductor).astype(str)
+        MOT = np.asarray(MOT, dtype=float)
+        return np.array([self._pair_index.get((c.strip(), m), -1)
+                         for c, m in zip(conductor, MOT)], dtype=int)
+
+    def _locate(self, axis, x):
+        """Lower cell index and fractional position along a uniform axis"""
+        step = axis[1] - axis[0]
+        f = np.clip((np.asarray(x, dtype=float) - axis[0]) / step, 0, len(axis) - 1)
+        i = np.minimum(f.astype(int), len(axis) - 2)
+        return i, f - i
+
+    def interpolate(self, Ta, WindVelocity, pair_idx):
+        """Bilinear interpolation.  All inputs broadcast; WindVelocity in ft/s"""
+        i, t = self._locate(self.Ta, Ta)
+        j, s = self._locate(self.sqrt_wind, np.sqrt(np.maximum(WindVelocity, 0.0)))
+        R = self.ratings
+        return ((1 - t)*(1 - s)*R[pair_idx, i, j] + t*(1 - s)*R[pair_idx, i + 1, j]
+                + (1 - t)*s*R[pair_idx, i, j + 1] + t*s*R[pair_idx, i + 1, j + 1])
+
+    def ratings_at(self, Ta, WindVelocity):
+        """Rating of every pair at one ambient point, shape (n_pairs,)
+
+        Index the result with the per-line pair index to get line ratings;
+        this is the cheap path for a slider move.
+        """
+        return self.interpolate(float(Ta), float(WindVelocity), np.arange(len(self.pairs)))
+
+    def save(self, path=SURFACE_PATH):
+        np.savez(path, ratings=self.ratings, Ta=self.Ta, sqrt_wind=self.sqrt_wind,
+                 meta=json.dumps({'pairs': self.pairs, 'key': self.key,
+                                  'max_abs_error': self.max_abs_error,
+                                  'max_rel_error': self.max_rel_error}))
+
+    @classmethod
+    def load(cls, path=SURFACE_PATH):
+        with np.load(path) as f:
+            meta = json.loads(str(f['meta']))
+            return cls(meta['pairs'], f['Ta'], f['sqrt_wind'], f['ratings'], meta['key'],
+                       meta['max_abs_error'], meta['max_rel_error'])
+
+
+def surface_key(ambient=None, library_path=LIBRARY_PATH):
+    """Identifies the inputs a surface was built from"""
+    ambient = SURFACE_AMBIENT if ambient is None else ambient
+    return json.dumps({'library': library_hash(library_path),
+                       'ambient': {k: ambient[k] for k in sorted(ambient)
+                                   if k not in ('Ta', 'WindVelocity')},
+                       'Ta': [TA_GRID[0], TA_GRID[-1], len(TA_GRID)],
+                       'sqrt_wind': [SQRT_WIND_GRID[0], SQRT_WIND_GRID[-1], len(SQRT_WIND_GRID)]},
+                      sort_keys=True, default=str)
+
+
+def _rate(cond, MOT, ambient, Ta, WindVelocity):
+    """Ratings with pairs on axis 0 and the given Ta/WindVelocity arrays after"""
+    extra = (None,) * np.ndim(Ta)
+    params = dict(ambient)
+    params.update({k: cond[k].to_numpy()[(slice(None),) + extra] for k in cond.columns})
+    params['Tc'] = MOT[(slice(None),) + extra]
+    params['Ta'] = Ta
+    params['WindVelocity'] = WindVelocity
+    return steady_state_thermal_rating(params).rating
+
+
+def build_surface(pairs, ambient=None, library_path=LIBRARY_PATH):
+    """Rate every (conductor, MOT) pair on the grid
+
+    Args:
+      - pairs: iterable of (conductor name, MOT)
+      - ambient: fixed ambient params (everything but Ta and WindVelocity)
+    Returns:
+      - RatingSurface with its measured interpolation error
+    """
+    ambient = dict(SURFACE_AMBIENT if ambient is None else ambient)
+    ambient.pop('Ta', None)
+    ambient.pop('WindVelocity', None)
+    pairs = sorted({(str(c).strip(), float(m)) for c, m in pairs})
+
+    table = conductor_params(load_library(library_path))
+    missing = sorted({c for c, _ in pairs if c not in table.index})
+    if missing:
+        raise KeyError("Conductors not in the library: {}".format(missing))
+    cond = table.loc[[c for c, _ in pairs]]
+    MOT = np.array([m for _, m in pairs])
+
+    Ta, W = np.meshgrid(TA_GRID, SQRT_WIND_GRID**2, indexing='ij')
+    ratings = _rate(cond, MOT, ambient, Ta, W)
+    surface = RatingSurface(pairs, TA_GRID, SQRT_WIND_GRID, ratings,
+                            surface_key(ambient, library_path))
+
+    # Measure the error at the cell centers
+    Ta_c = (TA_GRID[:-1] + TA_GRID[1:]) / 2
+    sw_c = (SQRT_WIND_GRID[:-1] + SQRT_WIND_GRID[1:]) / 2
+    Ta_c, W_c = np.meshgrid(Ta_c, sw_c**2, indexing='ij')
+    exact = _rate(cond, MOT, ambient, Ta_c, W_c)
+    approx = surface.interpolate(Ta_c[None], W_c[None], np.arange(len(pairs))[:, None, None])
+    err = np.abs(approx - exact)
+    mask = exact > ERROR_FLOOR * np.nanmax(ratings, axis=(1, 2))[:, None, None]
+    surface.max_abs_error = float(np.nanmax(np.where(mask, err, 0)))
+    surface.max_rel_error = float(np.nanmax(np.where(mask, err / np.where(mask, exact, 1), 0)))
+    return surface
+
+
+def load_or_build(conductor, MOT, path=SURFACE_PATH, ambient=None, rebuild=False):
+    """Load the surface from disk, rebuilding it if it is stale or missing pairs
+
+    Args:
+      - conductor, MOT: per-line conductor names and MOTs (e.g. lines.csv columns)
+    Returns:
+      - (RatingSurface, per-line pair index; -1 for conductors not in the library)
+    """
+    names = np.asarray(conductor).astype(str)
+    MOT = np.asarray(MOT, dtype=float)
+    library = load_library()
+    wanted = {(c.strip(), m) for c, m in zip(names, MOT) if c.strip() in library.index}
+
+    surface = None
+    if not rebuild and os.path.exists(path):
+        surface = RatingSurface.load(path)
+        if surface.key != surface_key(ambient):
+            # library or ambient changed: old pairs may no longer exist
+            surface = None
+        elif not wanted <= set(surface.pairs):
+            # keep what other callers asked for before
+            wanted |= set(surface.pairs)
+            surface = None
+    if surface is None:
+        surface = build_surface(wanted, ambient)
+        surface.save(path)
+    return surface, surface.index(names, MOT)
+
+
+if __name__ == '__main__':
+    import pandas as pd
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    lines = pd.read_csv(os.path.join(root, 'data', 'csv', 'lines.csv'))
+    surface, _ = load_or_build(lines['conductor'], lines['MOT'], rebuild=True)
+    print("Rebuilt %s: %d pairs, max error %.3f A (%.4f%%)" % (
+        SURFACE_PATH, len(surface.pairs), surface.max_abs_error, 100*surface.max_rel_error))
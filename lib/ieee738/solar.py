@@ -0,0 +1,200 @@
+"""Solar geometry for the IEEE738 solar heat gain term
+
+Every line in a run sees the same sun, so the altitude (Hc), azimuth (Zc) and
+total heat flux (Qs) only depend on (Date, SunTime, Latitude, Atmosphere).
+solar_terms() computes them once per key and keeps them in a bounded LRU
+cache; Conductor reads from it instead of re-parsing dates and redoing the
+trigonometry for every line.
+
+For hourly (24) or annual (8760 / 8784) sweeps use hourly_table() / annual_table(),
+which compute the whole sweep as arrays and are cached as well.
+"""
+from datetime import datetime
+from functools import lru_cache
+from typing import NamedTuple
+import numpy as np
+
+# Max number of (Date, SunTime, Latitude, Atmosphere) keys kept in memory
+CACHE_SIZE = 8192
+
+# Solar heating at earth surface (W/ft^2), ascending powers of Hc.
+# IEEE 738 polynomials for clear and industrial air
+QS_COEFFS = {
+    'Clear': np.array([-3.9241, 5.9276, -1.7856e-1, 3.223e-3,
+                       -3.3549e-5, 1.8053e-7, -3.7868e-10]),
+    'Industrial': np.array([4.9408, 1.3202, 6.1444e-2, -2.9411e-3,
+                            5.07752e-5, -4.03627e-7, 1.22967e-9]),
+}
+
+
+class SolarTerms(NamedTuple):
+    """Sun position and flux for one (Date, SunTime, Latitude, Atmosphere)"""
+    Hc: float           # altitude of sun (degrees)
+    Zc: float           # azimuth of sun (degrees)
+    Qs: float           # total heat flux at sea level (W/ft^2)
+    declination: float  # solar declination (degrees)
+    hour_angle: float   # hours from noon * 15 (degrees)
+
+
+class SolarTable(NamedTuple):
+    """Sun position and flux for a sweep.  1-D read-only arrays of equal length"""
+    day: np.ndarray
+    hour: np.ndarray
+    Hc: np.ndarray
+    Zc: np.ndarray
+    Qs: np.ndarray
+
+
+@lru_cache(maxsize=512)
+def parse_day(Date):
+    """Days since 1 Jan for a date string like '12 Jun'
+
+    The string has no year, so days are counted as in a non-leap year;
+    '29 Feb' (from leap-year data) is accepted and gets 1 Mar's day.  Callers
+    that know the year should pass a day of year to day_of_year() instead.
+    """
+    # parsed in a leap year so that '29 Feb' exists
+    day = datetime.strptime(Date + " 2000", "%d %b %Y").timetuple().tm_yday - 1
+    return day - 1 if day > 59 else day
+
+
+def day_of_year(Date):
+    """Days since 1 Jan for date strings (see parse_day), or the values
+    themselves for numbers (e.g. pandas' dayofyear - 1).  Scalar or array."""
+    Date = np.asarray(Date)
+    if Date.dtype.kind in "iuf":
+        return Date.astype(float)
+    uniq, inv = np.unique(Date, return_inverse=True)
+    days = np.array([parse_day(str(d)) for d in uniq], dtype=float)
+    return days[inv].reshape(Date.shape)
+
+
+def _polyval_asc(p, x):
+    """Evaluate a polynomial with ascending coefficients (Horner)"""
+    result = np.zeros_like(x, dtype=float) + p[-1]
+    for c in p[-2::-1]:
+        result = result*x + c
+    return result
+
+
+def solar_altitude(day, SunTime, Latitude):
+    """Hc (degrees), solar declination d (degrees), hour angle w (degrees).
+    Equation 15.
+    """
+    w = (SunTime - 12.0) * 15.0
+    d = 23.4583*np.sin(np.deg2rad((284.0 + day)/365.0 * 360.0))
+    lat = np.deg2rad(Latitude)
+    Hc = np.arcsin(np.cos(lat)*np.cos(np.deg2rad(d))*np.cos(np.deg2rad(w))
+                   + np.sin(lat)*np.sin(np.deg2rad(d)))
+    return np.rad2deg(Hc), d, w
+
+
+def solar_azimuth(Latitude, d, w):
+    """Zc (degrees) using the solar azimuth constant from Table 3.
+    NaN where the hour angle is outside [-180, 180].
+    """
+    lat = np.deg2rad(Latitude)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        X = np.sin(np.deg2rad(w)) / (np.sin(lat)*np.cos(np.deg2rad(w))
+                                     - np.cos(lat)*np.tan(np.deg2rad(d)))
+    C = np.where(X >= 0, 180.0, 360.0)
+    C = np.where(w < 0, np.where(X >= 0, 0.0, 180.0), C)
+    C = np.where((w < -180) | (w > 180), np.nan, C)
+    return C + np.rad2deg(np.arctan(X))
+
+
+def total_heat_flux(Hc, Atmosphere, derivative=False):
+    """Qs (W/ft^2) for solar altitudes and atmosphere names (NaN if unknown).
+    With derivative=True, dQs/dHc in W/ft^2 per degree instead."""
+    Atmosphere = np.asarray(Atmosphere)
+    Hc = np.asarray(Hc, dtype=float)
+    shape = np.broadcast_shapes(Hc.shape, Atmosphere.shape)
+    Qs = np.full(shape, np.nan)
+    Hc_b = np.broadcast_to(Hc, shape)
+    atm_b = np.broadcast_to(Atmosphere, shape)
+    for name, p in QS_COEFFS.items():
+        if derivative:
+            p = p[1:] * np.arange(1, len(p))
+        mask = atm_b == name
+        if mask.any():
+            Qs[mask] = _polyval_asc(p, Hc_b[mask])
+    return Qs
+
+
+def solar_rates(day, SunTime, Latitude):
+    """dHc/dSunTime and dZc/dSunTime in degrees per hour (Equations 15 and 16
+    differentiated).  The jumps of the azimuth constant C are ignored."""
+    Hc, d, w = solar_altitude(day, SunTime, Latitude)
+    lat, d, w, Hc = (np.deg2rad(v) for v in (Latitude, d, w, Hc))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # degrees per degree of hour angle; 15 degrees of hour angle per hour
+        dHc = -np.cos(lat)*np.cos(d)*np.sin(w) / np.cos(Hc)
+        den = np.sin(lat)*np.cos(w) - np.cos(lat)*np.tan(d)
+        X = np.sin(w) / den
+        dZc = (np.cos(w)*den + np.sin(lat)*np.sin(w)**2) / den**2 / (1 + X**2)
+    return 15.0 * dHc, 15.0 * dZc
+
+
+def solar_arrays(day, SunTime, Latitude, Atmosphere):
+    """Vectorized Hc, Zc, Qs.  Inputs broadcast against each other."""
+    Hc, d, w = solar_altitude(day, SunTime, Latitude)
+    Zc = solar_azimuth(Latitude, d, w)
+    Qs = total_heat_flux(Hc, Atmosphere)
+    return Hc, Zc, Qs
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def solar_terms(Date, SunTime, Latitude, Atmosphere):
+    """Cached sun position and flux used by Conductor
+
+    Args:
+      - Date(str): day of year like '12 Jun'
+      - SunTime(float): hour of day, 0-24
+      - Latitude(float): degrees
+      - Atmosphere(str): 'Clear' or 'Industrial'
+    Returns:
+      - SolarTerms
+    """
+    Hc, d, w = solar_altitude(parse_day(Date), float(SunTime), float(Latitude))
+    Zc = solar_azimuth(float(Latitude), d, w)
+    if np.isnan(Zc):
+        raise ValueError("Can't figure out C in the Zc calculation. SunTime: %s" % SunTime)
+    if Atmosphere not in QS_COEFFS:
+        raise ValueError("Invalid Atmosphere %s. Expecting 'Clear' or 'Industrial'" % Atmosphere)
+    Qs = _polyval_asc(QS_COEFFS[Atmosphere], Hc)
+    return SolarTerms(float(Hc), float(Zc), float(Qs), float(d), float(w))
+
+
+def _readonly(*arrays):
+    for a in arrays:
+        a.setflags(write=False)
+    return arrays
+
+
+@lru_cache(maxsize=64)
+def hourly_table(Date, Latitude, Atmosphere, step=1.0):
+    """Solar terms for every `step` hours of one day, SunTime in [0, 24)"""
+    hour = np.arange(0.0, 24.0, step)
+    day = np.full(hour.shape, float(parse_day(Date)))
+    Hc, Zc, Qs = solar_arrays(day, hour, Latitude, Atmosphere)
+    return SolarTable(*_readonly(day, hour, Hc, Zc, Qs))
+
+
+@lru_cache(maxsize=16)
+def annual_table(Latitude, Atmosphere, leap=False):
+    """Solar terms for all 8760 hours of a year (8784 with leap), day major"""
+    day, hour = np.divmod(np.arange((366 if leap else 365)*24, dtype=float), 24.0)
+    Hc, Zc, Qs = solar_arrays(day, hour, Latitude, Atmosphere)
+    return SolarTable(*_readonly(day, hour, Hc, Zc, Qs))
+
+
+def cache_info():
+    """lru_cache statistics of the solar caches"""
+    return {'solar_terms': solar_terms.cache_info(),
+            'hourly_table': hourly_table.cache_info(),
+            'annual_table': annual_table.cache_info()}
+
+
+def clear_cache():
+    for f in (parse_day, solar_terms, hourly_table, annual_table):
+        f.cache_clear()
@@ -0,0 +1,156 @@
+"""Transient thermal rating (IEEE738 section 4.5)
+
+After a step change in current the conductor temperature follows
+
+    mCp * dTc/dt = qs + I**2 * R(Tc) - qc(Tc) - qr(Tc)
+
+simulate() integrates this with explicit Euler steps for every line at once,
+reusing the heat balance terms from vectorized.py.  emergency_rating() finds,
+for each line, the step current that takes the conductor from its pre-load
+steady state temperature to MOT (params['Tc']) in a given time, e.g. the
+15-minute emergency ampacity.
+
+HeatCapacity (mCp, W-s/ft-degC) is not in conductor_library.csv so it has to
+be given with the other params; heat_capacity() computes it from the
+aluminum and steel weights of an ACSR conductor.  dt should stay well below
+the thermal time constant (several minutes for typical ACSR); the standard
+suggests steps of 60 s or less.
+"""
+from dataclasses import dataclass
+import numpy as np
+from .inverse import conductor_temperature
+from .vectorized import (_as_arrays, convection_heat_loss, radiated_heat_loss,
+                         resistance, solar_heat_gain, steady_state_thermal_rating)
+
+# Specific heat, W-s/(lb-degC)
+AL_SPECIFIC_HEAT = 433.0
+STEEL_SPECIFIC_HEAT = 216.0
+
+
+def heat_capacity(al_lb_per_ft, steel_lb_per_ft=0.0):
+    """mCp in W-s/(ft-degC) from the weight of each strand material
+
+    e.g. Drake (0.7463 lb/ft Al, 0.3479 lb/ft steel) -> ~398
+    """
+    return al_lb_per_ft*AL_SPECIFIC_HEAT + steel_lb_per_ft*STEEL_SPECIFIC_HEAT
+
+
+@dataclass
+class TransientResult:
+    """time (s) has n_steps + 1 entries.  Tc (degC) has time on axis 0 when
+    the history was recorded, otherwise it is the final temperature only."""
+    time: np.ndarray
+    Tc: np.ndarray
+
+
+class _HeatBalance:
+    """Net heating rate dTc/dt (degC/s) as a function of Tc, everything else fixed"""
+    def __init__(self, params):
+        params = dict(params)
+        mCp = np.asarray(params.pop('HeatCapacity'), dtype=float)
+        params.setdefault('Tc', params['Ta'])
+        p = _as_arrays(params)
+        self.p = p
+        self.shape = np.broadcast_shapes(mCp.shape, *(v.shape for v in p.values()))
+        self.qs = solar_heat_gain(p['Diameter'], p['Absorptivity'], p['Elevation'],
+                                  p['Latitude'], p['SunTime'], p['Date'],
+                                  p['Direction'], p['Atmosphere'])
+        self.mCp = mCp
+        self.bundle = p['ConductorsPerBundle']
+
+    def rate(self, Tc, current):
+        p = self.p
+        Ta = p['Ta']
+        # convection only holds for Tc >= Ta, so use |dT| and put the sign back
+        dT = Tc - Ta
+        qc = np.sign(dT) * convection_heat_loss(Ta + np.abs(dT), Ta, p['WindVelocity'],
+                                                p['WindAngleDeg'], p['Elevation'],
+                                                p['Diameter'])
+        qr = radiated_heat_loss(Tc, Ta, p['Diameter'], p['Emissivity'])
+        rTc = resistance(Tc, p['TLo'], p['RLo'], p['THi'], p['RHi'])
+        I = current / self.bundle
+        return (self.qs + I**2*rTc - qc - qr) / self.mCp
+
+
+def simulate_profile(params, currents, dt=10.0, Tc0=None, record=True):
+    """Integrate conductor temperature through a current profile
+
+    Args:
+      - params: ConductorParams field names plus HeatCapacity; Tc is ignored
+      - currents: array (n_steps, ...) - current in amps during each step
+      - dt: step in seconds
+      - Tc0: initial conductor temperature (defaults to Ta)
+      - record: keep the whole history (otherwise only the final Tc)
+    Returns:
+      - TransientResult
+    """
+    hb = _HeatBalance(params)
+    currents = np.asarray(currents, dtype=float)
+    n_steps = currents.shape[0]
+    shape = np.broadcast_shapes(hb.shape, currents.shape[1:])
+
+    Tc = np.array(np.broadcast_to(hb.p['Ta'] if Tc0 is None else Tc0, shape), dtype=float)
+    history = np.empty((n_steps + 1,) + shape) if record else None
+    if record:
+        history[0] = Tc
+    for k in range(n_steps):
+        Tc += dt * hb.rate(Tc, currents[k])
+        if record:
+            history[k + 1] = Tc
+    return TransientResult(time=np.arange(n_steps + 1) * dt,
+                           Tc=history if record else Tc)
+
+
+def simulate(params, current, duration, dt=10.0, I0=None, Tc0=None, record=True):
+    """Temperature after a step to `current` held for `duration` seconds
+
+    The start temperature is Tc0, else the steady state temperature at the
+    pre-step current I0, else Ta.
+    """
+    n_steps = int(np.ceil(duration / dt))
+    if Tc0 is None and I0 is not None:
+        Tc0 = conductor_temperature(_steady_params(params), I0).Tc
+    current = np.asarray(current, dtype=float)
+    currents = np.broadcast_to(current, (n_steps,) + current.shape)
+    return simulate_profile(params, currents, duration / n_steps, Tc0, record)
+
+
+def _steady_params(params):
+    return {k: v for k, v in params.items() if k != 'HeatCapacity'}
+
+
+def emergency_rating(params, I0, duration=900.0, dt=10.0, tol=1.0, max_iter=40):
+    """Step current (amps) that reaches MOT (params['Tc']) after `duration` s
+
+    Starting from the steady state at pre-load current I0.  Lines already at or
+    above MOT before the step get their steady state rating.  Solved by
+    bisection on the current for all lines at once; tol is in amps.
+    """
+    steady = _steady_params(params)
+    MOT = np.asarray(params['Tc'], dtype=float)
+    Tc0 = conductor_temperature(steady, I0).Tc
+    lo = steady_state_thermal_rating(steady).rating
+    shape = np.broadcast_shapes(lo.shape, Tc0.shape)
+    lo = np.broadcast_to(lo, shape).copy()
+    Tc0 = np.broadcast_to(Tc0, shape)
+    hot = ~(Tc0 < MOT)     # also catches NaN (no steady state found)
+
+    def final_Tc(I):
+        return simulate(params, I, duration, dt, Tc0=Tc0, record=False).Tc
+
+    hi = 2.0*lo + 1.0
+    for _ in range(max_iter):
+        grow = ~hot & (final_Tc(hi) < MOT)
+        if not grow.any():
+            break
+        lo = np.where(grow, hi, lo)
+        hi = np.where(grow, 2.0*hi, hi)
+
+    for _ in range(max_iter):
+        if np.nanmax(np.where(hot, 0.0, hi - lo), initial=0.0) < tol:
+            break
+        mid = (lo + hi) / 2
+        below = final_Tc(mid) < MOT
+        lo = np.where(below, mid, lo)
+        hi = np.where(below, hi, mid)
+    return np.where(hot, lo, (lo + hi) / 2)
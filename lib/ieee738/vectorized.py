@@ -0,0 +1,431 @@
+"""Vectorized (NumPy) version of the IEEE738 steady state rating in ieee738.py
+
+The scalar Conductor class rates one conductor at a time.  The functions here
+take arrays for every parameter and broadcast them against each other, so a
+whole network times a set of weather scenarios is rated in one call.
+
+The math is a line by line translation of the methods on Conductor, including
+its quirks (the Tc = Ta + 0.1 clamp in natural convection, the elevation
+polynomial, the solar azimuth constant table), so results match the scalar
+code to floating point precision.
+
+Example: lines x scenarios
+    conductors = {'Diameter': ..., 'RLo': ..., 'RHi': ..., 'TLo': ..., 'THi': ..., 'Tc': ...}
+    ambient = {'Ta': [20, 30, 40], 'WindVelocity': [2, 2, 2], ...}
+    res = rate_grid(conductors, ambient)
+    res.rating.shape  # (n_lines, n_scenarios)
+"""
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+from .solar import (day_of_year, parse_day, solar_arrays, solar_rates,
+                    total_heat_flux, QS_COEFFS)
+
+# Column names accepted by the batched engine.  Same names as ConductorParams
+PARAM_NAMES = ('Ta', 'WindVelocity', 'WindAngleDeg', 'Elevation', 'Latitude',
+               'SunTime', 'Emissivity', 'Absorptivity', 'Direction', 'Atmosphere',
+               'Date', 'Tc', 'Diameter', 'TLo', 'RLo', 'THi', 'RHi',
+               'ConductorsPerBundle')
+
+# Defaults for the optional fields of ConductorParams
+PARAM_DEFAULTS = {'Date': '12 Jun', 'ConductorsPerBundle': 1}
+
+# Conductor orientation -> azimuth of line (z1 in the spec)
+DIRECTION_AZIMUTH = {'NorthSouth': 0.0, 'EastWest': 90.0}
+
+# Inputs steady_state_thermal_rating(sensitivities=True) differentiates against
+SENSITIVITY_PARAMS = ('Ta', 'WindVelocity', 'WindAngleDeg', 'SunTime')
+
+
+@dataclass
+class RatingResult:
+    """Output of the batched rating.  All arrays share the broadcast shape.
+
+    rating is in amps (for the whole bundle), the heat terms are in W/ft and
+    rTc is the conductor resistance at Tc in ohms/ft.  Entries where the scalar
+    code would raise (qs == 0 or qr == 0) are NaN.
+
+    sensitivity (only with sensitivities=True) maps each of SENSITIVITY_PARAMS
+    to d(rating)/d(param): amps per degC, per ft/s, per degree and per hour.
+    """
+    rating: np.ndarray
+    qc: np.ndarray
+    qs: np.ndarray
+    qr: np.ndarray
+    rTc: np.ndarray
+    sensitivity: dict = None
+
+    def extrapolate(self, **deltas):
+        """First-order rating for changes of the inputs, e.g. Ta=+2.0"""
+        if self.sensitivity is None:
+            raise ValueError("Rated without sensitivities=True")
+        rating = self.rating
+        for name, delta in deltas.items():
+            rating = rating + self.sensitivity[name] * delta
+        return np.maximum(rating, 0.0)
+
+
+def direction_azimuth(Direction):
+    """z1 in degrees for 'NorthSouth'/'EastWest' (NaN for anything else).
+    Numbers are taken as the line azimuth in degrees (e.g. per-span bearings)."""
+    Direction = np.asarray(Direction)
+    if np.issubdtype(Direction.dtype, np.number):
+        return Direction.astype(float)
+    z1 = np.full(Direction.shape, np.nan)
+    for name, val in DIRECTION_AZIMUTH.items():
+        z1[Direction == name] = val
+    return z1
+
+
+def air_properties(Tc, Ta, Elevation):
+    """pf (lb/ft^3), uf (lb/ft*hr) and kf (W/ft degC) at the film temperature"""
+    Tfilm = (Tc + Ta) / 2.0
+    uf = (0.00353*(Tfilm + 273.0)**1.5) / (Tfilm + 383.4)
+    pf = (0.080695 - 2.901e-6*Elevation + 3.7e-11*Elevation**2) / (1 + 0.00367*Tfilm)
+    kf = 7.388e-3 + 2.279e-5*Tfilm - 1.343e-9*Tfilm**2
+    return pf, uf, kf
+
+
+def wind_angle_factor(WindAngleDeg):
+    """Kangle: wind direction factor"""
+    w = np.deg2rad(90 - WindAngleDeg)
+    return 1.194 - np.sin(w) - 0.194*np.cos(2*w) + 0.368*np.sin(2*w)
+
+
+def clamp_tc(Tc, Ta):
+    """Same clamp as Conductor.natural_convection_heat_loss: Tc < Ta -> Ta + 0.1"""
+    return np.where(Tc - Ta < 0, Ta + 0.1, Tc)
+
+
+def convection_heat_loss(Tc, Ta, WindVelocity, WindAngleDeg, Elevation, Diameter):
+    """qc = max(natural, forced) in W/ft.  Tc is expected to be clamped already."""
+    pf, uf, kf = air_properties(Tc, Ta, Elevation)
+    dT = Tc - Ta
+
+    qcn = 0.283 * pf**0.5 * Diameter**0.75 * dT**1.25
+
+    Vwind = WindVelocity * 60.0 * 60.0
+    Re = Diameter*pf*Vwind/uf
+    Kangle = wind_angle_factor(WindAngleDeg)
+    qc1 = (1.01 + 0.371*Re**0.52) * kf * dT * Kangle
+    qc2 = 0.1695*Re**0.6 * kf * dT * Kangle
+    qcf = np.maximum(qc1, qc2)
+    return np.maximum(qcn, qcf)
+
+
+def convection_partials(Tc, Ta, WindVelocity, WindAngleDeg, Elevation, Diameter, dTc_dTa=0.0):
+    """d(qc)/d(Ta, WindVelocity, WindAngleDeg) of convection_heat_loss, in W/ft
+    per degC, per ft/s and per degree.
+
+    Follows the branch max() picks.  dTc_dTa is 1 where Tc was clamped to
+    Ta + 0.1.  With no wind the forced convection slope in WindVelocity is
+    infinite (Re**0.52); it only shows where forced convection wins.
+    """
+    pf, uf, kf = air_properties(Tc, Ta, Elevation)
+    Tfilm = (Tc + Ta) / 2.0
+    dT = Tc - Ta
+    # derivatives in Ta, through the film temperature and dT
+    dTfilm = (1.0 + dTc_dTa) / 2.0
+    ddT = dTc_dTa - 1.0
+    dlog_uf = (1.5/(Tfilm + 273.0) - 1.0/(Tfilm + 383.4)) * dTfilm
+    dlog_pf = -0.00367/(1 + 0.00367*Tfilm) * dTfilm
+    dkf = (2.279e-5 - 2*1.343e-9*Tfilm) * dTfilm
+
+    qcn = 0.283 * pf**0.5 * Diameter**0.75 * dT**1.25
+    dqcn = qcn * 0.5*dlog_pf + 0.283 * pf**0.5 * Diameter**0.75 * 1.25*dT**0.25 * ddT
+
+    Vwind = WindVelocity * 60.0 * 60.0
+    Re = Diameter*pf*Vwind/uf
+    Kangle = wind_angle_factor(WindAngleDeg)
+    w = np.deg2rad(90 - WindAngleDeg)
+    dKangle = -(-np.cos(w) + 0.388*np.sin(2*w) + 0.736*np.cos(2*w)) * np.pi/180.0
+    dlog_Re = dlog_pf - dlog_uf
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dRe_dV = np.where(Vwind > 0, Re / WindVelocity, Diameter*pf*3600.0/uf)
+        dRe052_dV = 0.52 * Re**-0.48 * dRe_dV
+        dRe06_dV = 0.6 * Re**-0.4 * dRe_dV
+
+    a1 = 1.01 + 0.371*Re**0.52
+    a2 = 0.1695*Re**0.6
+    qc1 = a1 * kf * dT * Kangle
+    qc2 = a2 * kf * dT * Kangle
+    d_kf_dT = dkf*dT + kf*ddT
+    dqc1 = (0.371*Re**0.52*0.52*dlog_Re * kf*dT + a1*d_kf_dT) * Kangle
+    dqc2 = (a2*0.6*dlog_Re * kf*dT + a2*d_kf_dT) * Kangle
+
+    first = qc1 >= qc2
+    forced = np.maximum(qc1, qc2) > qcn
+    d_Ta = np.where(forced, np.where(first, dqc1, dqc2), dqcn)
+    with np.errstate(invalid='ignore'):
+        d_V = np.where(forced, np.where(first, 0.371*dRe052_dV, dRe06_dV*0.1695) * kf*dT*Kangle, 0.0)
+    d_angle = np.where(forced, np.where(first, a1, a2) * kf*dT*dKangle, 0.0)
+    return d_Ta, d_V, d_angle
+
+
+def radiated_heat_loss(Tc, Ta, Diameter, Emissivity):
+    """qr: Radiated heat loss in W/ft"""
+    return 0.138 * Diameter * Emissivity * \
+        (((Tc + 273.0)/100.0)**4 - ((Ta + 273.0)/100.0)**4)
+
+
+def elevation_correction(Elevation):
+    """Ke: Elevation correction for Qs"""
+    return 1.0 + 3.5e-5*Elevation - 1.0e-9*Elevation**2
+
+
+def solar_heat_gain(Diameter, Absorptivity, Elevation, Latitude, SunTime, Date,
+                    Direction, Atmosphere, night_zero=False):
+    """qs: Solar heat gain in W/ft
+
+    Like the scalar code, the Qs polynomial is evaluated for any solar altitude.
+    It goes strongly negative once the sun is below the horizon, so sweeps over
+    night hours should pass night_zero=True to use qs = 0 there instead.
+    """
+    Hc, Zc, Qs = solar_arrays(day_of_year(Date), SunTime, Latitude, Atmosphere)
+    if night_zero:
+        Qs = np.where(Hc > 0, Qs, 0.0)
+    return _solar_heat_gain(Hc, Zc, Qs, Diameter, Absorptivity, Elevation,
+                            direction_azimuth(Direction))
+
+
+def _solar_heat_gain(Hc, Zc, Qs, Diameter, Absorptivity, Elevation, z1):
+    theta = np.arccos(np.cos(np.deg2rad(Hc)) * np.cos(np.deg2rad(Zc - z1)))
+    A = Diameter / 12.0
+    return Absorptivity * Qs * np.sin(theta) * A * elevation_correction(Elevation)
+
+
+def solar_partial_suntime(Diameter, Absorptivity, Elevation, Latitude, SunTime, Date,
+                          Direction, Atmosphere, night_zero=False):
+    """d(qs)/d(SunTime) of solar_heat_gain, in W/ft per hour"""
+    day = day_of_year(Date)
+    Hc, Zc, Qs = solar_arrays(day, SunTime, Latitude, Atmosphere)
+    dHc, dZc = solar_rates(day, SunTime, Latitude)
+    dQs = total_heat_flux(Hc, Atmosphere, derivative=True) * dHc
+    if night_zero:
+        Qs = np.where(Hc > 0, Qs, 0.0)
+        dQs = np.where(Hc > 0, dQs, 0.0)
+    # sin(theta) with cos(theta) = cos(Hc) cos(Zc - z1)
+    Hc_r, dZ = np.deg2rad(Hc), np.deg2rad(Zc - direction_azimuth(Direction))
+    g = np.cos(Hc_r) * np.cos(dZ)
+    dg = -(np.sin(Hc_r)*np.cos(dZ)*np.deg2rad(dHc) + np.cos(Hc_r)*np.sin(dZ)*np.deg2rad(dZc))
+    sin_theta = np.sqrt(1 - g**2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dsin_theta = -g*dg / sin_theta
+    A = Diameter / 12.0
+    return Absorptivity * (dQs*sin_theta + Qs*dsin_theta) * A * elevation_correction(Elevation)
+
+
+def resistance(Tc, TLo, RLo, THi, RHi):
+    """R(Tc) in ohms/ft, linear interpolation between (TLo, RLo) and (THi, RHi)"""
+    return RLo + ((RHi - RLo) / (THi - TLo))*(Tc - TLo)
+
+
+def _as_arrays(params):
+    """Pull every parameter out of a mapping (dict, DataFrame, ...) as an array"""
+    out = {}
+    for name in PARAM_NAMES:
+        if name in params:
+            val = params[name]
+        elif name in PARAM_DEFAULTS:
+            val = PARAM_DEFAULTS[name]
+        else:
+            raise KeyError("Parameter not defined: {}".format(name))
+        val = np.asarray(val)
+        if name not in ('Direction', 'Atmosphere', 'Date'):
+            val = val.astype(float)
+        out[name] = val
+    return out
+
+
+def steady_state_thermal_rating(params, night_zero=False, sensitivities=False):
+    """Batched Conductor.steady_state_thermal_rating()
+
+    Args:
+      - params: mapping with the ConductorParams field names.  Values can be
+        scalars or arrays and are broadcast against each other.  Date and
+        ConductorsPerBundle are optional.
+      - night_zero: no solar heating while the sun is below the horizon (see
+        solar_heat_gain).  Off by default to match the scalar code.
+      - sensitivities: also return the analytic derivatives of the rating
+        with respect to SENSITIVITY_PARAMS (RatingResult.sensitivity)
+    Returns:
+      - RatingResult with the rating in amps and the qc/qs/qr breakdown
+    """
+    p = _as_arrays(params)
+    Ta = p['Ta']
+    Tc = clamp_tc(p['Tc'], Ta)
+
+    qc = convection_heat_loss(Tc, Ta, p['WindVelocity'], p['WindAngleDeg'],
+                              p['Elevation'], p['Diameter'])
+    qs = solar_heat_gain(p['Diameter'], p['Absorptivity'], p['Elevation'],
+                         p['Latitude'], p['SunTime'], p['Date'],
+                         p['Direction'], p['Atmosphere'], night_zero)
+    qr = radiated_heat_loss(Tc, Ta, p['Diameter'], p['Emissivity'])
+    rTc = resistance(Tc, p['TLo'], p['RLo'], p['THi'], p['RHi'])
+
+    shape = np.broadcast_shapes(qc.shape, qs.shape, qr.shape, rTc.shape,
+                                p['ConductorsPerBundle'].shape)
+    qc, qs, qr, rTc = (np.broadcast_to(a, shape) for a in (qc, qs, qr, rTc))
+
+    net = qc + qr - qs
+    with np.errstate(invalid='ignore'):
+        I = np.sqrt(np.where(net < 0, 0.0, net) / rTc)
+    failed = (qr == 0) if night_zero else (qs == 0) | (qr == 0)
+    I = np.where(failed, np.nan, I)
+    res = RatingResult(rating=I * p['ConductorsPerBundle'], qc=qc, qs=qs, qr=qr, rTc=rTc)
+    if sensitivities:
+        res.sensitivity = _rating_sensitivity(p, Tc, I, rTc, night_zero)
+    return res
+
+
+def _rating_sensitivity(p, Tc, I, rTc, night_zero):
+    """d(rating)/d(param) from I = sqrt((qc + qr - qs) / R(Tc)):
+
+        dI = (dqc + dqr - dqs - I**2 dR) / (2 R I)
+
+    R only moves with Ta where Tc was clamped to Ta + 0.1.  Where the rating
+    is zero (net heat loss below zero) the derivatives are zero.
+    """
+    Ta = p['Ta']
+    clamped = (p['Tc'] - Ta < 0).astype(float)
+    dqc = convection_partials(Tc, Ta, p['WindVelocity'], p['WindAngleDeg'],
+                              p['Elevation'], p['Diameter'], clamped)
+    # qr: d/dTa of (Tc+273)^4 - (Ta+273)^4 at 1/100 scale
+    dqr = 0.138 * p['Diameter'] * p['Emissivity'] * 4e-2 * (
+        clamped*((Tc + 273.0)/100.0)**3 - ((Ta + 273.0)/100.0)**3)
+    dR = clamped * (p['RHi'] - p['RLo']) / (p['THi'] - p['TLo'])
+    dqs = solar_partial_suntime(p['Diameter'], p['Absorptivity'], p['Elevation'],
+                                p['Latitude'], p['SunTime'], p['Date'],
+                                p['Direction'], p['Atmosphere'], night_zero)
+    dnet = {'Ta': dqc[0] + dqr - I**2*dR, 'WindVelocity': dqc[1],
+            'WindAngleDeg': dqc[2], 'SunTime': -dqs}
+    out = {}
+    for name in SENSITIVITY_PARAMS:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            d = np.where(I > 0, dnet[name] / (2*rTc*I), 0.0)
+        d = np.where(np.isnan(I), np.nan, d)
+        out[name] = np.broadcast_to(d * p['ConductorsPerBundle'], I.shape)
+    return out
+
+
+def rate_grid(conductors, ambient):
+    """Rate every conductor (rows) against every ambient scenario (columns)
+
+    Args:
+      - conductors: mapping of per-line parameters, each of length n
+      - ambient: mapping of per-scenario parameters, each of length m
+    A parameter given in both uses the ambient value.
+    Returns:
+      - RatingResult with arrays of shape (n, m)
+    """
+    params = {}
+    for name, val in conductors.items():
+        if name in PARAM_NAMES:
+            val = np.asarray(val)
+            params[name] = val[:, None] if val.ndim else val
+    for name, val in ambient.items():
+        if name in PARAM_NAMES:
+            val = np.asarray(val)
+            params[name] = val[None, :] if val.ndim else val
+    return steady_state_thermal_rating(params)
+
+
+_CHOICES = {'Direction': list(DIRECTION_AZIMUTH), 'Atmosphere': list(QS_COEFFS)}
+
+
+def validate_params(table):
+    """Column level version of ConductorParams + Conductor.input_validation()
+
+    Every check runs once per column instead of once per row.
+
+    Args:
+      - table: DataFrame (or mapping of equal length columns / scalars) with
+        the ConductorParams field names
+    Returns:
+      - (dict of clean 1-D arrays, DataFrame of rejected rows with columns
+        'row' and 'reason').  Rejected rows keep a placeholder value in the
+        clean arrays so the calculation can run on the whole table.
+    """
+    missing = [name for name in PARAM_NAMES
+               if name not in table and name not in PARAM_DEFAULTS]
+    if missing:
+        raise KeyError("Parameter not defined: {}".format(missing))
+
+    n = max((len(table[name]) for name in PARAM_NAMES
+             if name in table and np.ndim(table[name]) > 0), default=1)
+    reasons = [[] for _ in range(n)]
+
+    def reject(mask, reason):
+        for i in np.flatnonzero(mask):
+            reasons[i].append(reason)
+
+    cols = {}
+    for name in PARAM_NAMES:
+        val = table[name] if name in table else PARAM_DEFAULTS[name]
+        col = pd.Series(np.broadcast_to(np.asarray(val, dtype=object), (n,)))
+        if name == 'Date' and np.asarray(val).dtype.kind in 'iuf':
+            # day of year as a number (days since 1 Jan)
+            num = pd.to_numeric(col, errors='coerce').to_numpy(dtype=float)
+            with np.errstate(invalid='ignore'):
+                reject(~((num >= 0) & (num < 366)), "invalid Date: day of year out of range")
+            cols[name] = np.where((num >= 0) & (num < 366), num, parse_day(PARAM_DEFAULTS['Date']))
+            continue
+        if name in ('Direction', 'Atmosphere', 'Date'):
+            col = col.astype(str).to_numpy()
+            if name == 'Date':
+                ok = np.array([_valid_date(d) for d in col], dtype=bool)
+            else:
+                ok = np.isin(col, _CHOICES[name])
+            for i in np.flatnonzero(~ok):
+                reasons[i].append("invalid {}: {!r}".format(name, col[i]))
+            cols[name] = np.where(ok, col, PARAM_DEFAULTS.get(name) or _CHOICES[name][0])
+            continue
+        num = pd.to_numeric(col, errors='coerce').to_numpy(dtype=float)
+        reject(~np.isfinite(num), "{} is not a number".format(name))
+        cols[name] = num
+
+    with np.errstate(invalid='ignore'):
+        reject(cols['RLo'] > 0.001, "RLo is much higher than expected.  Units should be Ohms/ft.")
+        reject(cols['RHi'] > 0.001, "RHi is much higher than expected.  Units should be Ohms/ft.")
+        reject(cols['Absorptivity'] < 0, "Absorptivity out of range.")
+        reject(cols['Emissivity'] < 0, "Emissivity is out of range.")
+        cpb = cols['ConductorsPerBundle']
+        reject(np.isfinite(cpb) & (cpb != np.round(cpb)), "ConductorsPerBundle is not an integer")
+
+    rejected = pd.DataFrame([(i, "; ".join(r)) for i, r in enumerate(reasons) if r],
+                            columns=['row', 'reason'])
+    return cols, rejected
+
+
+def _valid_date(Date):
+    try:
+        parse_day(Date)
+        return True
+    except ValueError:
+        return False
+
+
+def rate_table(table):
+    """Validate a parameter table once and rate every row
+
+    This is the batch replacement for building ConductorParams and Conductor
+    per row.  Rows that fail validation, or where the scalar code would raise
+    (qs or qr equal to zero), get a NaN rating and are listed in the report.
+
+    Returns:
+      - (RatingResult of 1-D arrays, DataFrame of rejected rows: 'row', 'reason')
+    """
+    cols, rejected = validate_params(table)
+    res = steady_state_thermal_rating(cols)
+
+    bad = np.zeros(res.rating.shape, dtype=bool)
+    bad[rejected['row'].to_numpy(dtype=int)] = True
+    calc_failed = ~bad & ((res.qs == 0) | (res.qr == 0))
+    if calc_failed.any():
+        extra = pd.DataFrame({'row': np.flatnonzero(calc_failed),
+                              'reason': np.where(res.qs[calc_failed] == 0,
+                                                 "Qs (solar heat gain) is zero",
+                                                 "Qr (radiated heat loss) is zero")})
+        rejected = pd.concat([rejected, extra]).sort_values('row', ignore_index=True)
+    res.rating = np.where(bad, np.nan, res.rating)
+    return res, rejected
@@ -0,0 +1,75 @@
+"""Line alerts with state diffing and hysteresis
+
+AlertEngine keeps the current alert set as a boolean array.  Each update
+compares the new stress with the thresholds and reports only the lines whose
+state changed (raised / cleared).  With hysteresis a line raised above
+raise_at only clears once it drops to clear_at or below, so lines sitting on
+the threshold don't flap.
+
+The "BusA ↔ BusB" labels are built once from the bus-name index, so the per
+update Python work is proportional to the number of changed / active alerts.
+"""
+from typing import NamedTuple
+import numpy as np
+
+
+class AlertDiff(NamedTuple):
+    raised: np.ndarray    # line positions that became critical in this update
+    cleared: np.ndarray   # line positions that stopped being critical
+
+
+def line_labels(lines, bus_names):
+    """'BusA ↔ BusB' for every line.  Falls back to the bus id if unnamed."""
+    a = lines["bus_a"].astype(str)
+    b = lines["bus_b"].astype(str)
+    name_a = a.map(bus_names).fillna(a).astype(str)
+    name_b = b.map(bus_names).fillna(b).astype(str)
+    return (name_a + " ↔ " + name_b).to_numpy()
+
+
+class AlertEngine:
+    def __init__(self, labels, raise_at=90.0, clear_at=None):
+        """
+        labels: per-line display labels (see line_labels)
+        raise_at: stress (%) above which a line is critical
+        clear_at: stress (%) at or below which an active alert clears.
+                  Defaults to raise_at (no hysteresis).
+        """
+        self.labels = np.asarray(labels)
+        self.raise_at = raise_at
+        self.clear_at = raise_at if clear_at is None else clear_at
+        self.active = np.zeros(len(self.labels), dtype=bool)
+
+    @classmethod
+    def from_network(cls, network, **kwargs):
+        return cls(line_labels(network.lines, network.bus_names), **kwargs)
+
+    def _next_state(self, was_active, stress):
+        return np.where(was_active, stress > self.clear_at, stress > self.raise_at)
+
+    def update(self, stress):
+        """New stress for every line"""
+        stress = np.asarray(stress, dtype=float)
+        new = self._next_state(self.active, stress)
+        changed = np.flatnonzero(new != self.active)
+        self.active = new
+        return self._diff(changed)
+
+    def update_lines(self, idx, stress):
+        """New stress for some lines only (positions idx).  O(len(idx))"""
+        idx = np.asarray(idx, dtype=int)
+        new = self._next_state(self.active[idx], np.asarray(stress, dtype=float))
+        changed = idx[new != self.active[idx]]
+        self.active[idx] = new
+        return self._diff(changed)
+
+    def _diff(self, changed):
+        now = self.active[changed]
+        return AlertDiff(raised=changed[now], cleared=changed[~now])
+
+    def active_lines(self):
+        """Positions of all lines currently in alert"""
+        return np.flatnonzero(self.active)
+
+    def messages(self, positions):
+        return self.labels[positions]
@@ -1,60 +1,131 @@
+import threading
+from collections import OrderedDict
 import numpy as np
 import pandas as pd
+from typing import NamedTuple
+
+# Constants
+T_MOT = 75
+T_REF = 25
+K_W = 0.04
+
+# Stress classes: > 50, > 70, > 90, > 100 percent
+STRESS_BINS = np.array([50.0, 70.0, 90.0, 100.0])
+STRESS_COLORS = np.array(["#00FF00", "#FFFF00", "#FFA500", "#FF0000", "#8B0000"])
+
+# Networks whose statics are kept (least recently used dropped first)
+STATICS_CACHE_SIZE = 32
 
-def compute_stress(lines_df: pd.DataFrame, temp: float, wind: float) -> pd.DataFrame:
-    """
-    Compute stress level on transmission lines based on ambient temperature and wind speed.
-    Lines now respond individually to environmental changes — only some are affected strongly.
-    """
 
-    lines_df = lines_df.copy()
+class LineStatics(NamedTuple):
+    """Per-line attributes that don't depend on the sliders"""
+    name: np.ndarray
+    rating: np.ndarray
+    p0_nominal: np.ndarray
+    sensitivity: np.ndarray
+    base_load_factor: np.ndarray
+    synthetic_load: bool   # p0_nominal was all zeros -> load follows the sliders
 
-    # Constants
-    T_MOT = 75
-    T_ref = 25
-    k_w = 0.04
 
+class StressArrays(NamedTuple):
+    rating_dynamic: np.ndarray
+    p0_nominal: np.ndarray
+    stress: np.ndarray
+    stress_class: np.ndarray   # index into STRESS_COLORS
+
+
+_statics_cache = OrderedDict()
+_statics_lock = threading.Lock()
+
+
+def line_statics(lines_df: pd.DataFrame) -> LineStatics:
+    """Ratings, flows and the random per-line variation for a network.
+
+    Cached per network (keyed by the content of the columns used), so the
+    random draws happen once instead of on every slider move.  The cache
+    keeps the STATICS_CACHE_SIZE most recently used networks.
+    """
+    cols = [c for c in ("name", "s_nom", "rating", "p0_nominal") if c in lines_df.columns]
+    key = (len(lines_df), tuple(cols), int(pd.util.hash_pandas_object(lines_df[cols], index=False).sum()))
+    with _statics_lock:
+        statics = _statics_cache.get(key)
+        if statics is not None:
+            _statics_cache.move_to_end(key)
+            return statics
+
+    n = len(lines_df)
     # Ensure columns exist
     if "s_nom" in lines_df.columns:
-        lines_df.rename(columns={"s_nom": "rating"}, inplace=True)
-    if "rating" not in lines_df.columns:
-        lines_df["rating"] = 200.0
-    if "p0_nominal" not in lines_df.columns:
-        lines_df["p0_nominal"] = 0.0
+        rating = lines_df["s_nom"].to_numpy(dtype=float)
+    elif "rating" in lines_df.columns:
+        rating = lines_df["rating"].to_numpy(dtype=float)
+    else:
+        rating = np.full(n, 200.0)
+    if "p0_nominal" in lines_df.columns:
+        p0 = lines_df["p0_nominal"].to_numpy(dtype=float)
+    else:
+        p0 = np.zeros(n)
 
     # --- Per-line variation setup ---
     # Some lines are more sensitive to environment (weaker conductors or higher baseline load)
     rng = np.random.default_rng(seed=42)
-    lines_df["sensitivity"] = rng.uniform(0.3, 1.2, size=len(lines_df))  # 0.3–1.2× sensitivity
-    lines_df["base_load_factor"] = rng.uniform(0.3, 0.8, size=len(lines_df))  # baseline utilization
+    sensitivity = rng.uniform(0.3, 1.2, size=n)        # 0.3–1.2× sensitivity
+    base_load_factor = rng.uniform(0.3, 0.8, size=n)   # baseline utilization
 
+    statics = LineStatics(lines_df["name"].to_numpy(), rating, p0, sensitivity,
+                          base_load_factor, bool((p0 == 0).all()))
+    with _statics_lock:
+        _statics_cache[key] = statics
+        while len(_statics_cache) > STATICS_CACHE_SIZE:
+            _statics_cache.popitem(last=False)
+    return statics
+
+
+def stress_class(stress):
+    """Color class of each stress value (index into STRESS_COLORS)"""
+    return np.searchsorted(STRESS_BINS, stress, side="left")
+
+
+def stress_kernel(statics: LineStatics, temp: float, wind: float, flows=None) -> StressArrays:
+    """Slider dependent part of the model.  Pure NumPy, O(lines).
+
+    flows: per-line MW (e.g. from power_flow) used instead of p0_nominal
+    """
+    rating = statics.rating
+
+    if flows is not None:
+        p0 = np.abs(np.asarray(flows, dtype=float))
     # If p0_nominal all zeros, create per-line values that vary differently with sliders
-    if (lines_df["p0_nominal"] == 0).all():
+    elif statics.synthetic_load:
         # Temperature increases load, wind cools (reduces load)
-        lines_df["p0_nominal"] = (
-            lines_df["rating"]
-            * (lines_df["base_load_factor"]
-               + lines_df["sensitivity"] * (0.01 * (temp - 25) - 0.005 * wind))
-        ).clip(lower=0.0)
+        p0 = rating * (statics.base_load_factor
+                       + statics.sensitivity * (0.01 * (temp - 25) - 0.005 * wind))
+        p0 = np.maximum(p0, 0.0)
+    else:
+        p0 = statics.p0_nominal
 
     # Compute dynamic rating (cooling effect)
-    lines_df["rating_dynamic"] = (
-        lines_df["rating"]
-        * np.sqrt((T_MOT - temp) / (T_MOT - T_ref))
-        * (1 + k_w * wind)
-    ).clip(lower=1e-3)
+    with np.errstate(invalid="ignore"):
+        rating_dynamic = rating * np.sqrt((T_MOT - temp) / (T_MOT - T_REF)) * (1 + K_W * wind)
+    rating_dynamic = np.where(rating_dynamic < 1e-3, 1e-3, rating_dynamic)
 
     # Stress (percentage)
-    lines_df["stress"] = (lines_df["p0_nominal"] / lines_df["rating_dynamic"]) * 100
-    lines_df["stress"] = lines_df["stress"].fillna(0).clip(0, 200)
-
-    # Color mapping
-    def stress_color(s):
-        if s > 100: return "#8B0000"
-        elif s > 90: return "#FF0000"
-        elif s > 70: return "#FFA500"
-        elif s > 50: return "#FFFF00"
-        else: return "#00FF00"
-
-    lines_df["color"] = lines_df["stress"].apply(stress_color)
-    return lines_df[["name", "rating_dynamic", "p0_nominal", "stress", "color"]]
\ No newline at end of file
+    stress = p0 / rating_dynamic * 100
+    stress = np.clip(np.nan_to_num(stress, nan=0.0), 0, 200)
+    return StressArrays(rating_dynamic, p0, stress, stress_class(stress))
+
+
+def compute_stress(lines_df: pd.DataFrame, temp: float, wind: float) -> pd.DataFrame:
+    """
+    Compute stress level on transmission lines based on ambient temperature and wind speed.
+    Lines now respond individually to environmental changes — only some are affected strongly.
+    """
+    statics = line_statics(lines_df)
+    out = stress_kernel(statics, temp, wind)
+    return pd.DataFrame({
+        "name": statics.name,
+        "rating_dynamic": out.rating_dynamic,
+        "p0_nominal": out.p0_nominal,
+        "stress": out.stress,
+        "color": STRESS_COLORS[out.stress_class],
+    })
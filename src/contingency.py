@@ -0,0 +1,86 @@
+"""N-1 contingency screening with PTDF / LODF
+
+PTDF[l, i]: change of the flow on line l per MW injected at bus i (and taken
+at the island's reference bus).  LODF[l, k]: share of line k's pre-outage flow
+that moves onto line l when k trips.  Both only depend on the network, so they
+are computed once from a power_flow.DCPowerFlow.  The post-contingency flows
+of all single outages are then
+
+    post[l, k] = flow[l] + LODF[l, k] * flow[k]
+
+which is one (n_line, n_line) array operation instead of one power flow per
+outage.
+
+Outages that split an island (radial lines, PTDF_kk == 1) can't be handled by
+the LODF; those columns are flagged in `islanding` and skipped.
+"""
+from typing import NamedTuple
+import numpy as np
+
+# |1 - H_kk| below this means the outage disconnects part of the network
+ISLANDING_TOL = 1e-6
+
+
+class ContingencyResult(NamedTuple):
+    worst_outage: np.ndarray    # line position of the worst outage for every line, -1 if no
+                                # outage increases its flow
+    worst_flow: np.ndarray      # post-contingency flow (MW) for that outage
+    worst_loading: np.ndarray   # |worst_flow| / rating * 100
+    base_loading: np.ndarray    # |flow| / rating * 100, no outage
+    islanding: np.ndarray       # bool per line: its outage splits the network
+
+
+def ptdf(pf):
+    """Dense (n_line, n_bus) PTDF of a DCPowerFlow.  Reference bus columns are zero."""
+    Bf = pf.Bf.tocsc()
+    out = np.zeros((Bf.shape[0], pf.n_bus))
+    # B_red is symmetric: PTDF_red = Bf_red B_red^-1 = (B_red^-1 Bf_red^T)^T
+    out[:, pf.pvpq] = pf._lu.solve(np.ascontiguousarray(Bf[:, pf.pvpq].T.toarray())).T
+    return out
+
+
+def lodf(pf, ptdf_matrix=None):
+    """(n_line, n_line) LODF and the islanding mask.  LODF[k, k] = -1."""
+    P = ptdf(pf) if ptdf_matrix is None else ptdf_matrix
+    H = np.asarray((pf.A @ P.T).T)            # H[l, k]: flow on l per MW moved across line k
+    denom = 1.0 - np.diag(H)
+    islanding = (np.abs(denom) < ISLANDING_TOL) | ~pf.active
+    with np.errstate(divide="ignore", invalid="ignore"):
+        L = H / np.where(islanding, 1.0, denom)
+    L[:, islanding] = 0.0
+    np.fill_diagonal(L, -1.0)
+    return L, islanding
+
+
+class ContingencyAnalysis:
+    def __init__(self, pf):
+        self.pf = pf
+        self.ptdf = ptdf(pf)
+        self.lodf, self.islanding = lodf(pf, self.ptdf)
+
+    def post_flows(self, flows):
+        """(n_line, n_line) flows on every line (rows) for every outage (columns)"""
+        flows = np.asarray(flows, dtype=float)
+        return flows[:, None] + self.lodf * flows[None, :]
+
+    def screen(self, flows, ratings):
+        """Worst single outage for every line.
+
+        flows: base case line flows (MW)
+        ratings: line ratings (MVA), e.g. the dynamic IEEE-738 ratings
+        """
+        flows = np.asarray(flows, dtype=float)
+        ratings = np.asarray(ratings, dtype=float)
+        post = np.abs(self.post_flows(flows))
+        # the outaged line itself and outages the LODF can't model are excluded
+        post[:, self.islanding] = -np.inf
+        np.fill_diagonal(post, -np.inf)
+        worst = np.argmax(post, axis=1)
+        rows = np.arange(len(flows))
+        worst_abs = post[rows, worst]
+        valid = np.isfinite(worst_abs) & (worst_abs > np.abs(flows) * (1 + 1e-9))
+        worst = np.where(valid, worst, -1)
+        worst_flow = np.where(valid, flows + self.lodf[rows, worst] * flows[worst], flows)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            load = lambda f: np.where(ratings > 0, np.abs(f) / ratings * 100, 0.0)
+            return ContingencyResult(worst, worst_flow, load(worst_flow), load(flows), self.islanding.copy())
@@ -0,0 +1,94 @@
+"""Process-wide cache for the static inputs of the app
+
+Streamlit reruns the whole script on every interaction and runs each browser
+session in its own thread.  The network CSVs and the background image don't
+change between reruns, so they are parsed once per process and shared by all
+sessions.  Entries are keyed on the files' modification times: touching a
+file invalidates its entry on the next access.
+
+Cached objects are shared, so callers must not modify them in place.
+"""
+import os
+import threading
+from typing import NamedTuple
+import numpy as np
+import pandas as pd
+
+_lock = threading.Lock()
+_cache = {}
+_stats = {"hits": 0, "misses": 0}
+
+
+class Network(NamedTuple):
+    buses: pd.DataFrame        # 'name' as str
+    lines: pd.DataFrame        # bus0/bus1 renamed to bus_a/bus_b, as str
+    bus_coords: pd.DataFrame   # x, y indexed by bus name
+    bus_names: pd.Series       # BusName indexed by bus name
+    line_kv: np.ndarray        # v_nom of each line's bus_a (138 if unknown)
+
+
+def _cached(kind, paths, build):
+    """Return build(*paths), rebuilt only when one of the files changes"""
+    key = (kind,) + tuple((p, os.stat(p).st_mtime_ns) for p in paths)
+    with _lock:
+        if key in _cache:
+            _stats["hits"] += 1
+            return _cache[key]
+    value = build(*paths)
+    with _lock:
+        # drop stale versions of the same entry
+        for k in [k for k in _cache if k[0] == kind and tuple(p for p, _ in k[1:]) == tuple(paths)]:
+            del _cache[k]
+        _cache[key] = value
+        _stats["misses"] += 1
+    return value
+
+
+def _build_network(buses_path, lines_path):
+    buses = pd.read_csv(buses_path)
+    lines = pd.read_csv(lines_path)
+    lines = lines.rename(columns={"bus0": "bus_a", "bus1": "bus_b"})
+    lines["bus_a"] = lines["bus_a"].astype(str)
+    lines["bus_b"] = lines["bus_b"].astype(str)
+    buses["name"] = buses["name"].astype(str)
+    by_name = buses.set_index("name")
+    bus_names = by_name["BusName"] if "BusName" in by_name else by_name.index.to_series()
+    line_kv = lines["bus_a"].map(by_name["v_nom"]).fillna(138.0).to_numpy(dtype=float)
+    return Network(buses, lines, by_name[["x", "y"]], bus_names, line_kv)
+
+
+def load_network(buses_path="data/csv/buses.csv", lines_path="data/csv/lines.csv"):
+    """Parsed buses/lines plus the bus coordinate and name index"""
+    return _cached("network", (buses_path, lines_path), _build_network)
+
+
+def load_flows(flows_path="data/csv/line_flows_nominal.csv"):
+    """p0_nominal indexed by line name"""
+    return _cached("flows", (flows_path,),
+                   lambda p: pd.read_csv(p).set_index("name")["p0_nominal"])
+
+
+def _build_background(img_path):
+    import matplotlib.image as mpimg
+    img = mpimg.imread(img_path)
+    img_gray = np.mean(img[..., :3], axis=-1) if img.ndim == 3 else img
+    img_inv = 1 - img_gray
+    img_inv.setflags(write=False)
+    return img_inv
+
+
+def load_background(img_path="data/gis/honolulu.jpg"):
+    """Inverted grayscale raster of the background image"""
+    return _cached("background", (img_path,), _build_background)
+
+
+def cache_stats():
+    """Hit/miss counters and the number of cached entries"""
+    with _lock:
+        return dict(_stats, entries=len(_cache))
+
+
+def clear_cache():
+    with _lock:
+        _cache.clear()
+        _stats.update(hits=0, misses=0)
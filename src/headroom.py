@@ -0,0 +1,180 @@
+"""Headroom: the weather at which each line crosses each stress threshold
+
+Stress rises with ambient temperature and falls with wind in both models
+(compute_stress and IEEE-738), so for every line and threshold there is one
+critical temperature at a given wind, and one critical wind at a given
+temperature.  Both are found by vectorized bisection over whole
+(wind grid x thresholds x lines) arrays and stored in a HeadroomTable.
+
+After that, a slider move is interpolation along the grid plus a comparison:
+a line is above a threshold exactly when temp > T_crit(wind).  The cost no
+longer depends on how expensive the stress model is.
+
+Tables are stored as float32 and solved one threshold at a time, so memory
+is 4 bytes per (grid point, threshold, line); solve only the thresholds
+you need on big networks.
+
+Grid values are in the app's units: temperature in degC, wind in m/s.
+"""
+from typing import NamedTuple
+import numpy as np
+from lib.ieee738.vectorized import steady_state_thermal_rating
+from src.compute_stress import STRESS_BINS, line_statics, stress_kernel
+from src.spans import wind_angle
+from src.stress_model import line_conductor_params
+
+TEMP_RANGE = (10.0, 75.0)
+WIND_RANGE = (0.0, 15.0)
+TEMP_GRID = np.linspace(*TEMP_RANGE, 261)       # 0.25 degC
+WIND_GRID = np.linspace(*WIND_RANGE, 151)       # 0.1 m/s
+
+# bisection steps; 30 halvings of a 65 degC bracket is ~6e-8 degC
+ITERATIONS = 30
+
+
+def bisect(f, target, lo, hi, increasing=True, iterations=ITERATIONS):
+    """x in [lo, hi] with f(x) == target, elementwise, for monotonic f
+
+    f takes an array of x broadcast against target.  Elements where f never
+    reaches target in the bracket get +inf (target not reached at hi for
+    increasing f) or -inf (already past target at lo).
+    """
+    target = np.asarray(target, dtype=float)
+    lo = np.broadcast_to(np.asarray(lo, dtype=float), target.shape).copy()
+    hi = np.broadcast_to(np.asarray(hi, dtype=float), target.shape).copy()
+    sign = 1.0 if increasing else -1.0
+    f_lo = sign * (f(lo) - target)
+    f_hi = sign * (f(hi) - target)
+    for _ in range(iterations):
+        mid = (lo + hi) / 2
+        above = sign * (f(mid) - target) > 0
+        hi = np.where(above, mid, hi)
+        lo = np.where(above, lo, mid)
+    x = (lo + hi) / 2
+    x = np.where(f_lo > 0, -np.inf, x)
+    return np.where(f_hi <= 0, np.inf, x)
+
+
+class HeadroomTable(NamedTuple):
+    thresholds: np.ndarray     # stress thresholds, same units as the model
+    wind_grid: np.ndarray
+    temp_grid: np.ndarray
+    T_crit: np.ndarray         # (wind grid, thresholds, lines): degC, float32
+    W_crit: np.ndarray         # (temp grid, thresholds, lines): m/s, float32
+
+    def _at(self, grid, table, x):
+        """Linear interpolation of table along its first axis at scalar x"""
+        x = float(np.clip(x, grid[0], grid[-1]))
+        i = min(int(np.searchsorted(grid, x, side="right")) - 1, len(grid) - 2)
+        w = (x - grid[i]) / (grid[i + 1] - grid[i])
+        a, b = table[i], table[i + 1]
+        with np.errstate(invalid="ignore"):
+            out = a + w * (b - a)
+        # inf endpoints: keep the nearer one
+        return np.where(np.isfinite(a) & np.isfinite(b), out, a if w < 0.5 else b)
+
+    def crit_temperature(self, wind):
+        """(thresholds, lines) critical temperatures at this wind"""
+        return self._at(self.wind_grid, self.T_crit, wind)
+
+    def crit_wind(self, temp):
+        """(thresholds, lines) critical wind speeds at this temperature"""
+        return self._at(self.temp_grid, self.W_crit, temp)
+
+    def stress_class(self, temp, wind):
+        """Number of thresholds each line is above (index into the colour table)"""
+        return np.count_nonzero(temp > self.crit_temperature(wind), axis=0)
+
+    def margins(self, temp, wind, threshold):
+        """(degC, m/s) left before each line reaches `threshold`.  Negative
+        when it is already above; inf when the grid range never gets there."""
+        j = int(np.flatnonzero(np.isclose(self.thresholds, threshold))[0])
+        return self.crit_temperature(wind)[j] - temp, wind - self.crit_wind(temp)[j]
+
+
+def solve_headroom(stress_fn, thresholds, temp_grid=TEMP_GRID, wind_grid=WIND_GRID):
+    """Tabulate critical temperatures and winds for a stress model
+
+    Args:
+      - stress_fn(temp, wind): stress of every line, broadcasting temp and
+        wind arrays against a trailing lines axis
+      - thresholds: stress thresholds to solve for
+    """
+    thresholds = np.asarray(thresholds, dtype=float)
+    n_lines = np.shape(stress_fn(temp_grid[0], wind_grid[0]))[-1]
+    T_crit = np.empty((len(wind_grid), len(thresholds), n_lines), dtype=np.float32)
+    W_crit = np.empty((len(temp_grid), len(thresholds), n_lines), dtype=np.float32)
+
+    wind = wind_grid[:, None]
+    temp = temp_grid[:, None]
+    for k, thr in enumerate(thresholds):
+        T_crit[:, k] = bisect(lambda t: stress_fn(t, wind), np.full((len(wind_grid), n_lines), thr),
+                              temp_grid[0], temp_grid[-1], increasing=True)
+        # a line is above the threshold while wind < W_crit (+inf: at any wind, -inf: never)
+        W_crit[:, k] = bisect(lambda w: stress_fn(temp, w), np.full((len(temp_grid), n_lines), thr),
+                              wind_grid[0], wind_grid[-1], increasing=False)
+    return HeadroomTable(thresholds, wind_grid, temp_grid, T_crit, W_crit)
+
+
+def compute_stress_model(lines_df, flows=None):
+    """stress_fn for the compute_stress model (percent); flows as in stress_kernel"""
+    statics = line_statics(lines_df)
+    return lambda temp, wind: stress_kernel(statics, temp, wind, flows).stress
+
+
+def ieee_model(lines_df, flows_mva, v_kv, ambient):
+    """stress_fn for IEEE-738 ratings (percent): |flow| / rating"""
+    cond, _ = line_conductor_params(lines_df)
+    params = dict(ambient)
+    params.update({k: cond[k].to_numpy() for k in cond.columns})
+    flows = np.abs(np.asarray(flows_mva, dtype=float))
+    scale = np.sqrt(3) * np.asarray(v_kv, dtype=float) * 1e-3
+
+    def stress(temp, wind):
+        amps = steady_state_thermal_rating(dict(params, Ta=temp, WindVelocity=wind * 3.28084)).rating
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(amps > 0, flows / (amps * scale) * 100, np.inf)
+    return stress
+
+
+def span_model(rater, lines_df, flows_mva, v_kv, ambient, wind_from_deg=None):
+    """stress_fn for IEEE-738 ratings at each line's weakest span (percent),
+    as spans.SpanRater rates them; lines without spans use ieee_model()"""
+    line_stress = ieee_model(lines_df, flows_mva, v_kv, ambient)
+    order = np.argsort(rater.span_line, kind="stable")
+    span_line = rater.span_line[order]
+    params = dict(ambient)
+    params.update({k: v[order] for k, v in rater.params.items()})
+    params["Direction"] = rater.bearing[order]
+    if wind_from_deg is not None:
+        params["WindAngleDeg"] = wind_angle(wind_from_deg, params["Direction"])
+    counts = np.bincount(span_line, minlength=rater.n_lines)
+    has_spans = counts > 0
+    starts = np.r_[0, np.cumsum(counts)][:-1][has_spans]
+    flows = np.abs(np.asarray(flows_mva, dtype=float))[span_line]
+    scale = np.sqrt(3) * np.asarray(v_kv, dtype=float)[span_line] * 1e-3
+
+    def stress(temp, wind):
+        out = line_stress(temp, wind)
+        temp = np.broadcast_to(temp, out.shape)[..., span_line]
+        wind = np.broadcast_to(wind, out.shape)[..., span_line]
+        amps = steady_state_thermal_rating(dict(params, Ta=temp, WindVelocity=wind * 3.28084)).rating
+        with np.errstate(divide="ignore", invalid="ignore"):
+            span = np.where(amps > 0, flows / (amps * scale) * 100, np.inf)
+        if len(starts):
+            # the weakest span carries the highest stress; NaN spans are skipped
+            out[..., has_spans] = np.fmax.reduceat(span, starts, axis=-1)
+        return out
+    return stress
+
+
+def compute_stress_headroom(lines_df, flows=None, thresholds=STRESS_BINS):
+    return solve_headroom(compute_stress_model(lines_df, flows), thresholds)
+
+
+def ieee_headroom(lines_df, flows_mva, v_kv, ambient, thresholds=STRESS_BINS):
+    return solve_headroom(ieee_model(lines_df, flows_mva, v_kv, ambient), thresholds)
+
+
+def span_headroom(rater, lines_df, flows_mva, v_kv, ambient, wind_from_deg=None, thresholds=STRESS_BINS):
+    return solve_headroom(span_model(rater, lines_df, flows_mva, v_kv, ambient, wind_from_deg), thresholds)
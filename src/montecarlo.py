@@ -0,0 +1,181 @@
+"""Monte Carlo ratings under forecast uncertainty
+
+Samples weather scenarios around a point forecast, rates every line for every
+sample and reduces the stress samples to per-line quantiles and exceedance
+probabilities.
+
+Scenario model (island-wide, one value per sample):
+    Ta            forecast + normal(Ta_sd)
+    wind          forecast * lognormal(wind_sd), so it stays positive
+    wind angle    forecast + normal(angle_sd), folded into 0-90 deg
+    solar         Absorptivity scaled by a clearness factor in
+                  [clear_min, 1]; qs is linear in it, so this stands in for
+                  cloud cover
+
+The samples are drawn in the parent from `seed`, so results don't depend on
+the number of workers.  Line parameters, samples and the per-line results
+live in shared memory; each worker process attaches to them, rates a block
+of lines against all samples (in batches of at most BATCH_ELEMENTS) and
+writes its rows of the result arrays.  Nothing but the block bounds is
+pickled.
+
+Stress is flow / rating (1.0 = 100%), as in src.sweep.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import NamedTuple
+import numpy as np
+import pandas as pd
+from lib.ieee738.vectorized import steady_state_thermal_rating
+from src.sweep import SWEEP_AMBIENT
+
+QUANTILES = (0.05, 0.5, 0.95)
+THRESHOLDS = (0.9, 1.0)
+
+# lines x samples rated per batch in each worker
+BATCH_ELEMENTS = 1_000_000
+
+_LINE_COLUMNS = ("Diameter", "RLo", "RHi", "TLo", "THi", "Tc", "v_nom", "flow_mva")
+_SAMPLE_COLUMNS = ("Ta", "WindVelocity", "WindAngleDeg", "Absorptivity")
+
+
+class Uncertainty(NamedTuple):
+    Ta_sd: float = 1.5          # degC
+    wind_sd: float = 0.35       # sigma of the log of the wind speed
+    angle_sd: float = 25.0      # deg
+    clear_min: float = 0.3      # lowest solar clearness factor
+
+
+class MonteCarloResult(NamedTuple):
+    names: np.ndarray
+    quantiles: tuple
+    stress_q: np.ndarray        # (lines, quantiles)
+    thresholds: tuple
+    p_exceed: np.ndarray        # (lines, thresholds): P(stress > threshold)
+    n_samples: int
+    seed: int
+
+    def to_frame(self):
+        out = pd.DataFrame({"name": self.names})
+        for j, q in enumerate(self.quantiles):
+            out["stress_p{:g}".format(q * 100)] = self.stress_q[:, j]
+        for j, t in enumerate(self.thresholds):
+            out["p_above_{:g}".format(t * 100)] = self.p_exceed[:, j]
+        return out
+
+
+def sample_weather(n_samples, Ta, wind_ms, wind_angle=90.0, uncertainty=Uncertainty(),
+                   seed=0, ambient=None):
+    """(n_samples,) arrays of Ta, WindVelocity (ft/s), WindAngleDeg and Absorptivity"""
+    ambient = SWEEP_AMBIENT if ambient is None else ambient
+    rng = np.random.default_rng(seed)
+    u = uncertainty
+    angle = (wind_angle + rng.normal(0.0, u.angle_sd, n_samples)) % 180.0
+    return {
+        "Ta": Ta + rng.normal(0.0, u.Ta_sd, n_samples),
+        "WindVelocity": wind_ms * 3.28084 * rng.lognormal(0.0, u.wind_sd, n_samples),
+        "WindAngleDeg": np.minimum(angle, 180.0 - angle),
+        "Absorptivity": ambient["Absorptivity"] * rng.uniform(u.clear_min, 1.0, n_samples),
+    }
+
+
+class _Shared:
+    """A float64 array in shared memory, described by (name, shape)"""
+    def __init__(self, shape, data=None, name=None):
+        self.shape = tuple(shape)
+        size = max(1, int(np.prod(self.shape)) * 8)
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.array = np.ndarray(self.shape, dtype=np.float64, buffer=self.shm.buf)
+        if data is not None:
+            self.array[...] = data
+
+    @property
+    def spec(self):
+        return self.shm.name, self.shape
+
+    def close(self, unlink=False):
+        self.array = None
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+def _rate_block(specs, start, stop, ambient, quantiles, thresholds):
+    """Worker: rate lines[start:stop] against every sample, write their stats"""
+    shared = {k: _Shared(shape, name=name) for k, (name, shape) in specs.items()}
+    try:
+        lines, samples = shared["lines"].array, shared["samples"].array
+        n_samples = samples.shape[0]
+        params = dict(ambient)
+        for j, k in enumerate(_SAMPLE_COLUMNS):
+            params[k] = samples[:, j][:, None]
+        step = max(1, BATCH_ELEMENTS // max(n_samples, 1))
+        for a in range(start, stop, step):
+            b = min(stop, a + step)
+            block = lines[a:b]
+            for j, k in enumerate(_LINE_COLUMNS[:6]):
+                params[k] = block[:, j][None, :]
+            amps = steady_state_thermal_rating(params, night_zero=True).rating
+            rating_mva = np.sqrt(3) * amps * block[:, 6][None, :] * 1e-3
+            with np.errstate(divide="ignore", invalid="ignore"):
+                stress = np.where(rating_mva > 0, block[:, 7][None, :] / rating_mva, np.inf)
+            shared["stress_q"].array[a:b] = np.quantile(stress, quantiles, axis=0).T
+            shared["p_exceed"].array[a:b] = np.stack(
+                [np.count_nonzero(stress > t, axis=0) / n_samples for t in thresholds], axis=1)
+    finally:
+        for s in shared.values():
+            s.close()
+
+
+def run_monte_carlo(lines, Ta, wind_ms, wind_angle=90.0, n_samples=2000, seed=0,
+                    uncertainty=Uncertainty(), workers=None, ambient=None,
+                    quantiles=QUANTILES, thresholds=THRESHOLDS):
+    """
+    Args:
+      - lines: table from src.sweep.load_lines() (conductor params, v_nom, flow_mva)
+      - Ta, wind_ms, wind_angle: the point forecast
+      - workers: worker processes (None: CPU count, 1: run in this process)
+    Returns:
+      - MonteCarloResult
+    """
+    ambient = dict(SWEEP_AMBIENT if ambient is None else ambient)
+    samples = sample_weather(n_samples, Ta, wind_ms, wind_angle, uncertainty, seed, ambient)
+    for k in _SAMPLE_COLUMNS:
+        ambient.pop(k, None)
+    n_lines = len(lines)
+    workers = os.cpu_count() if workers is None else workers
+    workers = max(1, min(workers, n_lines))
+
+    shared = {
+        "lines": _Shared((n_lines, len(_LINE_COLUMNS)),
+                         np.column_stack([lines[k].to_numpy(dtype=float) for k in _LINE_COLUMNS])),
+        "samples": _Shared((n_samples, len(_SAMPLE_COLUMNS)),
+                           np.column_stack([samples[k] for k in _SAMPLE_COLUMNS])),
+        "stress_q": _Shared((n_lines, len(quantiles))),
+        "p_exceed": _Shared((n_lines, len(thresholds))),
+    }
+    try:
+        specs = {k: s.spec for k, s in shared.items()}
+        bounds = np.linspace(0, n_lines, workers + 1).astype(int)
+        args = [(specs, a, b, ambient, quantiles, thresholds) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+        if workers == 1:
+            for a in args:
+                _rate_block(*a)
+        else:
+            # spawn: forking a threaded caller (e.g. the Streamlit server) can
+            # copy locks held by other threads into the workers
+            with ProcessPoolExecutor(max_workers=workers,
+                                     mp_context=multiprocessing.get_context("spawn")) as pool:
+                for f in [pool.submit(_rate_block, *a) for a in args]:
+                    f.result()
+        return MonteCarloResult(lines["name"].to_numpy(), tuple(quantiles),
+                                shared["stress_q"].array.copy(), tuple(thresholds),
+                                shared["p_exceed"].array.copy(), n_samples, seed)
+    finally:
+        for s in shared.values():
+            s.close(unlink=True)
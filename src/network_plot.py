@@ -0,0 +1,146 @@
+"""Network figure with a static base layer and batched line/bus artists
+
+All lines are one LineCollection and all buses one scatter, so the number of
+matplotlib artists doesn't grow with the network.  The figure, background,
+labels and geometry are built once; update() only swaps the color and width
+arrays.  Figures aren't thread safe, so keep one NetworkPlot per session.
+
+render() draws a frame for the browser: the static layer is rasterised once
+and kept as a bitmap, each frame restores it and draws only the lines, buses
+and labels on top, then encodes a JPEG.  frame_key() names a frame by what
+it shows, so callers can cache the encoded frames across reruns.
+"""
+import hashlib
+import io
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+from PIL import Image
+
+BG_COLOR = "#131a2e"
+
+# Bus labels get unreadable (and slow to draw) on big networks
+LABEL_LIMIT = 200
+# Line widths are drawn on this grid (points), so nearby stresses share a frame
+WIDTH_STEP = 0.25
+# JPEG quality of rendered frames
+FRAME_QUALITY = 90
+# Margin kept around the drawing when cropping a frame (inches, as savefig)
+FRAME_PAD = 0.1
+
+
+def line_widths(stress):
+    """Line width in points for stress in percent"""
+    return np.maximum(1.8, 1.8 + 7.0 * (np.asarray(stress, dtype=float) / 100.0))
+
+
+def quantize_widths(line_width):
+    """Line widths on the WIDTH_STEP grid"""
+    return np.round(np.asarray(line_width, dtype=float) / WIDTH_STEP) * WIDTH_STEP
+
+
+def frame_key(line_color, line_width, node_color):
+    """Digest of a frame's colors and (quantized) widths"""
+    h = hashlib.blake2b(digest_size=16)
+    for part in (np.asarray(line_color).astype("U7"), np.round(np.asarray(line_width) / WIDTH_STEP),
+                 np.asarray(node_color).astype("U7")):
+        h.update(np.ascontiguousarray(part).tobytes())
+    return h.digest()
+
+
+def background_extent(buses_df):
+    """Where the Oahu silhouette goes relative to the bus coordinates"""
+    bxmin, bxmax = buses_df["x"].min(), buses_df["x"].max()
+    bymin, bymax = buses_df["y"].min(), buses_df["y"].max()
+    b_w, b_h = bxmax - bxmin, bymax - bymin
+
+    pad_x, pad_y = b_w * 0.15, b_h * 0.15
+    shift_x, shift_y = -b_w * 0.06, b_h * 0.02
+
+    return [
+        bxmin - pad_x + shift_x,
+        bxmax + pad_x + shift_x,
+        bymin - pad_y + shift_y,
+        bymax + pad_y + shift_y
+    ]
+
+
+class NetworkPlot:
+    def __init__(self, network, background=None, alpha=0.35, label_limit=LABEL_LIMIT):
+        """
+        network: data_cache.Network
+        background: image array for the silhouette (optional)
+        """
+        self.network = network
+        buses, lines = network.buses, network.lines
+
+        self.fig = Figure(figsize=(12, 8), dpi=120)
+        self.fig.patch.set_facecolor(BG_COLOR)
+        ax = self.ax = self.fig.add_subplot()
+        ax.set_facecolor(BG_COLOR)
+        ax.axis("off")
+
+        # Oahu Silhouette
+        if background is not None:
+            ax.set_facecolor("black")
+            ax.imshow(background, extent=background_extent(buses), aspect='auto',
+                      zorder=0, alpha=alpha, cmap="gray")
+
+        # Line geometry.  Lines with an unknown bus are left out.
+        coords = network.bus_coords
+        a = coords.reindex(lines["bus_a"]).to_numpy(dtype=float)
+        b = coords.reindex(lines["bus_b"]).to_numpy(dtype=float)
+        self.line_mask = ~(np.isnan(a).any(axis=1) | np.isnan(b).any(axis=1))
+        segments = np.stack([a[self.line_mask], b[self.line_mask]], axis=1)
+        self.lines = LineCollection(segments, colors="#00FF00", linewidths=1.8, alpha=0.95,
+                                    capstyle="round", zorder=2)
+        ax.add_collection(self.lines)
+
+        self.buses = ax.scatter(buses["x"], buses["y"], s=220, color="#00FF00",
+                                edgecolors="white", linewidths=1.4, zorder=3)
+        if len(buses) <= label_limit:
+            for x, y, name in zip(buses["x"], buses["y"], buses["name"]):
+                ax.text(x, y, str(name), fontsize=9, ha="center", va="center",
+                        color="white", zorder=4)
+        ax.autoscale_view()
+
+        self.canvas = FigureCanvasAgg(self.fig)
+        # drawn on every frame; the rest is the cached static layer
+        self._dynamic = [self.lines, self.buses] + list(ax.texts)
+        self._static = None
+        self._crop = None
+
+    def update(self, line_color, line_width, node_color):
+        """Per-line color/width (aligned with network.lines) and per-bus color"""
+        m = self.line_mask
+        self.lines.set_color(np.asarray(line_color)[m])
+        self.lines.set_linewidth(np.asarray(line_width)[m])
+        self.buses.set_facecolor(node_color)
+        return self.fig
+
+    def _draw_static(self):
+        for a in self._dynamic:
+            a.set_animated(True)
+        self.canvas.draw()
+        self._static = self.canvas.copy_from_bbox(self.fig.bbox)
+        # same crop as savefig(bbox_inches="tight"), in pixels from the top left
+        box = self.fig.get_tightbbox(self.canvas.get_renderer()).padded(FRAME_PAD)
+        dpi, h = self.fig.dpi, self.fig.bbox.height
+        x0, x1 = max(int(box.x0 * dpi), 0), int(np.ceil(box.x1 * dpi))
+        y0, y1 = max(int(h - box.y1 * dpi), 0), int(np.ceil(h - box.y0 * dpi))
+        self._crop = (slice(y0, y1), slice(x0, x1))
+
+    def render(self, line_color, line_width, node_color, quality=FRAME_QUALITY):
+        """JPEG bytes of the figure with these colors/widths (see update).
+        Only the lines, buses and labels are drawn; the static layer is reused."""
+        self.update(line_color, line_width, node_color)
+        if self._static is None:
+            self._draw_static()
+        self.canvas.restore_region(self._static)
+        for a in self._dynamic:
+            self.ax.draw_artist(a)
+        rgb = np.asarray(self.canvas.buffer_rgba())[self._crop][..., :3]
+        buf = io.BytesIO()
+        Image.fromarray(rgb).save(buf, format="jpeg", quality=quality)
+        return buf.getvalue()
@@ -0,0 +1,219 @@
+"""DC power flow with a cached factorisation
+
+The susceptance matrix only depends on the network, so it is built and
+factorised (sparse LU) once.  Every solve after that is a pair of triangular
+solves, and many injection scenarios are solved together as the columns of
+one right-hand side.
+
+Units: line susceptance is v_nom**2 / x (kV, ohm), so injections and flows
+are in MW and angles in radians.  Lines with status 0 or no reactance carry
+no flow.
+
+lines.csv has no transformers, so from_network() ties every 138 kV bus to
+the lower-voltage bus at the same site (same x, y) with a TRANSFORMER_X
+branch.  Ties only enter the susceptance matrix; flows, PTDF and LODF stay
+per line.  A network can still be split into islands; each island gets its
+own reference bus, which is the Slack bus if the island has one, otherwise
+its first PV bus, otherwise its first bus.
+
+There is no generator data either.  load_injections() shares each island's
+load between its generator (Slack/PV) buses, equally by default, or in the
+proportions fitted by fit_dispatch() to a solved case such as
+line_flows_nominal.csv.  The flows are linear in the load scale, so
+scaled_flows() reuses one base solve.
+"""
+from typing import NamedTuple
+import numpy as np
+import scipy.sparse as sp
+from scipy.optimize import nnls
+from scipy.sparse.csgraph import connected_components
+from scipy.sparse.linalg import splu
+
+# reactance of the 138/69 kV transformers missing from lines.csv: 0.1 pu on
+# 100 MVA, as ohm on the 138 kV side
+TRANSFORMER_X = 0.1 * 138.0 ** 2 / 100.0
+# sign iterations of fit_dispatch()
+DISPATCH_ITER = 20
+
+
+class Islands(NamedTuple):
+    label: np.ndarray      # island of every bus
+    ref: np.ndarray        # reference bus position of every island
+
+
+def site_transformers(buses, x=TRANSFORMER_X):
+    """(from_bus, to_bus, b) ties from every 138 kV bus to each lower-voltage bus
+    with the same coordinates (one substation)"""
+    v = buses["v_nom"].to_numpy(dtype=float)
+    site = buses[["x", "y"]].to_numpy(dtype=float).round(6)
+    hv, lv = [], []
+    for i in np.flatnonzero(v >= 138.0):
+        for j in np.flatnonzero((site == site[i]).all(axis=1) & (v < v[i])):
+            hv.append(i)
+            lv.append(j)
+    hv, lv = np.asarray(hv, dtype=int), np.asarray(lv, dtype=int)
+    return hv, lv, v[hv] ** 2 / x
+
+
+def find_islands(n_bus, from_bus, to_bus, control=None):
+    """Connected components of the in-service branches and their reference buses"""
+    adj = sp.coo_matrix((np.ones(len(from_bus)), (from_bus, to_bus)), shape=(n_bus, n_bus))
+    n, label = connected_components(adj, directed=False)
+    control = np.full(n_bus, "PQ") if control is None else np.asarray(control, dtype=str)
+    # lower rank wins, ties go to the first bus
+    rank = np.select([control == "Slack", control == "PV"], [0, 1], 2)
+    order = np.lexsort((np.arange(n_bus), rank, label))
+    first = np.r_[True, label[order][1:] != label[order][:-1]]
+    return Islands(label, order[first])
+
+
+class DCPowerFlow:
+    def __init__(self, bus_names, from_bus, to_bus, x, v_nom, in_service=None, control=None,
+                 loads=None, ties=None):
+        """
+        bus_names: bus ids, defines the bus order of injections
+        from_bus, to_bus: bus positions of every line
+        x: line reactance (ohm)
+        v_nom: line voltage (kV)
+        in_service: bool per line (default all)
+        control: 'PQ' / 'PV' / 'Slack' per bus, used to pick reference buses
+        loads: bus loads (MW) for load_injections, default zero
+        ties: (from_bus, to_bus, b) of branches that are not lines (transformers),
+              b in MW/rad.  They carry flow but get no flow, PTDF or LODF rows.
+        """
+        self.bus_names = np.asarray(bus_names)
+        n_bus, n_line = len(self.bus_names), len(from_bus)
+        x = np.asarray(x, dtype=float)
+        active = np.ones(n_line, dtype=bool) if in_service is None else np.asarray(in_service, dtype=bool)
+        active &= np.isfinite(x) & (x != 0) & (np.asarray(from_bus) != np.asarray(to_bus))
+        self.active = active
+        self.control = np.full(n_bus, "PQ") if control is None else np.asarray(control, dtype=str)
+        self.loads = np.zeros(n_bus) if loads is None else np.asarray(loads, dtype=float)
+
+        # b per line in MW/rad, zero for lines out of service
+        self.b = np.where(active, np.asarray(v_nom, dtype=float) ** 2 / np.where(active, x, 1.0), 0.0)
+        rows = np.arange(n_line)
+        # incidence: +1 at the from bus, -1 at the to bus
+        self.A = sp.csr_matrix((np.r_[np.ones(n_line), -np.ones(n_line)],
+                                (np.r_[rows, rows], np.r_[from_bus, to_bus])), shape=(n_line, n_bus))
+        self.Bf = sp.diags(self.b) @ self.A           # flow = Bf @ theta
+        self.B = (self.A.T @ self.Bf).tocsc()         # bus susceptance matrix
+        from_act, to_act = np.asarray(from_bus)[active], np.asarray(to_bus)[active]
+        if ties is not None and len(ties[0]):
+            tf, tt, tb = (np.asarray(v) for v in ties)
+            At = sp.csr_matrix((np.r_[np.ones(len(tf)), -np.ones(len(tf))],
+                                (np.r_[np.arange(len(tf)), np.arange(len(tf))], np.r_[tf, tt])),
+                               shape=(len(tf), n_bus))
+            self.B = (self.B + At.T @ sp.diags(np.asarray(tb, dtype=float)) @ At).tocsc()
+            from_act, to_act = np.r_[from_act, tf], np.r_[to_act, tt]
+        # generator share of its island's load, equal until fit_dispatch()
+        self.share = None
+
+        self.islands = find_islands(n_bus, from_act, to_act, self.control)
+        self.pvpq = np.setdiff1d(np.arange(n_bus), self.islands.ref)
+        self._lu = splu(self.B[self.pvpq][:, self.pvpq].tocsc())
+        self._base = {}
+
+    @classmethod
+    def from_network(cls, network, flows=None):
+        """From a data_cache.Network, with a transformer between the 138 kV and
+        lower-voltage buses of each site.  flows: solved line flows (MW) by
+        line name, e.g. data_cache.load_flows(), to fit the dispatch to."""
+        buses, lines = network.buses, network.lines
+        pos = {n: i for i, n in enumerate(buses["name"])}
+        known = lines["bus_a"].isin(pos) & lines["bus_b"].isin(pos)
+        from_bus = lines["bus_a"].map(pos).fillna(0).to_numpy(dtype=int)
+        to_bus = lines["bus_b"].map(pos).fillna(0).to_numpy(dtype=int)
+        status = lines["status"].to_numpy(dtype=float) > 0 if "status" in lines else np.ones(len(lines), bool)
+        control = buses["control"] if "control" in buses else None
+        loads = buses["Pd"] if "Pd" in buses else None
+        pf = cls(buses["name"], from_bus, to_bus, lines["x"], network.line_kv,
+                 status & known.to_numpy(), control, loads, site_transformers(buses))
+        if flows is not None:
+            pf.fit_dispatch(lines["name"].map(flows).to_numpy(dtype=float))
+        return pf
+
+    @property
+    def n_bus(self):
+        return len(self.bus_names)
+
+    def angles(self, injections):
+        """Bus angles (rad) for injections in MW, shape (n_bus,) or (n_bus, k).
+        Whatever doesn't balance within an island is taken by its reference bus."""
+        P = np.asarray(injections, dtype=float)
+        theta = np.zeros(P.shape)
+        theta[self.pvpq] = self._lu.solve(np.ascontiguousarray(P[self.pvpq]))
+        return theta
+
+    def solve(self, injections):
+        """Line flows (MW, from bus -> to bus) for one or many injection vectors"""
+        return self.Bf @ self.angles(injections)
+
+    def generators(self):
+        """bool per bus: Slack/PV buses, plus the reference bus of islands without one"""
+        label = self.islands.label
+        gen = np.isin(self.control, ("Slack", "PV"))
+        gen[self.islands.ref] |= np.bincount(label, weights=gen, minlength=len(self.islands.ref))[
+            label[self.islands.ref]] == 0
+        return gen
+
+    def load_injections(self, loads=None):
+        """Net injections with each island's load shared by its generator buses,
+        in the fitted proportions (fit_dispatch) or equally"""
+        loads = self.loads if loads is None else np.asarray(loads, dtype=float)
+        label = self.islands.label
+        share = self.share
+        if share is None:
+            gen = self.generators()
+            n_gen = np.bincount(label, weights=gen, minlength=len(self.islands.ref))
+            share = np.where(gen, 1.0 / np.maximum(n_gen[label], 1), 0.0)
+        island_load = np.bincount(label, weights=loads, minlength=len(self.islands.ref))
+        return share * island_load[label] - loads
+
+    def fit_dispatch(self, flows):
+        """Generator shares that reproduce solved line flows (MW, sign ignored:
+        line_flows_nominal.csv only has magnitudes).  Non-negative least squares
+        on |flow| with each island balanced; the flow signs start from the
+        equal-share solve and are re-taken from the fit until they settle.
+        Lines with NaN flow are left out.  Returns the RMS error (MW) of |flow|."""
+        flows = np.abs(np.asarray(flows, dtype=float))
+        fit = np.isfinite(flows) & self.active
+        label = self.islands.label
+        gen = np.flatnonzero(self.generators())
+        # flows per MW of generation at each generator bus, and of the loads
+        unit = np.zeros((self.n_bus, len(gen)))
+        unit[gen, np.arange(len(gen))] = 1.0
+        per_gen = self.solve(unit)[fit]
+        base = self.solve(-self.loads)[fit]
+        island_load = np.bincount(label, weights=self.loads, minlength=len(self.islands.ref))
+        # island balance rows, weighted well above the flow residuals
+        w = 1e3
+        balance = w * (label[gen][None, :] == np.arange(len(self.islands.ref))[:, None])
+
+        self.share = None
+        sign = np.sign(self.solve(self.load_injections())[fit])
+        for _ in range(DISPATCH_ITER):
+            sign = np.where(sign == 0, 1.0, sign)
+            g, _ = nnls(np.vstack([per_gen * sign[:, None], balance]),
+                        np.r_[flows[fit] - sign * base, w * island_load])
+            model = base + per_gen @ g
+            if (np.sign(model) == sign).all():
+                break
+            sign = np.sign(model)
+        share = np.zeros(self.n_bus)
+        share[gen] = g / np.where(island_load[label[gen]] > 0, island_load[label[gen]], np.inf)
+        self.share = share
+        self._base.clear()
+        return float(np.sqrt(np.mean((np.abs(model) - flows[fit]) ** 2)))
+
+    def base_flows(self):
+        """Flows for the bus loads at 100%, solved once"""
+        if "flows" not in self._base:
+            self._base["flows"] = self.solve(self.load_injections())
+        return self._base["flows"]
+
+    def scaled_flows(self, scale):
+        """Flows with all loads scaled by `scale` (scalar or array of k
+        scenarios -> (n_line,) or (n_line, k)).  No new solve."""
+        scale = np.asarray(scale, dtype=float)
+        return self.base_flows()[:, None] * scale if scale.ndim else self.base_flows() * scale
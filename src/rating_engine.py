@@ -0,0 +1,175 @@
+"""Process-wide rating engine with a shared, bounded result cache
+
+Streamlit runs every browser session on its own thread, and sessions looking
+at the same conditions ask for the same line states.  The engine quantizes
+the inputs (temperature, wind, flow snapshot), keys the result on them plus
+a tag for the model options, and keeps results in an LRU shared by every
+session:
+
+- a hit returns the cached arrays (read-only, shared between sessions)
+- concurrent requests for a key being computed wait for that computation
+  instead of starting their own (coalesced)
+- results are evicted least recently used first once their total size goes
+  over the memory budget
+
+The compute function is called with the quantized inputs, so a cached
+result is exactly what any request that maps to its key would compute.
+Errors are passed to every waiting request and not cached.
+
+    engine = get_engine()
+    stress, color = engine.evaluate(fn, temp, wind, flows, tag=("surface",))
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import NamedTuple
+import numpy as np
+
+# Default memory budget for cached results, overridable with RATING_CACHE_MB
+BUDGET_MB = 64
+# Quantization of the inputs that form the key
+TEMP_STEP = 0.1        # degC
+WIND_STEP = 0.1        # in the unit the caller passes (the app uses % of 15 m/s)
+FLOW_STEP = 0.01       # MW
+# Accounted per entry on top of its arrays (key, tuple, dict slot)
+ENTRY_OVERHEAD = 512
+
+
+class EngineStats(NamedTuple):
+    hits: int
+    misses: int            # computations started
+    coalesced: int         # requests that waited on another one's computation
+    evictions: int
+    entries: int
+    bytes: int
+    budget_bytes: int
+
+    @property
+    def hit_rate(self):
+        """Share of requests served without computing (hits and coalesced)"""
+        total = self.hits + self.misses + self.coalesced
+        return (self.hits + self.coalesced) / total if total else 0.0
+
+
+def result_bytes(value):
+    """Memory of a result: the ndarrays in it (nested tuples / lists / dicts)"""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sum(result_bytes(v) for v in value)
+    if isinstance(value, dict):
+        return sum(result_bytes(v) for v in value.values())
+    return 0
+
+
+def _freeze(value):
+    """Mark the arrays of a shared result read-only"""
+    if isinstance(value, np.ndarray):
+        value.setflags(write=False)
+    elif isinstance(value, (tuple, list)):
+        for v in value:
+            _freeze(v)
+    elif isinstance(value, dict):
+        for v in value.values():
+            _freeze(v)
+    return value
+
+
+class RatingEngine:
+    def __init__(self, budget_bytes=BUDGET_MB * 2**20, temp_step=TEMP_STEP, wind_step=WIND_STEP,
+                 flow_step=FLOW_STEP):
+        self.budget_bytes = int(budget_bytes)
+        self.temp_step = temp_step
+        self.wind_step = wind_step
+        self.flow_step = flow_step
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()      # key -> (value, size)
+        self._inflight = {}                # key -> Future
+        self._bytes = 0
+        self._hits = self._misses = self._coalesced = self._evictions = 0
+
+    def quantize(self, temp, wind, flows=None):
+        """(temp, wind, flows, key part) on the quantization grid.  The key
+        part of the flows is a digest, so long snapshots make short keys."""
+        qt = round(float(temp) / self.temp_step)
+        qw = round(float(wind) / self.wind_step)
+        if flows is None:
+            return qt * self.temp_step, qw * self.wind_step, None, (qt, qw, None)
+        steps = np.round(np.asarray(flows, dtype=float) / self.flow_step)
+        digest = hashlib.blake2b(steps.tobytes(), digest_size=16).digest()
+        return qt * self.temp_step, qw * self.wind_step, steps * self.flow_step, (qt, qw, digest)
+
+    def evaluate(self, fn, temp, wind, flows=None, tag=()):
+        """fn(temp, wind, flows) at the quantized inputs, shared across threads.
+        tag: hashable model options that change the result"""
+        temp, wind, flows, key = self.quantize(temp, wind, flows)
+        return self.get((tuple(tag),) + key, lambda: fn(temp, wind, flows))
+
+    def get(self, key, compute):
+        """Cached value for key, computing it (once across threads) if missing"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry[0]
+            future = self._inflight.get(key)
+            if future is not None:
+                self._coalesced += 1
+                owner = False
+            else:
+                future = self._inflight[key] = Future()
+                self._misses += 1
+                owner = True
+        if not owner:
+            return future.result()
+
+        try:
+            value = _freeze(compute())
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._inflight[key]
+            self._insert(key, value)
+        future.set_result(value)
+        return value
+
+    def _insert(self, key, value):
+        size = result_bytes(value) + ENTRY_OVERHEAD
+        if size > self.budget_bytes:
+            return                          # larger than the whole budget: don't keep it
+        self._entries[key] = (value, size)
+        self._bytes += size
+        while self._bytes > self.budget_bytes:
+            _, (_, old) = self._entries.popitem(last=False)
+            self._bytes -= old
+            self._evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return EngineStats(self._hits, self._misses, self._coalesced, self._evictions,
+                               len(self._entries), self._bytes, self.budget_bytes)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """The process-wide engine.  Budget from RATING_CACHE_MB (default BUDGET_MB)."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            mb = float(os.environ.get("RATING_CACHE_MB", BUDGET_MB))
+            _engine = RatingEngine(budget_bytes=mb * 2**20)
+        return _engine
@@ -0,0 +1,153 @@
+"""Per-span ratings along the GeoJSON line geometry
+
+Every LineString in oneline_lines.geojson is split into straight segments
+(spans).  Each span has its own bearing, which sets both the wind angle
+(wind direction vs. conductor axis) and the line azimuth for the solar term.
+All spans of all lines are rated in one batched call and each line gets the
+rating of its weakest span.
+
+The segment table and the per-span conductor parameters only depend on the
+geometry file and the lines, so they are built once; a weather change is one
+pass over the span arrays.
+"""
+import json
+import os
+import threading
+from typing import NamedTuple
+import numpy as np
+from lib.ieee738.vectorized import steady_state_thermal_rating
+from src.stress_model import line_conductor_params
+
+EARTH_RADIUS_M = 6371000.0
+
+_lock = threading.Lock()
+_cache = {}
+
+
+class SegmentTable(NamedTuple):
+    """Spans grouped by line: spans of line_names[i] are starts[i]:starts[i+1]"""
+    line_names: np.ndarray
+    starts: np.ndarray
+    line: np.ndarray        # index into line_names, per span
+    bearing: np.ndarray     # degrees clockwise from north, in [0, 180)
+    length_m: np.ndarray
+    lon: np.ndarray         # span midpoint
+    lat: np.ndarray
+
+
+class SpanRatings(NamedTuple):
+    rating: np.ndarray      # weakest span rating (A) per line, NaN if the line has no geometry
+    weakest: np.ndarray     # span index of the weakest span per line, -1 if none
+    span_rating: np.ndarray # per span of the SegmentTable, NaN for spans of unknown lines
+
+
+def build_segments(path):
+    """Parse the GeoJSON into a SegmentTable.  Repeated points are dropped."""
+    with open(path) as f:
+        features = json.load(f)["features"]
+    names, line, lon0, lat0, lon1, lat1 = [], [], [], [], [], []
+    for feat in features:
+        geom = feat.get("geometry") or {}
+        if geom.get("type") != "LineString":
+            continue
+        xy = np.asarray(geom["coordinates"], dtype=float)[:, :2]
+        if len(xy) < 2:
+            continue
+        keep = np.r_[True, np.any(np.diff(xy, axis=0) != 0, axis=1)]
+        xy = xy[keep]
+        if len(xy) < 2:
+            continue
+        line.append(np.full(len(xy) - 1, len(names)))
+        names.append(str(feat["properties"]["Name"]))
+        lon0.append(xy[:-1, 0]); lat0.append(xy[:-1, 1])
+        lon1.append(xy[1:, 0]); lat1.append(xy[1:, 1])
+    if not names:
+        empty = np.array([])
+        return SegmentTable(np.array([], dtype=str), np.array([0]), empty.astype(int),
+                            empty, empty, empty, empty)
+
+    line = np.concatenate(line)
+    lon0, lat0, lon1, lat1 = (np.concatenate(a) for a in (lon0, lat0, lon1, lat1))
+    # equirectangular projection is plenty for spans of a few km
+    mid_lat = np.deg2rad((lat0 + lat1) / 2)
+    dx = np.deg2rad(lon1 - lon0) * np.cos(mid_lat) * EARTH_RADIUS_M
+    dy = np.deg2rad(lat1 - lat0) * EARTH_RADIUS_M
+    bearing = np.rad2deg(np.arctan2(dx, dy)) % 180.0
+    starts = np.r_[0, np.cumsum(np.bincount(line))]
+    return SegmentTable(np.array(names), starts, line, bearing, np.hypot(dx, dy),
+                        (lon0 + lon1) / 2, (lat0 + lat1) / 2)
+
+
+def load_segments(path="data/gis/oneline_lines.geojson"):
+    """build_segments(path), cached per process until the file changes"""
+    key = (path, os.stat(path).st_mtime_ns)
+    with _lock:
+        seg = _cache.get(key)
+    if seg is None:
+        seg = build_segments(path)
+        with _lock:
+            for k in [k for k in _cache if k[0] == path]:
+                del _cache[k]
+            _cache[key] = seg
+    return seg
+
+
+def wind_angle(wind_from_deg, bearing):
+    """Angle (0-90 deg) between the wind and the conductor axis"""
+    a = (np.asarray(wind_from_deg, dtype=float) - bearing) % 180.0
+    return np.minimum(a, 180.0 - a)
+
+
+class SpanRater:
+    def __init__(self, lines_df, segments):
+        """
+        lines_df: lines with 'name' and conductor / MOT columns (see
+                  stress_model.line_conductor_params)
+        segments: SegmentTable, matched to lines_df on the line name
+        """
+        self.segments = segments
+        pos = {n: i for i, n in enumerate(lines_df["name"].astype(str))}
+        seg_line = np.array([pos.get(n, -1) for n in segments.line_names], dtype=int)
+        self.span_line = seg_line[segments.line]     # lines_df position of every span
+        keep = self.span_line >= 0
+        self.span_idx = np.flatnonzero(keep)
+        self.span_line = self.span_line[keep]
+
+        cond, self.rejected = line_conductor_params(lines_df)
+        self.params = {k: cond[k].to_numpy()[self.span_line] for k in cond.columns}
+        self.bearing = segments.bearing[keep]
+        self.n_lines = len(lines_df)
+
+        counts = np.bincount(self.span_line, minlength=self.n_lines)
+        self._has_spans = counts > 0
+        # first span of each line once spans are sorted by line
+        self._starts = np.r_[0, np.cumsum(counts)][:-1][self._has_spans]
+
+    def ratings(self, ambient, wind_from_deg=None, night_zero=False):
+        """
+        ambient: weather / site parameters, scalars or arrays with one value
+                 per span of the SegmentTable (e.g. from weather_field)
+        wind_from_deg: wind direction (deg from north), scalar or per span.
+                       None keeps ambient['WindAngleDeg'] for every span.
+        """
+        n_spans = len(self.segments.bearing)
+        per_span = lambda v: np.asarray(v)[self.span_idx] if np.ndim(v) and len(v) == n_spans else v
+        params = {k: per_span(v) for k, v in ambient.items()}
+        params.update(self.params)
+        params["Direction"] = self.bearing
+        if wind_from_deg is not None:
+            params["WindAngleDeg"] = wind_angle(per_span(wind_from_deg), self.bearing)
+        span = np.broadcast_to(steady_state_thermal_rating(params, night_zero).rating,
+                               self.bearing.shape)
+
+        rating = np.full(self.n_lines, np.nan)
+        weakest = np.full(self.n_lines, -1)
+        if len(span):
+            # sort by line, then rating (NaN last): the weakest span leads each group
+            order = np.lexsort((np.where(np.isnan(span), np.inf, span), self.span_line))
+            first = order[self._starts]
+            rating[self._has_spans] = span[first]
+            weakest[self._has_spans] = self.span_idx[first]
+        span_rating = np.full(len(self.segments.bearing), np.nan)
+        span_rating[self.span_idx] = span
+        return SpanRatings(rating, weakest, span_rating)
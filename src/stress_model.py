@@ -1,64 +1,96 @@
+import logging
+import numpy as np
 import pandas as pd
-import math
-from lib.ieee738.ieee738 import Conductor, ConductorParams
+from lib.ieee738.conductors import join_conductors
+from lib.ieee738.vectorized import rate_table
+
+logger = logging.getLogger(__name__)
+
+# 336.4 ACSR 30/7 Oriole, used when lines_df has neither conductor params nor a conductor name
+DEFAULT_CONDUCTOR = {"RLo": 0.2708 / 5280, "RHi": 0.2974 / 5280, "Diameter": 0.741}
+
+# stress >= 0.5, 0.7, 0.9, 1.0
+STRESS_BINS = np.array([0.5, 0.7, 0.9, 1.0])
+STRESS_COLORS = np.array(["green", "yellow", "orange", "red", "darkred"])
+
+
+def line_conductor_params(lines_df, library=None):
+    """
+    Conductor part of ConductorParams for every line, as columns.
+    Explicit RLo/RHi/Diameter columns win; otherwise the 'conductor' name is
+    joined once against the conductor library.
+    Returns (DataFrame with TLo, THi, RLo, RHi, Diameter, Tc; DataFrame of
+    rejected lines with 'name' and 'reason').
+    """
+    n = len(lines_df)
+    names = lines_df["name"].to_numpy() if "name" in lines_df else np.full(n, "unknown")
+    cond = pd.DataFrame({"TLo": np.full(n, 25.0), "THi": np.full(n, 50.0)})
+    rejected = pd.DataFrame(columns=["name", "reason"])
+
+    if "conductor" in lines_df and not {"RLo", "RHi", "Diameter"} <= set(lines_df.columns):
+        joined, missing = join_conductors(lines_df["conductor"], library)
+        for k in ("RLo", "RHi", "Diameter"):
+            cond[k] = joined[k].to_numpy()
+        if missing.any():
+            rejected = pd.DataFrame({
+                "name": names[missing],
+                "reason": ["conductor not in library: {!r}".format(c)
+                           for c in lines_df["conductor"].to_numpy()[missing]]})
+    for k, default in DEFAULT_CONDUCTOR.items():
+        if k in lines_df:
+            cond[k] = pd.to_numeric(lines_df[k], errors="coerce").to_numpy()
+        elif k not in cond:
+            cond[k] = default
+    cond["Tc"] = lines_df["MOT"].to_numpy(dtype=float) if "MOT" in lines_df else 80.0
+    return cond, rejected
+
 
 def compute_line_stress(lines_df, env_params):
     """
     Compute stress on each transmission line using IEEE-738-based thermal ratings.
     Returns a DataFrame with new columns: 'rating_mva', 'flow_mva', 'stress', 'color'
+
+    All lines are rated in one batched call.  Lines that can't be rated
+    (unknown conductor, invalid parameters) get a zero rating and are logged
+    as one warning; the list is also in result.attrs["rejected"].
     """
+    n = len(lines_df)
+    names = lines_df["name"].to_numpy() if "name" in lines_df else np.full(n, "unknown")
+
+    cond, rejected = line_conductor_params(lines_df)
+    params = dict(env_params)
+    params.update({k: cond[k].to_numpy() for k in cond.columns})
+
+    # Compute rating (Amps)
+    res, bad_rows = rate_table(params)
+    rating_amps = np.nan_to_num(np.broadcast_to(res.rating, (n,)), nan=0.0)
+    bad_rows = bad_rows[~np.isin(names[bad_rows["row"].to_numpy(dtype=int)], rejected["name"])]
+    rejected = pd.concat([rejected, pd.DataFrame({
+        "name": names[bad_rows["row"].to_numpy(dtype=int)],
+        "reason": bad_rows["reason"].to_numpy()})], ignore_index=True)
+
+    # Convert to 3-phase MVA
+    v_nom = lines_df["v_nom"].to_numpy(dtype=float) if "v_nom" in lines_df else 138.0  # Default 138 kV if missing
+    rating_mva = np.sqrt(3) * rating_amps * v_nom * 1e3 * 1e-6
+
+    # Actual line loading
+    flow_mva = lines_df["p0_nominal"].to_numpy(dtype=float) if "p0_nominal" in lines_df else np.zeros(n)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        stress = np.where(rating_mva > 0, flow_mva / rating_mva, 0.0)
+
+    # Color code thresholds
+    color = STRESS_COLORS[np.searchsorted(STRESS_BINS, stress, side="right")]
+
+    if len(rejected):
+        logger.warning("IEEE738 calc failed for %d lines: %s", len(rejected),
+                       "; ".join("{}: {}".format(a, b) for a, b in rejected.itertuples(index=False)))
 
-    results = []
-
-    for _, row in lines_df.iterrows():
-        # Copy environmental parameters (ambient, wind, etc.)
-        params = dict(env_params)
-
-        # Conductor properties (robust fallbacks)
-        params.update({
-            "TLo": 25,
-            "THi": 50,
-            "RLo": float(row.get("RLo", 0.2708 / 5280)),  # ohm/ft
-            "RHi": float(row.get("RHi", 0.2974 / 5280)),
-            "Diameter": float(row.get("Diameter", 0.741)), # inches
-            "Tc": float(row.get("MOT", 80)),               # °C
-        })
-
-        # Compute rating (Amps)
-        try:
-            cp = ConductorParams(**params)
-            conductor = Conductor(cp)
-            rating_amps = conductor.steady_state_thermal_rating()
-        except Exception as e:
-            print(f"[WARN] IEEE738 calc failed for {row.get('name', '?')}: {e}")
-            rating_amps = 0
-
-        # Convert to 3-phase MVA
-        v_nom = float(row.get("v_nom", 138)) * 1e3  # Default 138 kV if missing
-        rating_mva = math.sqrt(3) * rating_amps * v_nom * 1e-6
-
-        # Actual line loading
-        flow_mva = float(row.get("p0_nominal", 0))
-        stress = flow_mva / rating_mva if rating_mva > 0 else 0
-
-        # Color code thresholds
-        if stress >= 1.0:
-            color = "darkred"
-        elif stress >= 0.9:
-            color = "red"
-        elif stress >= 0.7:
-            color = "orange"
-        elif stress >= 0.5:
-            color = "yellow"
-        else:
-            color = "green"
-
-        results.append({
-            "name": row.get("name", "unknown"),
-            "rating_mva": rating_mva,
-            "flow_mva": flow_mva,
-            "stress": stress,
-            "color": color,
-        })
-
-    return pd.DataFrame(results)
+    result = pd.DataFrame({
+        "name": names,
+        "rating_mva": rating_mva,
+        "flow_mva": flow_mva,
+        "stress": stress,
+        "color": color,
+    })
+    result.attrs["rejected"] = rejected
+    return result
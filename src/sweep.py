@@ -0,0 +1,218 @@
+"""Hourly / annual (8760) rating sweep that streams results to disk
+
+Reads a weather time series in chunks, rates every line for every hour of
+the chunk in one batched IEEE-738 call, appends the result to a Parquet file
+or a memory-mapped .npy array and keeps running per-line statistics.  Memory
+is bounded by the chunk size (lines x hours per batch), not by the horizon.
+
+Weather file (CSV) columns:
+    time          timestamp, used for the solar Date and SunTime
+    Ta            ambient temperature, degC
+    WindVelocity  ft/s  (or wind_ms in m/s)
+    WindAngleDeg  optional, defaults to the ambient default
+
+Hours with the sun below the horizon get no solar heating.
+
+    python -m src.sweep weather.csv ratings.parquet
+    python -m src.sweep weather.csv ratings.npy
+
+Parquet output needs pyarrow; the .npy output only needs NumPy.
+"""
+import os
+import sys
+import numpy as np
+import pandas as pd
+from lib.ieee738.conductors import AMBIENT_DEFAULTS
+from lib.ieee738.vectorized import steady_state_thermal_rating
+from src.stress_model import line_conductor_params
+
+# Oahu ambient; Ta, wind and the sun position come from the weather file
+SWEEP_AMBIENT = dict(AMBIENT_DEFAULTS, Latitude=21.3)
+
+# lines x hours rated per batch.  Bounds the working memory of the sweep.
+BATCH_ELEMENTS = 2_000_000
+
+
+def load_lines(lines_path="data/csv/lines.csv", buses_path="data/csv/buses.csv",
+               flows_path="data/csv/line_flows_nominal.csv"):
+    """Per-line inputs of the sweep: conductor params, MOT, kV and flow (MW)
+
+    Lines whose conductor is not in the library are dropped and returned
+    separately (DataFrame with 'name' and 'reason').
+    """
+    lines = pd.read_csv(lines_path)
+    buses = pd.read_csv(buses_path)
+    flows = pd.read_csv(flows_path).set_index("name")["p0_nominal"]
+
+    cond, rejected = line_conductor_params(lines)
+    table = pd.concat([lines[["name"]].reset_index(drop=True), cond], axis=1)
+    table["v_nom"] = lines["bus0"].map(buses.set_index("name")["v_nom"]).fillna(138.0).to_numpy()
+    table["flow_mva"] = table["name"].map(flows).fillna(0.0).to_numpy()
+    keep = ~table["name"].isin(rejected["name"])
+    return table[keep].reset_index(drop=True), rejected
+
+
+class SweepStats:
+    """Running per-line statistics over the hours seen so far"""
+    def __init__(self, names):
+        n = len(names)
+        self.names = list(names)
+        self.hours = 0
+        self.hours_invalid = np.zeros(n, dtype=np.int64)
+        self.hours_above_90 = np.zeros(n, dtype=np.int64)
+        self.hours_above_100 = np.zeros(n, dtype=np.int64)
+        self.max_stress = np.full(n, -np.inf)
+        self.min_rating = np.full(n, np.inf)
+        self.sum_rating = np.zeros(n)
+
+    def update(self, rating_mva, stress):
+        """rating_mva and stress are (hours, lines).  NaN stress (no rating)
+        counts as invalid, not as above any threshold."""
+        self.hours += stress.shape[0]
+        self.hours_invalid += np.count_nonzero(np.isnan(stress), axis=0)
+        self.hours_above_90 += np.count_nonzero(stress > 0.9, axis=0)
+        self.hours_above_100 += np.count_nonzero(stress > 1.0, axis=0)
+        self.max_stress = np.fmax(self.max_stress, np.nanmax(stress, axis=0, initial=-np.inf))
+        self.min_rating = np.fmin(self.min_rating, np.nanmin(rating_mva, axis=0, initial=np.inf))
+        self.sum_rating += np.nansum(rating_mva, axis=0)
+
+    def to_frame(self):
+        valid = self.hours - self.hours_invalid
+        none = valid == 0
+        return pd.DataFrame({
+            "name": self.names,
+            "hours": self.hours,
+            "hours_invalid": self.hours_invalid,
+            "hours_above_90": self.hours_above_90,
+            "hours_above_100": self.hours_above_100,
+            "max_stress": np.where(none, np.nan, self.max_stress),
+            "min_rating_mva": np.where(none, np.nan, self.min_rating),
+            "mean_rating_mva": np.where(none, np.nan, self.sum_rating / np.maximum(valid, 1)),
+        })
+
+
+class ParquetSink:
+    """Appends (time, name, rating_mva, stress) rows to a Parquet file"""
+    def __init__(self, path, names):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self._pa = pa
+        self.names = np.asarray(names, dtype=object)
+        self.schema = pa.schema([("time", pa.timestamp("us")), ("name", pa.string()),
+                                 ("rating_mva", pa.float32()), ("stress", pa.float32())])
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write(self, times, rating_mva, stress):
+        n_hours, n_lines = stress.shape
+        table = self._pa.table({
+            "time": np.repeat(np.asarray(times, dtype="datetime64[us]"), n_lines),
+            "name": np.tile(self.names, n_hours),
+            "rating_mva": rating_mva.astype(np.float32).ravel(),
+            "stress": stress.astype(np.float32).ravel(),
+        }, schema=self.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        self.writer.close()
+
+
+class MemmapSink:
+    """Writes stress into a (hours, lines) float32 .npy file and the ratings
+    into a sibling *_rating.npy file, both memory mapped"""
+    def __init__(self, path, names, n_hours):
+        shape = (n_hours, len(names))
+        root, _ = os.path.splitext(path)
+        self.stress = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=shape)
+        self.rating = np.lib.format.open_memmap(root + "_rating.npy", mode="w+",
+                                                dtype=np.float32, shape=shape)
+        self.row = 0
+
+    def write(self, times, rating_mva, stress):
+        k = stress.shape[0]
+        self.stress[self.row:self.row + k] = stress
+        self.rating[self.row:self.row + k] = rating_mva
+        self.row += k
+
+    def close(self):
+        self.stress.flush()
+        self.rating.flush()
+
+
+def _ambient(chunk):
+    """Weather rows -> ambient arrays for the rating engine"""
+    t = pd.to_datetime(chunk["time"])
+    amb = {
+        "Ta": chunk["Ta"].to_numpy(dtype=float),
+        # day of year from the timestamp: a date string loses the year (leap days)
+        "Date": (t.dt.dayofyear - 1).to_numpy(dtype=float),
+        "SunTime": (t.dt.hour + t.dt.minute / 60.0).to_numpy(dtype=float),
+    }
+    if "WindVelocity" in chunk:
+        amb["WindVelocity"] = chunk["WindVelocity"].to_numpy(dtype=float)
+    else:
+        amb["WindVelocity"] = chunk["wind_ms"].to_numpy(dtype=float) * 3.28084
+    if "WindAngleDeg" in chunk:
+        amb["WindAngleDeg"] = chunk["WindAngleDeg"].to_numpy(dtype=float)
+    return t.to_numpy(), amb
+
+
+def rate_chunk(lines, chunk, ambient=None):
+    """Rating (MVA) and stress (flow / rating) for every hour x line in a chunk.
+    Stress is inf where the line can't carry any current and NaN where the
+    rating failed (NaN)."""
+    params = dict(SWEEP_AMBIENT if ambient is None else ambient)
+    times, amb = _ambient(chunk)
+    for k in ("Diameter", "RLo", "RHi", "TLo", "THi", "Tc"):
+        params[k] = lines[k].to_numpy(dtype=float)[None, :]
+    for k, v in amb.items():
+        params[k] = v[:, None]
+    amps = steady_state_thermal_rating(params, night_zero=True).rating
+    rating_mva = np.sqrt(3) * amps * lines["v_nom"].to_numpy()[None, :] * 1e-3
+    with np.errstate(divide="ignore", invalid="ignore"):
+        stress = np.where(rating_mva > 0, lines["flow_mva"].to_numpy()[None, :] / rating_mva, np.inf)
+    stress = np.where(np.isnan(rating_mva), np.nan, stress)
+    return times, rating_mva, stress
+
+
+def run_sweep(weather_path, out_path=None, lines=None, chunk_hours=None, ambient=None):
+    """Stream a weather file through the rating engine
+
+    Args:
+      - weather_path: CSV weather time series (see module docstring)
+      - out_path: .parquet or .npy output, or None to only keep statistics
+      - lines: table from load_lines() (loaded from data/csv if None)
+      - chunk_hours: hours per batch (default keeps lines x hours near BATCH_ELEMENTS)
+    Returns:
+      - SweepStats
+    """
+    if lines is None:
+        lines, _ = load_lines()
+    names = lines["name"].tolist()
+    if chunk_hours is None:
+        chunk_hours = max(1, BATCH_ELEMENTS // max(len(lines), 1))
+
+    sink = None
+    if out_path is not None and out_path.endswith(".npy"):
+        # rows as the chunks below will parse them (blank lines etc. skipped)
+        n_hours = sum(len(c) for c in pd.read_csv(weather_path, usecols=["time"], chunksize=100_000))
+        sink = MemmapSink(out_path, names, n_hours)
+    elif out_path is not None:
+        sink = ParquetSink(out_path, names)
+
+    stats = SweepStats(names)
+    try:
+        for chunk in pd.read_csv(weather_path, chunksize=chunk_hours):
+            times, rating_mva, stress = rate_chunk(lines, chunk, ambient)
+            stats.update(rating_mva, stress)
+            if sink is not None:
+                sink.write(times, rating_mva, stress)
+    finally:
+        if sink is not None:
+            sink.close()
+    return stats
+
+
+if __name__ == "__main__":
+    out = sys.argv[2] if len(sys.argv) > 2 else None
+    summary = run_sweep(sys.argv[1], out).to_frame()
+    print(summary.sort_values("hours_above_90", ascending=False).head(20).to_string(index=False))
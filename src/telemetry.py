@@ -0,0 +1,405 @@
+"""Streaming line-flow telemetry with micro-batched stress updates
+
+Flow updates arrive as text lines, from a TCP socket or a file being appended
+to:
+
+    name,mw[,sent]
+
+where `sent` is the sender's wall clock (epoch seconds), used for the
+end-to-end latency.  Updates go into a bounded asyncio queue; the consumer
+waits for one, keeps draining for up to `batch_window` seconds (or
+`max_batch` updates), keeps the last value per line and recomputes stress
+and alerts for those lines only (AlertEngine.update_lines).
+
+Backpressure: when the queue is full, producers wait on put(), so the
+socket handler stops reading (TCP pushes back on the sender) and the file
+tail stops advancing.  Nothing is dropped.
+
+The ingestor runs on its own event loop in a background thread
+(TelemetryService).  The UI reads the latest published state and metrics
+with latest() / metrics(), which only take a lock and copy references.
+
+Stress is |flow| / rating (percent) against per-line ratings in MVA, set
+with set_ratings() whenever the weather changes.
+
+    python -m src.telemetry replay --socket 127.0.0.1:9750 --rate 500
+    python -m src.telemetry replay --file flows.log --rate 50 --duration 60
+"""
+import argparse
+import asyncio
+import collections
+import math
+import os
+import threading
+import time
+from typing import NamedTuple
+import numpy as np
+import pandas as pd
+from src.alerts import AlertDiff
+
+# Updates kept in the queue before producers have to wait
+MAX_QUEUE = 10_000
+# How long the consumer keeps collecting after the first update of a batch
+BATCH_WINDOW = 0.02
+MAX_BATCH = 10_000
+# Latency samples kept for the percentiles
+LATENCY_WINDOW = 5_000
+
+
+class LiveState(NamedTuple):
+    version: int            # batches applied so far
+    flows: np.ndarray       # MW per line
+    stress: np.ndarray      # percent per line
+    active: np.ndarray      # line positions in alert
+    raised: np.ndarray      # raised by the last batch
+    cleared: np.ndarray     # cleared by the last batch
+    updated: float          # wall clock of the last batch
+
+
+class TelemetryMetrics(NamedTuple):
+    received: int           # updates parsed
+    rejected: int           # unparseable lines or unknown line names
+    coalesced: int          # updates replaced by a later one in the same batch
+    batches: int
+    lines_recomputed: int
+    queue_depth: int
+    max_queue_depth: int
+    blocked: int            # put() calls that found the queue full
+    latency_p50_ms: float   # received -> alert state published
+    latency_p99_ms: float
+    source_p50_ms: float    # sender timestamp -> published (NaN without one)
+
+    def to_dict(self):
+        return self._asdict()
+
+
+def parse_update(text):
+    """(name, mw, sent) from 'name,mw[,sent]'; sent is NaN if missing"""
+    parts = text.strip().split(",")
+    if len(parts) < 2:
+        raise ValueError("expected name,mw[,sent]: {!r}".format(text))
+    sent = float(parts[2]) if len(parts) > 2 and parts[2] else math.nan
+    return parts[0].strip(), float(parts[1]), sent
+
+
+def _merge(batch, item):
+    """Last value per line wins; the latency clock starts at its first update"""
+    old = batch.get(item[0])
+    batch[item[0]] = item if old is None else (item[0], item[1], old[2], old[3])
+
+
+class FlowIngestor:
+    def __init__(self, line_names, ratings_mva, flows=None, alerts=None, max_queue=MAX_QUEUE,
+                 batch_window=BATCH_WINDOW, max_batch=MAX_BATCH):
+        """
+        line_names: line names, defines the line order
+        ratings_mva: rating of every line (MVA)
+        flows: initial flows (MW), default zero
+        alerts: AlertEngine to update with every batch (optional)
+        """
+        self.names = np.asarray(line_names)
+        self.position = {n: i for i, n in enumerate(self.names)}
+        n = len(self.names)
+        self.flows = np.zeros(n) if flows is None else np.asarray(flows, dtype=float).copy()
+        self.ratings = np.asarray(ratings_mva, dtype=float).copy()
+        self.alerts = alerts
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.max_queue = max_queue
+        self.queue = None                     # created on the ingestor's loop
+
+        self._lock = threading.Lock()
+        # all keys up front so metrics() can copy while producers count
+        self._counts = collections.Counter(dict.fromkeys(
+            ("received", "rejected", "coalesced", "batches", "lines_recomputed", "blocked"), 0))
+        self._max_depth = 0
+        self._latency = collections.deque(maxlen=LATENCY_WINDOW)
+        self._source_latency = collections.deque(maxlen=LATENCY_WINDOW)
+        self.stress = self._stress(self.flows, self.ratings)
+        self._state = None
+        self._publish(*self._update_alerts(None, self.stress))
+
+    @staticmethod
+    def _stress(flows, ratings):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(ratings > 0, np.abs(flows) / ratings * 100, 0.0)
+
+    def _update_alerts(self, idx, stress):
+        """Update the alert engine for lines idx (None: all).  (active, AlertDiff)"""
+        if self.alerts is None:
+            empty = np.zeros(0, dtype=int)
+            return empty, AlertDiff(empty, empty)
+        diff = self.alerts.update(stress) if idx is None else self.alerts.update_lines(idx, stress)
+        return self.alerts.active_lines(), diff
+
+    def _ensure_queue(self):
+        if self.queue is None:
+            self.queue = asyncio.Queue(maxsize=self.max_queue)
+        return self.queue
+
+    async def put(self, name, mw, sent=math.nan):
+        """Queue one update; waits while the queue is full"""
+        pos = self.position.get(name)
+        if pos is None or not math.isfinite(mw):
+            self._counts["rejected"] += 1
+            return
+        queue = self._ensure_queue()
+        if queue.full():
+            self._counts["blocked"] += 1
+        await queue.put((pos, mw, sent, time.monotonic()))
+        self._counts["received"] += 1
+        self._max_depth = max(self._max_depth, queue.qsize())
+
+    async def put_line(self, text):
+        try:
+            name, mw, sent = parse_update(text)
+        except ValueError:
+            self._counts["rejected"] += 1
+            return
+        await self.put(name, mw, sent)
+
+    async def run(self):
+        """Consumer: collect micro-batches and apply them, until cancelled"""
+        queue = self._ensure_queue()
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = {}
+            _merge(batch, await queue.get())
+            n = 1
+            deadline = loop.time() + self.batch_window
+            while n < self.max_batch:
+                if queue.empty():
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    item = queue.get_nowait()
+                _merge(batch, item)
+                n += 1
+            self._counts["coalesced"] += n - len(batch)
+            self._apply(batch.values())
+
+    def _apply(self, items):
+        items = np.array(list(items), dtype=float)
+        idx = items[:, 0].astype(int)
+        with self._lock:
+            self.flows[idx] = items[:, 1]
+            stress = self._stress(self.flows[idx], self.ratings[idx])
+            self.stress[idx] = stress
+            self._publish(*self._update_alerts(idx, stress))
+            self._counts["batches"] += 1
+            self._counts["lines_recomputed"] += len(idx)
+            done_mono, done_wall = time.monotonic(), time.time()
+            self._latency.extend((done_mono - items[:, 3]) * 1e3)
+            sent = items[:, 2]
+            self._source_latency.extend((done_wall - sent[np.isfinite(sent)]) * 1e3)
+
+    def _publish(self, active, diff):
+        version = 0 if self._state is None else self._state.version + 1
+        self._state = LiveState(version, self.flows.copy(), self.stress.copy(), active,
+                                diff.raised, diff.cleared, time.time())
+
+    def set_ratings(self, ratings_mva):
+        """New ratings (e.g. after a weather change): recomputes every line.
+        Safe to call from any thread."""
+        ratings = np.asarray(ratings_mva, dtype=float)
+        with self._lock:
+            if np.array_equal(ratings, self.ratings, equal_nan=True):
+                return
+            self.ratings = ratings.copy()
+            self.stress = self._stress(self.flows, self.ratings)
+            self._publish(*self._update_alerts(None, self.stress))
+
+    def latest(self):
+        """The last published LiveState (arrays are not modified afterwards)"""
+        with self._lock:
+            return self._state
+
+    def metrics(self):
+        with self._lock:
+            lat = np.array(self._latency) if self._latency else np.array([math.nan])
+            src = np.array(self._source_latency) if self._source_latency else np.array([math.nan])
+            c = collections.Counter(self._counts)
+        return TelemetryMetrics(
+            c["received"], c["rejected"], c["coalesced"], c["batches"], c["lines_recomputed"],
+            self.queue.qsize() if self.queue is not None else 0, self._max_depth, c["blocked"],
+            float(np.percentile(lat, 50)), float(np.percentile(lat, 99)), float(np.percentile(src, 50)))
+
+
+async def serve_socket(ingestor, host="127.0.0.1", port=9750):
+    """TCP server: every connection sends update lines"""
+    async def handle(reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                await ingestor.put_line(line.decode("utf-8", "replace"))
+        finally:
+            writer.close()
+    return await asyncio.start_server(handle, host, port)
+
+
+async def tail_file(ingestor, path, poll=0.05, offset=None):
+    """Follow a file like `tail -F`: read appended update lines until cancelled.
+    Starts at byte `offset` (None: the end of the file when it is opened);
+    starts over if the file is truncated."""
+    while not os.path.exists(path):
+        await asyncio.sleep(poll)
+    f = open(path, "r", encoding="utf-8")
+    try:
+        if offset is None:
+            f.seek(0, os.SEEK_END)
+        else:
+            f.seek(offset)
+        partial = ""
+        while True:
+            line = f.readline()
+            if not line:
+                if os.path.getsize(path) < f.tell():
+                    f.seek(0)
+                    partial = ""
+                await asyncio.sleep(poll)
+                continue
+            if not line.endswith("\n"):
+                partial += line       # the writer hasn't finished the line yet
+                continue
+            await ingestor.put_line(partial + line)
+            partial = ""
+    finally:
+        f.close()
+
+
+class TelemetryService:
+    """Runs an ingestor and its sources on an event loop in a daemon thread"""
+    def __init__(self, ingestor, socket_addr=None, tail_path=None):
+        """
+        socket_addr: (host, port) to listen on, or None
+        tail_path: file to follow, or None
+        """
+        self.ingestor = ingestor
+        self.socket_addr = socket_addr
+        self.tail_path = tail_path
+        self.loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="telemetry", daemon=True)
+
+    def start(self, timeout=5.0):
+        self.thread.start()
+        self._ready.wait(timeout)
+        return self
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self._main_task = self.loop.create_task(self._main())
+        try:
+            self.loop.run_until_complete(self._main_task)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self.loop.close()
+
+    async def _main(self):
+        tasks = [asyncio.create_task(self.ingestor.run())]
+        server = None
+        if self.socket_addr is not None:
+            server = await serve_socket(self.ingestor, *self.socket_addr)
+            # port 0 picks a free port
+            self.socket_addr = server.sockets[0].getsockname()[:2]
+        if self.tail_path is not None:
+            # only what is appended after start() returns
+            offset = os.path.getsize(self.tail_path) if os.path.exists(self.tail_path) else 0
+            tasks.append(asyncio.create_task(tail_file(self.ingestor, self.tail_path, offset=offset)))
+        self._ready.set()
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            if server is not None:
+                server.close()
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self._main_task.cancel)
+        self.thread.join(timeout=5.0)
+
+
+def replay_updates(names, base_flows, n_updates, seed=0, noise=0.05, burst=1):
+    """Random-walk flow updates around base_flows: (name, mw) pairs.
+    burst > 1 repeats lines within a burst, to exercise coalescing."""
+    rng = np.random.default_rng(seed)
+    names = np.asarray(names)
+    flows = np.asarray(base_flows, dtype=float).copy()
+    base = np.maximum(np.abs(flows), 1.0)
+    for _ in range(n_updates // burst):
+        idx = rng.integers(0, len(names), max(1, burst // 2))
+        for i in rng.choice(idx, burst):
+            flows[i] += rng.normal(0.0, noise) * base[i]
+            yield names[i], float(flows[i])
+
+
+async def replay(write, names, base_flows, rate=500.0, duration=10.0, seed=0, burst=10):
+    """Send replay_updates through `write(text)` (awaitable) at about `rate`
+    updates per second, in bursts, stamped with the send time"""
+    n_updates = int(rate * duration)
+    start = time.monotonic()
+    for k, (name, mw) in enumerate(replay_updates(names, base_flows, n_updates, seed, burst=burst)):
+        await write("{},{:.3f},{:.6f}\n".format(name, mw, time.time()))
+        if k % burst == burst - 1:
+            lag = start + (k + 1) / rate - time.monotonic()
+            if lag > 0:
+                await asyncio.sleep(lag)
+    return n_updates
+
+
+async def replay_socket(host, port, *args, **kwargs):
+    reader, writer = await asyncio.open_connection(host, port)
+
+    async def write(text):
+        writer.write(text.encode())
+        await writer.drain()          # waits while the receiver pushes back
+    try:
+        return await replay(write, *args, **kwargs)
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def replay_file(path, *args, **kwargs):
+    with open(path, "a", encoding="utf-8") as f:
+        async def write(text):
+            f.write(text)
+            f.flush()
+        return await replay(write, *args, **kwargs)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Replay synthetic SCADA flow updates")
+    ap.add_argument("mode", choices=["replay"])
+    ap.add_argument("--socket", help="host:port of a running ingestor")
+    ap.add_argument("--file", help="file to append updates to")
+    ap.add_argument("--flows", default="data/csv/line_flows_nominal.csv")
+    ap.add_argument("--rate", type=float, default=500.0, help="updates per second")
+    ap.add_argument("--duration", type=float, default=10.0, help="seconds")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args(argv)
+
+    flows = pd.read_csv(args.flows)
+    replay_args = (flows["name"].to_numpy(), flows["p0_nominal"].to_numpy())
+    replay_kwargs = dict(rate=args.rate, duration=args.duration, seed=args.seed)
+    if args.socket:
+        host, port = args.socket.rsplit(":", 1)
+        n = asyncio.run(replay_socket(host, int(port), *replay_args, **replay_kwargs))
+    elif args.file:
+        n = asyncio.run(replay_file(args.file, *replay_args, **replay_kwargs))
+    else:
+        ap.error("one of --socket or --file is required")
+    print("sent", n, "updates")
+
+
+if __name__ == "__main__":
+    main()
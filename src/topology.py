@@ -0,0 +1,163 @@
+"""Network topology as CSR arrays over integer bus positions
+
+Built once per network.  Buses are numbered by their row in buses.csv and
+every in-service line appears in the bus -> line CSR structure twice, once
+under each end.  Per-bus reductions of a line quantity (max / sum / mean
+stress) are then a gather into a scratch buffer and one ufunc.reduceat:
+after the first call on a thread nothing is allocated but the output.
+
+Buses without an in-service line get a single placeholder slot in the
+layout, so every bus owns a non-empty segment and reduceat can write all of
+them in one call; the placeholder holds the fill value.
+
+Connectivity uses scipy.sparse.csgraph on the same arrays.  bridges() finds
+every line whose outage alone splits an island, with one iterative DFS.
+"""
+import threading
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components
+from src.power_flow import find_islands
+
+_REDUCERS = {"max": np.maximum, "min": np.minimum, "sum": np.add, "mean": np.add}
+
+
+class Topology:
+    def __init__(self, n_bus, from_bus, to_bus, in_service=None, bus_names=None, control=None):
+        """
+        n_bus: number of buses
+        from_bus, to_bus: bus positions of every line
+        in_service: bool per line (default all); lines out of service and
+          self loops are left out of the structure
+        bus_names: bus ids in position order (default 0..n_bus-1)
+        control: 'PQ' / 'PV' / 'Slack' per bus, for the island reference buses
+        """
+        self.n_bus = int(n_bus)
+        self.from_bus = np.asarray(from_bus, dtype=np.intp)
+        self.to_bus = np.asarray(to_bus, dtype=np.intp)
+        self.n_line = len(self.from_bus)
+        active = np.ones(self.n_line, dtype=bool) if in_service is None else np.asarray(in_service, dtype=bool)
+        self.active = active & (self.from_bus != self.to_bus)
+        self.bus_names = np.arange(self.n_bus) if bus_names is None else np.asarray(bus_names)
+        self.control = control
+
+        lines = np.flatnonzero(self.active)
+        ends = np.r_[self.from_bus[lines], self.to_bus[lines]]
+        order = np.argsort(ends, kind="stable")
+        self.degree = np.bincount(ends, minlength=self.n_bus)
+        self.indptr = np.r_[0, np.cumsum(self.degree)]
+        self.indices = np.r_[lines, lines][order]            # line of every (bus, line) entry
+        self.neighbors = np.r_[self.to_bus[lines], self.from_bus[lines]][order]
+
+        # reduceat layout: one slot per entry plus one placeholder per isolated bus
+        slots = np.maximum(self.degree, 1)
+        self._starts = np.r_[0, np.cumsum(slots)[:-1]]
+        self._gather = np.zeros(int(slots.sum()), dtype=np.intp)
+        self._empty = self._starts[self.degree == 0]
+        pos = np.repeat(self._starts, self.degree) + (np.arange(len(self.indices)) -
+                                                      np.repeat(self.indptr[:-1], self.degree))
+        self._gather[pos] = self.indices
+        self._mean_div = slots.astype(float)
+        self._local = threading.local()
+
+    @classmethod
+    def from_network(cls, network):
+        """From a data_cache.Network; buses in the order of network.buses"""
+        buses, lines = network.buses, network.lines
+        pos = {n: i for i, n in enumerate(buses["name"])}
+        known = (lines["bus_a"].isin(pos) & lines["bus_b"].isin(pos)).to_numpy()
+        from_bus = lines["bus_a"].map(pos).fillna(0).to_numpy(dtype=int)
+        to_bus = lines["bus_b"].map(pos).fillna(0).to_numpy(dtype=int)
+        status = lines["status"].to_numpy(dtype=float) > 0 if "status" in lines else np.ones(len(lines), bool)
+        control = buses["control"].to_numpy() if "control" in buses else None
+        return cls(len(buses), from_bus, to_bus, status & known, buses["name"].to_numpy(), control)
+
+    def _scratch(self):
+        buf = getattr(self._local, "buf", None)
+        if buf is None:
+            buf = self._local.buf = np.empty(len(self._gather))
+        return buf
+
+    def reduce(self, values, how="max", out=None, fill=0.0):
+        """Per-bus max / min / sum / mean of a per-line array (e.g. stress)
+
+        Only in-service lines count; buses with none get `fill`.
+        Args:
+          - values: (n_line,) float array
+          - out: (n_bus,) float array to write into (allocated if None)
+        """
+        ufunc = _REDUCERS[how]
+        out = np.empty(self.n_bus) if out is None else out
+        if not len(self.indices):
+            # no line in service (values may be empty): nothing to gather from
+            out[:] = fill
+            return out
+        buf = self._scratch()
+        # mode="raise" would buffer out; the indices are valid by construction
+        np.take(values, self._gather, out=buf, mode="clip")
+        buf[self._empty] = fill
+        ufunc.reduceat(buf, self._starts, out=out)
+        if how == "mean":
+            np.divide(out, self._mean_div, out=out)
+        return out
+
+    def adjacency(self, out_of_service=None):
+        """Bus x bus CSR adjacency (parallel lines summed) without the given lines"""
+        keep = self.active.copy()
+        if out_of_service is not None:
+            keep[np.asarray(out_of_service)] = False
+        f, t = self.from_bus[keep], self.to_bus[keep]
+        return sp.csr_matrix((np.ones(len(f)), (f, t)), shape=(self.n_bus, self.n_bus))
+
+    def islands(self, out_of_service=None):
+        """power_flow.Islands (label per bus, reference bus per island) with
+        the given lines switched out"""
+        keep = self.active.copy()
+        if out_of_service is not None:
+            keep[np.asarray(out_of_service)] = False
+        return find_islands(self.n_bus, self.from_bus[keep], self.to_bus[keep], self.control)
+
+    def n_islands(self, out_of_service=None):
+        return connected_components(self.adjacency(out_of_service), directed=False)[0]
+
+    def splits(self, out_of_service):
+        """True if switching out these lines creates a new island"""
+        return self.n_islands(out_of_service) > self.n_islands()
+
+    def bridges(self):
+        """Bool per line: its outage alone splits an island (Tarjan, iterative).
+        Parallel circuits between the same buses are never bridges."""
+        n = self.n_bus
+        disc = np.full(n, -1)
+        low = np.zeros(n, dtype=np.intp)
+        bridge = np.zeros(self.n_line, dtype=bool)
+        indptr, nbr, line = self.indptr, self.neighbors, self.indices
+        t = 0
+        for root in range(n):
+            if disc[root] >= 0:
+                continue
+            disc[root] = low[root] = t
+            t += 1
+            # (bus, line it was entered by, next entry to visit)
+            stack = [(root, -1, indptr[root])]
+            while stack:
+                u, via, k = stack[-1]
+                if k < indptr[u + 1]:
+                    stack[-1] = (u, via, k + 1)
+                    v, e = nbr[k], line[k]
+                    if e == via:
+                        continue
+                    if disc[v] < 0:
+                        disc[v] = low[v] = t
+                        t += 1
+                        stack.append((v, e, indptr[v]))
+                    else:
+                        low[u] = min(low[u], disc[v])
+                    continue
+                stack.pop()
+                if stack:
+                    p = stack[-1][0]
+                    low[p] = min(low[p], low[u])
+                    if low[u] > disc[p]:
+                        bridge[via] = True
+        return bridge
@@ -0,0 +1,243 @@
+"""Weather provider for the NWS (api.weather.gov) hourly forecast
+
+- one pooled requests.Session with timeouts for all calls
+- TTL caches for the points lookup (the forecast URL for a location rarely
+  changes) and for the forecast itself
+- prefetch() refreshes the forecast on a background thread so the UI can
+  keep using the last result instead of blocking on the network
+- current() reads the forecast hour covering now, flagged stale once the
+  forecast is older than its TTL, and refuses a forecast that doesn't
+  cover now
+- every hourly period is parsed into arrays (HourlyForecast) that can go
+  straight into the batched rating engine
+
+The HTTP side is a small transport object, so the provider can be pointed at
+a local stub server (base_url) or a JSON fixture file (FixtureTransport) to
+run offline.
+"""
+import json
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from typing import NamedTuple
+import numpy as np
+
+NWS_URL = "https://api.weather.gov"
+HONOLULU = (21.3069, -157.8583)
+USER_AGENT = "HawaiiGridApp/1.0"
+
+# length of a forecastHourly period
+PERIOD = np.timedelta64(1, "h")
+
+COMPASS = {d: i * 22.5 for i, d in enumerate(
+    ["N", "NNE", "NE", "ENE", "E", "ESE", "SE", "SSE",
+     "S", "SSW", "SW", "WSW", "W", "WNW", "NW", "NNW"])}
+
+
+class HourlyForecast(NamedTuple):
+    """One entry per forecast hour"""
+    time: np.ndarray          # datetime64, UTC
+    local_hour: np.ndarray    # hour of day in the forecast's own timezone
+    day: np.ndarray           # days since 1 Jan, local (solar Date as a number)
+    temp_c: np.ndarray
+    wind_ms: np.ndarray
+    wind_dir_deg: np.ndarray  # direction the wind blows from, NaN if unknown
+
+    def to_ambient(self):
+        """Ambient arrays for lib.ieee738.vectorized (WindVelocity in ft/s)"""
+        return {"Ta": self.temp_c, "WindVelocity": self.wind_ms * 3.28084,
+                "SunTime": self.local_hour, "Date": self.day}
+
+    def period_at(self, when):
+        """Position of the period covering `when` (datetime64, UTC), -1 if none does"""
+        when = np.datetime64(when, "s")
+        i = int(np.searchsorted(self.time, when, side="right")) - 1
+        return i if i >= 0 and when < self.time[i] + PERIOD else -1
+
+
+class CurrentWeather(NamedTuple):
+    temp_c: float
+    wind_ms: float
+    start: np.datetime64      # start of the forecast hour, UTC
+    age_s: float              # seconds since the forecast was fetched
+    stale: bool               # older than the provider's forecast TTL
+
+
+def parse_wind_speed(text):
+    """'10 mph' -> 10, '5 to 10 mph' -> 5 (lower end, the conservative one
+    for ratings).  km/h is converted to mph.  NaN if there is no number."""
+    nums = [float(x) for x in re.findall(r"\d+(?:\.\d+)?", str(text))]
+    if not nums:
+        return np.nan
+    mph = min(nums)
+    if "km/h" in str(text):
+        mph /= 1.609344
+    return mph
+
+
+def parse_hourly(forecast_json):
+    """All periods of a forecastHourly response -> HourlyForecast"""
+    periods = forecast_json["properties"]["periods"]
+    start = [p["startTime"] for p in periods]
+    # startTime is local time with offset, e.g. 2025-06-12T14:00:00-10:00
+    local = np.array([s[:19] for s in start], dtype="datetime64[s]")
+    offset = np.array([_utc_offset(s) for s in start], dtype="timedelta64[s]")
+    temp = np.array([p["temperature"] for p in periods], dtype=float)
+    unit = np.array([p.get("temperatureUnit", "F") for p in periods])
+    temp_c = np.where(unit == "C", temp, (temp - 32) * 5 / 9)
+    wind_mph = np.array([parse_wind_speed(p.get("windSpeed")) for p in periods])
+    wind_dir = np.array([COMPASS.get(p.get("windDirection"), np.nan) for p in periods])
+    hour = (local - local.astype("datetime64[D]")).astype("timedelta64[m]").astype(float) / 60.0
+    day = (local.astype("datetime64[D]") - local.astype("datetime64[Y]")).astype(float)
+    return HourlyForecast(time=local - offset, local_hour=hour, day=day, temp_c=temp_c,
+                          wind_ms=wind_mph * 0.44704, wind_dir_deg=wind_dir)
+
+
+def _utc_offset(stamp):
+    m = re.search(r"([+-])(\d\d):(\d\d)$", stamp)
+    if not m:
+        return 0
+    sign = 1 if m.group(1) == "+" else -1
+    return sign * (int(m.group(2)) * 3600 + int(m.group(3)) * 60)
+
+
+class HttpTransport:
+    """requests.Session with connection pooling and a default timeout"""
+    def __init__(self, timeout=(3.05, 10.0), pool_size=4):
+        import requests
+        from requests.adapters import HTTPAdapter
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update({"User-Agent": USER_AGENT, "Accept": "application/geo+json"})
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=1)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get_json(self, url):
+        resp = self.session.get(url, timeout=self.timeout)
+        resp.raise_for_status()
+        return resp.json()
+
+
+class FixtureTransport:
+    """Serves saved responses from a JSON file:
+    {"points": <points response>, "forecast": <forecastHourly response>}"""
+    def __init__(self, path):
+        with open(path) as f:
+            self.data = json.load(f)
+
+    def get_json(self, url):
+        return self.data["points" if "/points/" in url else "forecast"]
+
+
+class _TTLCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = {}
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+        if item is None or item[0] < time.monotonic():
+            return None
+        return item[1]
+
+    def put(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+
+
+class WeatherProvider:
+    def __init__(self, location=HONOLULU, base_url=NWS_URL, transport=None,
+                 points_ttl=24 * 3600.0, forecast_ttl=600.0):
+        self.location = location
+        self.base_url = base_url.rstrip("/")
+        self.transport = transport if transport is not None else HttpTransport()
+        self.points_ttl = points_ttl
+        self.forecast_ttl = forecast_ttl
+        self._cache = _TTLCache()
+        self._last = None           # last good forecast, kept past its TTL
+        self._fetched = None        # time.monotonic() of _last
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="weather")
+        self._pending = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_fixture(cls, path, **kwargs):
+        return cls(transport=FixtureTransport(path), **kwargs)
+
+    def forecast_url(self):
+        url = self._cache.get("points")
+        if url is None:
+            lat, lon = self.location
+            points = self.transport.get_json(f"{self.base_url}/points/{lat},{lon}")
+            url = points["properties"]["forecastHourly"]
+            self._cache.put("points", url, self.points_ttl)
+        return url
+
+    def hourly(self):
+        """Hourly forecast, fetched if the cached one has expired (blocking)"""
+        fc = self._cache.get("forecast")
+        if fc is None:
+            fc = parse_hourly(self.transport.get_json(self.forecast_url()))
+            self._cache.put("forecast", fc, self.forecast_ttl)
+            self._last, self._fetched = fc, time.monotonic()
+        return fc
+
+    def prefetch(self):
+        """Refresh the forecast in the background if it is stale.  Returns the
+        Future of the refresh (None if the cache is fresh)."""
+        if self._cache.get("forecast") is not None:
+            return None
+        with self._lock:
+            if self._pending is None or self._pending.done():
+                self._pending = self._pool.submit(self.hourly)
+            return self._pending
+
+    def latest(self):
+        """Last forecast fetched, without touching the network (may be None)"""
+        return self._last
+
+    def pending(self):
+        """True while a background refresh is running"""
+        with self._lock:
+            return self._pending is not None and not self._pending.done()
+
+    def current(self, wait=0.0, now=None):
+        """CurrentWeather for the forecast hour covering `now` (default: the
+        wall clock), or None if there is no forecast yet or it doesn't cover now.
+
+        Never blocks on a refresh when there is a forecast: a stale one is
+        returned with stale=True while the refresh runs.  Without one, waits
+        up to `wait` seconds (None: until done) for the first fetch, and
+        raises its error if it failed (the next call tries again).
+        """
+        with self._lock:
+            failed = self._last is None and self._pending is not None and self._pending.done()
+            if failed:
+                fut, self._pending = self._pending, None
+        if failed and fut.exception() is not None:
+            raise fut.exception()
+        fut = self.prefetch()
+        fc = self._last
+        if fc is None and fut is not None:
+            try:
+                fc = fut.result(timeout=wait)
+            except TimeoutError:
+                return None
+            except Exception:
+                with self._lock:
+                    if self._pending is fut:
+                        self._pending = None
+                raise
+        if fc is None:
+            return None
+        if now is None:
+            now = np.datetime64(int(time.time()), "s")
+        i = fc.period_at(now)
+        if i < 0:
+            return None
+        age = time.monotonic() - self._fetched
+        return CurrentWeather(float(fc.temp_c[i]), float(fc.wind_ms[i]), fc.time[i], age,
+                              age > self.forecast_ttl)
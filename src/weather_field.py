@@ -0,0 +1,88 @@
+"""Spatial weather field from local station readings
+
+Station observations are interpolated to arbitrary points (bus coordinates,
+span midpoints) by inverse distance weighting over the k nearest stations.
+The nearest-station search uses a KD-tree (scipy cKDTree) and only depends on
+where the stations and the points are, so it is done once per point set
+(Interpolator).  A new set of readings is then a gather and a weighted sum,
+O(points * k).
+
+Coordinates are lon/lat in degrees, projected to local metres around the
+stations' mean latitude.  Wind direction is averaged as a vector so that
+readings of 350 and 10 degrees give 0, not 180.
+"""
+from typing import NamedTuple
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+EARTH_RADIUS_M = 6371000.0
+
+
+class Interpolator(NamedTuple):
+    """IDW weights of the k nearest stations for a fixed set of points"""
+    idx: np.ndarray     # (n_points, k) station positions
+    w: np.ndarray       # (n_points, k) weights, rows sum to 1
+
+    def __call__(self, values):
+        return np.einsum("nk,nk->n", np.asarray(values, dtype=float)[self.idx], self.w)
+
+
+class Ambient(NamedTuple):
+    temp_c: np.ndarray
+    wind_ms: np.ndarray
+    wind_from_deg: np.ndarray   # NaN where the stations have no direction
+
+
+class WeatherField:
+    def __init__(self, lon, lat, k=4, power=2.0):
+        """
+        lon, lat: station coordinates (degrees)
+        k: number of nearest stations used per point
+        power: IDW exponent
+        """
+        self.lon = np.asarray(lon, dtype=float)
+        self.lat = np.asarray(lat, dtype=float)
+        self.k = max(1, min(k, len(self.lon)))
+        self.power = power
+        self._cos_lat = np.cos(np.deg2rad(np.mean(self.lat)))
+        self.tree = cKDTree(self._project(self.lon, self.lat))
+
+    @classmethod
+    def from_stations(cls, stations, **kwargs):
+        """From a DataFrame with 'lon' and 'lat' columns"""
+        return cls(stations["lon"], stations["lat"], **kwargs)
+
+    def _project(self, lon, lat):
+        lon, lat = np.asarray(lon, dtype=float), np.asarray(lat, dtype=float)
+        return np.column_stack([np.deg2rad(lon) * self._cos_lat, np.deg2rad(lat)]) * EARTH_RADIUS_M
+
+    def interpolator(self, lon, lat):
+        """Neighbours and weights for points at (lon, lat).  Build once per point set."""
+        dist, idx = self.tree.query(self._project(lon, lat), k=self.k)
+        dist, idx = dist.reshape(len(dist), -1), idx.reshape(len(idx), -1)
+        with np.errstate(divide="ignore"):
+            w = 1.0 / dist ** self.power
+        exact = dist[:, 0] == 0
+        w[exact] = 0.0
+        w[exact, 0] = 1.0
+        return Interpolator(idx, w / w.sum(axis=1, keepdims=True))
+
+    def interpolate(self, interp, temp_c, wind_ms, wind_from_deg=None):
+        """Station readings -> Ambient at the interpolator's points"""
+        out_dir = np.full(len(interp.idx), np.nan)
+        if wind_from_deg is not None:
+            rad = np.deg2rad(np.asarray(wind_from_deg, dtype=float))
+            speed = np.asarray(wind_ms, dtype=float)
+            u, v = interp(speed * np.sin(rad)), interp(speed * np.cos(rad))
+            out_dir = np.where(np.hypot(u, v) > 0, np.rad2deg(np.arctan2(u, v)) % 360.0, np.nan)
+        return Ambient(interp(temp_c), interp(wind_ms), out_dir)
+
+
+def load_stations(path):
+    """Station readings CSV: name, lon, lat, temp_c, wind_ms[, wind_from_deg]"""
+    stations = pd.read_csv(path)
+    missing = {"lon", "lat", "temp_c", "wind_ms"} - set(stations.columns)
+    if missing:
+        raise KeyError("Station file is missing columns: {}".format(sorted(missing)))
+    return stations
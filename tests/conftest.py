@@ -0,0 +1,6 @@
+import os, sys
+
+# Tests import the repo packages (src, lib) package-qualified, like the app
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
@@ -0,0 +1,77 @@
+import numpy as np
+import src.data_cache as dc
+from src.contingency import ContingencyAnalysis, ptdf
+from src.power_flow import DCPowerFlow, find_islands, site_transformers
+
+
+def shipped_network():
+    network = dc.load_network("data/csv/buses.csv", "data/csv/lines.csv")
+    return network, DCPowerFlow.from_network(network, dc.load_flows("data/csv/line_flows_nominal.csv"))
+
+
+def outage_flows(network, pf, k):
+    """Line flows with line k out, from a fresh power flow (the brute force)"""
+    lines, pos = network.lines, {n: i for i, n in enumerate(network.buses["name"])}
+    in_service = pf.active.copy()
+    in_service[k] = False
+    out = DCPowerFlow(network.buses["name"], lines["bus_a"].map(pos).to_numpy(),
+                      lines["bus_b"].map(pos).to_numpy(), lines["x"], network.line_kv,
+                      in_service, pf.control, pf.loads, ties=site_transformers(network.buses))
+    return out.solve(pf.load_injections())
+
+
+def test_ptdf_matches_unit_injections():
+    _, pf = shipped_network()
+    P = ptdf(pf)
+    for bus in (3, 17, 30):
+        inj = np.zeros(pf.n_bus)
+        inj[bus] = 1.0
+        np.testing.assert_allclose(P[:, bus], pf.solve(inj), atol=1e-12)
+    assert np.allclose(P[:, pf.islands.ref], 0.0)
+
+
+def test_lodf_matches_outage_resolve():
+    network, pf = shipped_network()
+    ca = ContingencyAnalysis(pf)
+    base = pf.base_flows()
+    post = ca.post_flows(base)
+    checked = 0
+    for k in np.flatnonzero(~ca.islanding):
+        expected = outage_flows(network, pf, k)
+        expected[k] = 0.0
+        got = post[:, k].copy()
+        got[k] = base[k] + ca.lodf[k, k] * base[k]            # LODF[k, k] = -1: no flow
+        np.testing.assert_allclose(got, expected, atol=1e-6)
+        checked += 1
+    assert checked > 50
+
+
+def test_islanding_outages_are_flagged_and_skipped():
+    network, pf = shipped_network()
+    ca = ContingencyAnalysis(pf)
+    for k in np.flatnonzero(ca.islanding):
+        # taking the line out leaves a bus with no path to the reference
+        in_service = pf.active.copy()
+        in_service[k] = False
+        pos = {n: i for i, n in enumerate(network.buses["name"])}
+        fb = network.lines["bus_a"].map(pos).to_numpy()[in_service]
+        tb = network.lines["bus_b"].map(pos).to_numpy()[in_service]
+        tf, tt, _ = site_transformers(network.buses)
+        assert len(find_islands(pf.n_bus, np.r_[fb, tf], np.r_[tb, tt]).ref) > 1
+    res = ca.screen(pf.base_flows(), np.full(len(network.lines), 100.0))
+    assert not np.isin(res.worst_outage, np.flatnonzero(ca.islanding)).any()
+
+
+def test_screen_worst_outage_is_the_max_over_outages():
+    network, pf = shipped_network()
+    ca = ContingencyAnalysis(pf)
+    flows = pf.base_flows()
+    ratings = np.full(len(flows), 80.0)
+    res = ca.screen(flows, ratings)
+    post = np.abs(ca.post_flows(flows))
+    post[:, ca.islanding] = -np.inf
+    np.fill_diagonal(post, -np.inf)
+    for line in range(len(flows)):
+        if res.worst_outage[line] >= 0:
+            assert np.isclose(abs(res.worst_flow[line]), post[line].max())
+            assert np.isclose(res.worst_loading[line], post[line].max() / 80.0 * 100)
@@ -0,0 +1,53 @@
+import numpy as np
+import src.data_cache as dc
+from lib.ieee738.conductors import AMBIENT_DEFAULTS
+from src.compute_stress import line_statics, stress_kernel
+from src.headroom import bisect, compute_stress_headroom, span_headroom, span_model
+from src.spans import SpanRater, load_segments
+
+AMBIENT = dict(AMBIENT_DEFAULTS, Latitude=21.3)
+
+
+def span_case():
+    network = dc.load_network()
+    rater = SpanRater(network.lines, load_segments("data/gis/oneline_lines.geojson"))
+    flows = network.lines["name"].map(dc.load_flows()).to_numpy(dtype=float)
+    return network, rater, flows
+
+
+def span_stress(network, rater, flows, temp, wind, wind_from_deg):
+    amps = rater.ratings(dict(AMBIENT, Ta=temp, WindVelocity=wind * 3.28084), wind_from_deg).rating
+    with np.errstate(divide="ignore"):
+        return flows / (np.sqrt(3) * amps * network.line_kv * 1e-3) * 100
+
+
+def test_span_model_matches_span_rater():
+    network, rater, flows = span_case()
+    model = span_model(rater, network.lines, flows, network.line_kv, AMBIENT, 120.0)
+    for temp, wind in [(25.0, 3.0), (45.0, 0.5)]:
+        np.testing.assert_allclose(model(temp, wind),
+                                   span_stress(network, rater, flows, temp, wind, 120.0), rtol=1e-9)
+
+
+def test_span_headroom_classes_match_the_map():
+    network, rater, flows = span_case()
+    table = span_headroom(rater, network.lines, flows, network.line_kv, AMBIENT, 68.0, (100.0,))
+    for temp, wind in [(30.0, 2.0), (45.0, 0.5), (60.0, 0.2)]:
+        direct = span_stress(network, rater, flows, temp, wind, 68.0) > 100.0
+        np.testing.assert_array_equal(table.stress_class(temp, wind), direct)
+
+
+def test_bisect_finds_the_crossing_or_flags_the_bracket():
+    x = bisect(lambda x: x ** 2, np.array([4.0, 0.25, 100.0, -1.0]), 0.0, 5.0)
+    np.testing.assert_allclose(x[:2], [2.0, 0.5], atol=1e-6)
+    assert x[2] == np.inf and x[3] == -np.inf
+    np.testing.assert_allclose(bisect(lambda x: 10.0 - x, 4.0, 0.0, 10.0, increasing=False), 6.0, atol=1e-6)
+
+
+def test_compute_stress_classes_match_the_kernel():
+    lines = dc.load_network().lines
+    table = compute_stress_headroom(lines)
+    statics = line_statics(lines)
+    for temp, wind in [(25.0, 3.3), (41.3, 1.27), (58.9, 0.45)]:
+        direct = stress_kernel(statics, temp, wind).stress_class
+        np.testing.assert_array_equal(table.stress_class(temp, wind), direct)
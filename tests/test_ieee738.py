@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+from lib.ieee738.conductors import AMBIENT_DEFAULTS, conductor_params, load_library
+from lib.ieee738.ieee738 import Conductor, ConductorParams
+from lib.ieee738.inverse import conductor_temperature
+from lib.ieee738.rating_surface import SURFACE_AMBIENT, build_surface
+from lib.ieee738.transient import emergency_rating, heat_capacity, simulate
+from lib.ieee738.vectorized import rate_table, steady_state_thermal_rating
+
+CONDUCTORS = ["795 ACSR 26/7 DRAKE", "336.4 ACSR 30/7 ORIOLE", "3/0 ACSR 6/1 PIGEON"]
+
+
+def conductor(name, MOT=75.0):
+    return dict(conductor_params(load_library()).loc[name], Tc=MOT)
+
+
+def scalar_rating(params):
+    return Conductor(ConductorParams(**params)).steady_state_thermal_rating()
+
+
+@pytest.mark.parametrize("name", CONDUCTORS)
+@pytest.mark.parametrize("ambient", [
+    {},
+    {"Ta": 40.0, "WindVelocity": 0.5, "WindAngleDeg": 20.0},
+    {"Ta": 10.0, "WindVelocity": 12.0, "SunTime": 8.0, "Date": "29 Feb", "Direction": "NorthSouth"},
+    {"Atmosphere": "Industrial", "Elevation": 0.0, "Latitude": 21.3},
+])
+def test_vectorized_matches_scalar(name, ambient):
+    params = dict(AMBIENT_DEFAULTS, **conductor(name), **ambient)
+    assert steady_state_thermal_rating(params).rating == pytest.approx(scalar_rating(params), rel=1e-9)
+
+
+def test_vectorized_broadcasts_like_a_loop():
+    params = dict(AMBIENT_DEFAULTS, **conductor(CONDUCTORS[0]))
+    Ta, wind = np.meshgrid([15.0, 30.0, 45.0], [0.5, 2.0, 8.0], indexing="ij")
+    batched = steady_state_thermal_rating(dict(params, Ta=Ta, WindVelocity=wind)).rating
+    looped = [[scalar_rating(dict(params, Ta=t, WindVelocity=w)) for t, w in zip(*row)]
+              for row in zip(Ta, wind)]
+    np.testing.assert_allclose(batched, looped, rtol=1e-9)
+
+
+@pytest.mark.parametrize("name", ["Ta", "WindVelocity", "WindAngleDeg", "SunTime"])
+def test_sensitivities_match_finite_differences(name):
+    params = dict(AMBIENT_DEFAULTS, **conductor(CONDUCTORS[1]), WindAngleDeg=45.0, SunTime=10.0)
+    res = steady_state_thermal_rating(params, sensitivities=True)
+    h = 1e-4
+    up = steady_state_thermal_rating(dict(params, **{name: params[name] + h})).rating
+    down = steady_state_thermal_rating(dict(params, **{name: params[name] - h})).rating
+    assert res.sensitivity[name] == pytest.approx((up - down) / (2 * h), rel=1e-4, abs=1e-6)
+
+
+def test_inverse_round_trip():
+    MOT = np.array([50.0, 75.0, 100.0])[:, None]
+    params = dict(AMBIENT_DEFAULTS, **conductor(CONDUCTORS[0], MOT), Ta=np.array([20.0, 35.0]))
+    rating = steady_state_thermal_rating(params).rating
+    res = conductor_temperature(params, rating)
+    assert res.converged.all()
+    np.testing.assert_allclose(res.Tc, np.broadcast_to(MOT, rating.shape), atol=0.02)
+
+
+def test_inverse_without_current_is_above_ambient():
+    params = dict(AMBIENT_DEFAULTS, **conductor(CONDUCTORS[0]))
+    Tc = conductor_temperature(params, 0.0).Tc
+    assert params["Ta"] < Tc < params["Ta"] + 15.0       # solar heating only
+
+
+def test_transient_settles_at_the_steady_state():
+    params = dict(AMBIENT_DEFAULTS, **conductor(CONDUCTORS[0]), HeatCapacity=heat_capacity(0.7463, 0.3479))
+    rating = steady_state_thermal_rating({k: v for k, v in params.items() if k != "HeatCapacity"}).rating
+    res = simulate(params, rating, duration=4 * 3600.0, dt=10.0)
+    assert res.Tc[-1] == pytest.approx(params["Tc"], abs=0.1)
+    assert np.all(np.diff(res.Tc) >= 0)                  # heats up monotonically from Ta
+
+
+def test_emergency_rating_reaches_MOT_at_the_deadline():
+    params = dict(AMBIENT_DEFAULTS, **conductor(CONDUCTORS[0]), HeatCapacity=heat_capacity(0.7463, 0.3479))
+    steady = steady_state_thermal_rating({k: v for k, v in params.items() if k != "HeatCapacity"}).rating
+    I0 = 0.5 * steady
+    amps = emergency_rating(params, I0, duration=900.0, tol=0.5)
+    assert amps > steady
+    Tc = simulate(params, amps, 900.0, I0=I0, record=False).Tc
+    assert Tc == pytest.approx(params["Tc"], abs=0.5)
+
+
+def test_rating_surface_within_its_error():
+    pairs = [(CONDUCTORS[0], 75.0), (CONDUCTORS[1], 100.0)]
+    surface = build_surface(pairs)
+    assert surface.max_rel_error < 0.02
+    rng = np.random.default_rng(0)
+    Ta, wind = rng.uniform(10, 45, 20), rng.uniform(1.0, 30.0, 20)
+    idx = surface.index([name for name, _ in pairs] + ["nope"], [MOT for _, MOT in pairs] + [75.0])
+    assert idx[-1] == -1
+    for i, (name, MOT) in zip(idx, pairs):
+        exact = steady_state_thermal_rating(
+            dict(SURFACE_AMBIENT, **conductor(name, MOT), Ta=Ta, WindVelocity=wind)).rating
+        np.testing.assert_allclose(surface.interpolate(Ta, wind, i), exact, rtol=surface.max_rel_error * 1.5)
+
+
+def test_rate_table_rejects_rows_not_the_table():
+    params = dict(AMBIENT_DEFAULTS, **conductor(CONDUCTORS[0]))
+    table = {k: np.repeat(v, 3) for k, v in params.items()}
+    table["RLo"] = np.array([table["RLo"][0], 0.05, table["RLo"][0]])     # ohms/mile by mistake
+    res, rejected = rate_table(table)
+    assert rejected["row"].tolist() == [1]
+    assert np.isnan(res.rating[1]) and np.isfinite(res.rating[[0, 2]]).all()
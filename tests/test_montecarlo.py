@@ -0,0 +1,35 @@
+import numpy as np
+from src.montecarlo import run_monte_carlo, sample_weather
+from src.sweep import load_lines
+
+
+def test_samples_are_reproducible_and_in_range():
+    a = sample_weather(500, 30.0, 2.0, wind_angle=170.0, seed=7)
+    b = sample_weather(500, 30.0, 2.0, wind_angle=170.0, seed=7)
+    for k in a:
+        np.testing.assert_array_equal(a[k], b[k])
+    assert ((a["WindAngleDeg"] >= 0) & (a["WindAngleDeg"] <= 90)).all()
+    assert (a["WindVelocity"] > 0).all()
+
+
+def test_workers_give_the_same_result():
+    lines, _ = load_lines()
+    lines = lines.iloc[:40]
+    one = run_monte_carlo(lines, 30.0, 2.0, n_samples=300, seed=1, workers=1)
+    two = run_monte_carlo(lines, 30.0, 2.0, n_samples=300, seed=1, workers=2)
+    np.testing.assert_array_equal(one.stress_q, two.stress_q)
+    np.testing.assert_array_equal(one.p_exceed, two.p_exceed)
+
+
+def test_quantiles_and_probabilities_are_consistent():
+    lines, _ = load_lines()
+    res = run_monte_carlo(lines, 35.0, 1.0, n_samples=400, seed=2, workers=1)
+    assert res.stress_q.shape == (len(lines), len(res.quantiles))
+    assert (np.diff(res.stress_q, axis=1) >= 0).all()
+    assert ((res.p_exceed >= 0) & (res.p_exceed <= 1)).all()
+    # a higher threshold is exceeded no more often
+    assert (np.diff(res.p_exceed, axis=1) <= 0).all()
+    # the median is above 1.0 exactly where more than half the samples are
+    j = res.thresholds.index(1.0)
+    median = res.stress_q[:, res.quantiles.index(0.5)]
+    assert ((median > 1.0) <= (res.p_exceed[:, j] >= 0.5)).all()
@@ -0,0 +1,37 @@
+import numpy as np
+import src.data_cache as dc
+from src.power_flow import DCPowerFlow
+
+
+def nominal_case():
+    network = dc.load_network("data/csv/buses.csv", "data/csv/lines.csv")
+    nominal = dc.load_flows("data/csv/line_flows_nominal.csv")
+    return network, network.lines["name"].map(nominal).to_numpy(dtype=float)
+
+
+def test_transformers_join_the_voltage_levels():
+    network, _ = nominal_case()
+    pf = DCPowerFlow.from_network(network)
+    assert len(pf.islands.ref) == 1
+    assert len(pf.solve(pf.load_injections())) == len(network.lines)
+
+
+def test_base_flows_match_nominal_case():
+    network, nominal = nominal_case()
+    pf = DCPowerFlow.from_network(network, dc.load_flows("data/csv/line_flows_nominal.csv"))
+    flows = np.abs(pf.base_flows())
+    assert np.corrcoef(flows, nominal)[0, 1] > 0.95
+    assert np.sqrt(np.mean((flows - nominal) ** 2)) < 10.0       # MW
+    assert np.abs(flows - nominal).max() < 25.0
+    # the 138 kV lines carry flow, not just the 69 kV ones
+    hv = network.line_kv >= 138.0
+    assert (flows[hv] > 10.0).all()
+
+
+def test_dispatch_balances_the_load():
+    network, _ = nominal_case()
+    pf = DCPowerFlow.from_network(network, dc.load_flows("data/csv/line_flows_nominal.csv"))
+    inj = pf.load_injections()
+    assert abs(inj.sum()) < 1e-6
+    assert (pf.share >= 0).all() and (pf.share[~pf.generators()] == 0).all()
+    np.testing.assert_allclose(pf.scaled_flows(1.2), 1.2 * pf.base_flows())
@@ -0,0 +1,90 @@
+import threading
+import time
+import numpy as np
+import pytest
+from src.rating_engine import ENTRY_OVERHEAD, RatingEngine
+
+
+def test_hit_after_miss_returns_the_cached_result():
+    engine, calls = RatingEngine(), []
+
+    def fn(temp, wind, flows):
+        calls.append((temp, wind))
+        return np.full(3, temp)
+
+    first = engine.evaluate(fn, 25.0, 4.0)
+    second = engine.evaluate(fn, 25.04, 4.02)           # same quantization step
+    assert second is first and len(calls) == 1
+    assert not first.flags.writeable
+    s = engine.stats()
+    assert (s.hits, s.misses) == (1, 1)
+    engine.evaluate(fn, 25.0, 4.0, tag=("surface",))    # other model options: another key
+    assert len(calls) == 2
+
+
+def test_compute_sees_the_quantized_inputs():
+    engine = RatingEngine()
+    temp, wind, flows = engine.evaluate(lambda *a: a, 25.04, 3.96, [10.004, -3.0])
+    assert temp == pytest.approx(25.0) and wind == pytest.approx(4.0)
+    np.testing.assert_allclose(flows, [10.0, -3.0])
+    _, _, _, key = engine.quantize(25.0, 4.0, [10.0, -3.001])
+    assert key == engine.quantize(25.04, 3.96, [10.004, -3.0])[3]
+
+
+def test_concurrent_requests_compute_once():
+    engine, calls, start = RatingEngine(), [], threading.Event()
+
+    def fn(temp, wind, flows):
+        calls.append(temp)
+        time.sleep(0.1)
+        return np.arange(4.0)
+
+    results = []
+
+    def worker():
+        start.wait()
+        results.append(engine.evaluate(fn, 30.0, 2.0))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    start.set()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert all(r is results[0] for r in results)
+    s = engine.stats()
+    assert s.misses == 1 and s.hits + s.coalesced == 7
+
+
+def test_errors_are_not_cached():
+    engine, calls = RatingEngine(), []
+
+    def fn(temp, wind, flows):
+        calls.append(temp)
+        if len(calls) == 1:
+            raise ValueError("bad input")
+        return np.zeros(2)
+
+    with pytest.raises(ValueError):
+        engine.evaluate(fn, 20.0, 1.0)
+    assert engine.stats().entries == 0
+    engine.evaluate(fn, 20.0, 1.0)
+    assert len(calls) == 2
+
+
+def test_budget_evicts_least_recently_used():
+    size = 1000 * 8 + ENTRY_OVERHEAD
+    engine = RatingEngine(budget_bytes=3 * size)
+    fn = lambda temp, wind, flows: np.zeros(1000)
+    for temp in (10.0, 20.0, 30.0):
+        engine.evaluate(fn, temp, 0.0)
+    engine.evaluate(fn, 10.0, 0.0)                      # touch: 20 is now the oldest
+    engine.evaluate(fn, 40.0, 0.0)
+    s = engine.stats()
+    assert s.evictions == 1 and s.entries == 3 and s.bytes <= s.budget_bytes
+    misses = s.misses
+    engine.evaluate(fn, 10.0, 0.0)
+    assert engine.stats().misses == misses
+    engine.evaluate(fn, 20.0, 0.0)
+    assert engine.stats().misses == misses + 1
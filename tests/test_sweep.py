@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+from lib.ieee738.solar import annual_table, parse_day
+from src.sweep import load_lines, run_sweep
+
+
+def write_weather(path, start, periods):
+    time = pd.date_range(start, periods=periods, freq="h")
+    pd.DataFrame({"time": time, "Ta": 25.0, "wind_ms": 2.0}).to_csv(path, index=False)
+    return path
+
+
+def test_sweep_over_leap_day(tmp_path):
+    lines, _ = load_lines()
+    path = write_weather(tmp_path / "weather.csv", "2024-02-28", 4 * 24)
+    stats = run_sweep(str(path), str(tmp_path / "ratings.npy"), lines=lines, chunk_hours=10)
+    assert stats.hours == 96
+    assert (stats.hours_invalid == 0).all()
+    rating = np.load(tmp_path / "ratings_rating.npy")
+    assert rating.shape == (96, len(lines)) and np.isfinite(rating).all()
+
+
+def test_parse_day_accepts_leap_day():
+    assert parse_day("28 Feb") == 58
+    assert parse_day("29 Feb") == parse_day("1 Mar") == 59
+    assert parse_day("12 Jun") == 162      # unchanged for non-leap dates
+
+
+def test_annual_table_leap_year():
+    assert len(annual_table(21.3, "Clear").hour) == 8760
+    table = annual_table(21.3, "Clear", leap=True)
+    assert len(table.hour) == 8784 and table.day[-1] == 365
@@ -0,0 +1,87 @@
+import asyncio
+import time
+import numpy as np
+from src.alerts import AlertEngine
+from src.telemetry import FlowIngestor, TelemetryService, replay_updates
+
+NAMES = np.array(["L0", "L1", "L2", "L3"])
+RATINGS = np.full(4, 100.0)
+
+
+async def feed(ingestor, updates, settle=0.1):
+    """Run the consumer, queue every update in order, wait for the batches"""
+    consumer = asyncio.create_task(ingestor.run())
+    for name, mw in updates:
+        await ingestor.put(name, mw)
+    await asyncio.sleep(settle)
+    consumer.cancel()
+
+
+def test_replay_keeps_the_last_update_per_line():
+    updates = list(replay_updates(NAMES, [50.0, 60.0, 70.0, 80.0], 2000, seed=3, burst=10))
+    ingestor = FlowIngestor(NAMES, RATINGS, [50.0, 60.0, 70.0, 80.0], batch_window=0.001, max_batch=64)
+    asyncio.run(feed(ingestor, updates))
+
+    last = dict(updates)
+    expected = np.array([last[n] for n in NAMES])
+    state, m = ingestor.latest(), ingestor.metrics()
+    np.testing.assert_array_equal(state.flows, expected)
+    np.testing.assert_allclose(state.stress, np.abs(expected) / RATINGS * 100)
+    assert m.received == len(updates) and m.rejected == 0
+    assert m.coalesced == len(updates) - m.lines_recomputed
+    # one published version per batch, after the initial state
+    assert state.version == m.batches
+
+
+def test_versions_increase_and_published_state_is_not_modified():
+    ingestor = FlowIngestor(NAMES, RATINGS, np.zeros(4))
+    first = ingestor.latest()
+    asyncio.run(feed(ingestor, [("L1", 95.0)]))
+    second = ingestor.latest()
+    assert second.version == first.version + 1
+    assert first.flows[1] == 0.0 and second.flows[1] == 95.0
+
+    ingestor.set_ratings(RATINGS)              # unchanged: no new version
+    assert ingestor.latest().version == second.version
+    ingestor.set_ratings(RATINGS * 2)
+    third = ingestor.latest()
+    assert third.version == second.version + 1 and third.stress[1] == 47.5
+    assert second.stress[1] == 95.0
+
+
+def test_batch_coalesces_and_updates_alerts():
+    alerts = AlertEngine(NAMES, raise_at=90.0, clear_at=88.0)
+    ingestor = FlowIngestor(NAMES, RATINGS, np.zeros(4), alerts=alerts, batch_window=0.05)
+
+    async def run():
+        # queued before the consumer starts: one batch
+        for mw in (95.0, 10.0, 92.0):
+            await ingestor.put("L2", mw)
+        await ingestor.put("L3", 50.0)
+        await ingestor.put("nope", 1.0)
+        await ingestor.put_line("garbage")
+        await feed(ingestor, [])
+    asyncio.run(run())
+
+    state, m = ingestor.latest(), ingestor.metrics()
+    assert m.batches == 1 and m.coalesced == 2 and m.rejected == 2
+    assert state.flows[2] == 92.0
+    np.testing.assert_array_equal(state.active, [2])
+    np.testing.assert_array_equal(state.raised, [2])
+
+
+def test_service_tails_a_file_in_order(tmp_path):
+    path = tmp_path / "flows.log"
+    path.write_text("L0,999\n")                # before start: not replayed
+    ingestor = FlowIngestor(NAMES, RATINGS, np.zeros(4))
+    service = TelemetryService(ingestor, tail_path=str(path)).start()
+    try:
+        with open(path, "a") as f:
+            f.write("L0,10\nL1,20\nL0,30\n")
+        deadline = time.monotonic() + 5.0
+        while ingestor.metrics().received < 3 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        time.sleep(0.1)
+    finally:
+        service.stop()
+    np.testing.assert_array_equal(ingestor.latest().flows, [30.0, 20.0, 0.0, 0.0])
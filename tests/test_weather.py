@@ -0,0 +1,83 @@
+import os
+import threading
+import numpy as np
+from src.weather import COMPASS, WeatherProvider, parse_hourly
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "data", "nws_honolulu.json")
+# 2024-02-29 22:00 HST is 2024-03-01 08:00 UTC
+START = np.datetime64("2024-03-01T08:00:00")
+
+
+def test_parse_hourly_fixture():
+    fc = WeatherProvider.from_fixture(FIXTURE).hourly()
+    np.testing.assert_allclose(fc.temp_c, (np.array([75, 74, 73, 72]) - 32) * 5 / 9)
+    np.testing.assert_allclose(fc.wind_ms, np.array([10, 5, 8, 15 / 1.609344]) * 0.44704)
+    assert fc.wind_dir_deg[0] == COMPASS["ENE"] and np.isnan(fc.wind_dir_deg[3])
+    assert fc.time[0] == START
+    # local days: 29 Feb and 1 Mar of a leap year
+    np.testing.assert_array_equal(fc.day, [59, 59, 60, 60])
+    np.testing.assert_array_equal(fc.local_hour, [22, 23, 0, 1])
+
+
+def test_current_reads_the_hour_covering_now():
+    provider = WeatherProvider.from_fixture(FIXTURE)
+    cur = provider.current(wait=None, now=START + np.timedelta64(90, "m"))
+    assert cur.start == START + np.timedelta64(1, "h")
+    assert cur.temp_c == (74 - 32) * 5 / 9 and not cur.stale
+
+
+def test_current_refuses_a_forecast_that_does_not_cover_now():
+    provider = WeatherProvider.from_fixture(FIXTURE)
+    assert provider.current(wait=None, now=START - np.timedelta64(1, "s")) is None
+    assert provider.current(wait=None, now=START + np.timedelta64(4, "h")) is None
+
+
+def test_current_flags_stale_forecast():
+    provider = WeatherProvider.from_fixture(FIXTURE, forecast_ttl=600.0)
+    provider.hourly()
+    provider._fetched -= 601.0
+    assert provider.current(now=START).stale
+
+
+class BlockingTransport:
+    """Fixture responses, held back until release is set"""
+    def __init__(self, fail=False):
+        self.release = threading.Event()
+        self.fail = fail
+        self.data = WeatherProvider.from_fixture(FIXTURE).transport.data
+
+    def get_json(self, url):
+        self.release.wait(5.0)
+        if self.fail:
+            raise ConnectionError("no network")
+        return self.data["points" if "/points/" in url else "forecast"]
+
+
+def test_current_does_not_block_on_the_first_fetch():
+    transport = BlockingTransport()
+    provider = WeatherProvider(transport=transport)
+    assert provider.current(now=START) is None
+    assert provider.pending()
+    transport.release.set()
+    provider.prefetch().result(timeout=5.0)
+    assert provider.current(now=START).temp_c == (75 - 32) * 5 / 9
+
+
+def test_failed_fetch_is_raised_once_then_retried():
+    transport = BlockingTransport(fail=True)
+    transport.release.set()
+    provider = WeatherProvider(transport=transport)
+    try:
+        provider.current(wait=5.0, now=START)
+        raise AssertionError("expected the fetch error")
+    except ConnectionError:
+        pass
+    transport.fail = False
+    assert provider.current(wait=5.0, now=START) is not None
+
+
+def test_parse_hourly_without_offset():
+    fc = parse_hourly({"properties": {"periods": [
+        {"startTime": "2025-06-12T14:00:00", "temperature": 30, "temperatureUnit": "C",
+         "windSpeed": "calm"}]}})
+    assert fc.time[0] == np.datetime64("2025-06-12T14:00:00") and np.isnan(fc.wind_ms[0])
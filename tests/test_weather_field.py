@@ -0,0 +1,38 @@
+import numpy as np
+from src.spans import wind_angle
+from src.weather_field import WeatherField
+
+LON = np.array([-158.0, -157.9, -157.8, -157.95])
+LAT = np.array([21.3, 21.4, 21.3, 21.5])
+
+
+def test_idw_is_exact_at_the_stations():
+    field = WeatherField(LON, LAT, k=3)
+    interp = field.interpolator(LON, LAT)
+    temps = np.array([20.0, 25.0, 30.0, 22.0])
+    np.testing.assert_allclose(interp(temps), temps)
+
+
+def test_weights_are_a_convex_combination():
+    field = WeatherField(LON, LAT, k=3)
+    rng = np.random.default_rng(0)
+    interp = field.interpolator(rng.uniform(-158.0, -157.8, 50), rng.uniform(21.3, 21.5, 50))
+    np.testing.assert_allclose(interp.w.sum(axis=1), 1.0)
+    assert (interp.w >= 0).all()
+    temps = np.array([20.0, 25.0, 30.0, 22.0])
+    out = interp(temps)
+    assert ((out >= temps.min()) & (out <= temps.max())).all()
+
+
+def test_wind_direction_is_averaged_as_a_vector():
+    field = WeatherField(LON[:2], LAT[:2], k=2)
+    midpoint = field.interpolator([LON[:2].mean()], [LAT[:2].mean()])
+    amb = field.interpolate(midpoint, [25.0, 25.0], [3.0, 3.0], [350.0, 10.0])
+    assert abs((amb.wind_from_deg[0] + 180.0) % 360.0 - 180.0) < 1.0      # not 180
+    assert np.isnan(field.interpolate(midpoint, [25.0, 25.0], [0.0, 0.0], [350.0, 10.0]).wind_from_deg[0])
+
+
+def test_wind_angle_to_the_conductor():
+    np.testing.assert_allclose(wind_angle([0.0, 90.0, 180.0, 225.0, 350.0], 0.0),
+                               [0.0, 90.0, 0.0, 45.0, 10.0])
+    assert wind_angle(100.0, 280.0) == 0.0                 # bearings are axes, not directions